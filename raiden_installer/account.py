@@ -5,7 +5,6 @@ import os
 import random
 import string
 import sys
-import time
 import uuid
 from pathlib import Path
 from typing import Optional, Union
@@ -15,7 +14,7 @@ from eth_typing import Address
 from eth_utils import to_canonical_address, to_checksum_address
 from web3 import Web3
 
-from raiden_installer import log
+from raiden_installer import log, tasks
 from raiden_installer.constants import REQUIRED_BLOCK_CONFIRMATIONS, WEB3_TIMEOUT
 from raiden_installer.tokens import EthereumAmount, Wei
 
@@ -82,7 +81,7 @@ class Account:
             else:
                 block_with_balance = math.inf
 
-            time.sleep(POLLING_INTERVAL)
+            tasks.sleep(POLLING_INTERVAL)
             time_remaining -= POLLING_INTERVAL
         log.debug(f"Balance is {balance}")
         return balance
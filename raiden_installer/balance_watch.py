@@ -0,0 +1,149 @@
+""" Balances of configurations, pushed to the pages showing them
+
+Pages used to poll the configuration API, every poll reading all balances from
+the ethereum node, once per open tab. Instead, there is a watcher per
+configuration, which checks for a new block and only then reads the balances.
+Its subscribers (e.g. the websockets of the open pages) get the balances that
+changed, so the load on the ethereum node depends on the number of blocks,
+not on the number of pages open.
+"""
+import asyncio
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from requests.exceptions import RequestException
+from web3 import Web3
+
+from raiden_installer import log
+from raiden_installer.base import RaidenConfigurationFile
+from raiden_installer.constants import BALANCE_WATCH_INTERVAL
+from raiden_installer.ethereum_rpc import make_web3_provider
+from raiden_installer.tasks import BALANCE_EXECUTOR, TaskCancelled, run_blocking_on
+from raiden_installer.token_metadata import get_settings_tokens
+from raiden_installer.transactions import get_token_balance, get_total_token_owned
+
+BalanceSubscriber = Callable[[dict], None]
+
+
+def serialize_balance(balance_amount) -> Optional[dict]:
+    return (
+        {"as_wei": balance_amount.as_wei, "formatted": balance_amount.formatted}
+        if balance_amount
+        else None
+    )
+
+
+def get_balances(w3: Web3, configuration_file: RaidenConfigurationFile) -> dict:
+    """ Reads the balances the wizard needs, by their role """
+    account = configuration_file.account
+    service_token, transfer_token = get_settings_tokens(
+        w3, configuration_file.network.chain_id, configuration_file.settings
+    )
+
+    return {
+        "ETH": serialize_balance(account.get_ethereum_balance(w3)),
+        "service_token": serialize_balance(
+            get_total_token_owned(w3=w3, account=account, token=service_token)
+        ),
+        "transfer_token": serialize_balance(
+            get_token_balance(w3=w3, account=account, token=transfer_token)
+        ),
+    }
+
+
+class BalanceWatcher:
+    """ Reads the balances of a configuration once per block, while it has subscribers
+
+    Runs on the IOLoop, the reads themselves run on the balance thread pool.
+    """
+
+    def __init__(
+        self,
+        configuration_file: RaidenConfigurationFile,
+        interval: float = BALANCE_WATCH_INTERVAL,
+    ):
+        self.configuration_file = configuration_file
+        self.interval = interval
+        self.balances: Optional[dict] = None
+        self.block_number: Optional[int] = None
+        self._subscribers: List[BalanceSubscriber] = []
+        self._cancelled = threading.Event()
+        self._task: Optional[asyncio.Future] = None
+
+    @property
+    def is_watching(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def subscribe(self, subscriber: BalanceSubscriber) -> Optional[dict]:
+        """ Adds a subscriber and returns the last balances read, if any """
+        self._subscribers.append(subscriber)
+        if not self.is_watching:
+            self._cancelled = threading.Event()
+            self._task = asyncio.ensure_future(self.run())
+        return self.balances
+
+    def unsubscribe(self, subscriber: BalanceSubscriber):
+        if subscriber in self._subscribers:
+            self._subscribers.remove(subscriber)
+        if not self._subscribers and self._task is not None:
+            self._cancelled.set()
+            self._task.cancel()
+            self._task = None
+
+    async def run(self):
+        w3 = make_web3_provider(
+            self.configuration_file.ethereum_client_rpc_endpoint, self.configuration_file.account
+        )
+        while self._subscribers:
+            try:
+                block_number, balances = await run_blocking_on(
+                    BALANCE_EXECUTOR, self._cancelled, self._read_balances, w3
+                )
+            except (asyncio.CancelledError, TaskCancelled):
+                raise
+            except (RequestException, ValueError) as exc:
+                file_name = self.configuration_file.file_name
+                log.warning(f"Failed to read balances of {file_name}: {exc}")
+            except Exception:
+                # The watcher has to keep running for its subscribers, whatever failed
+                file_name = self.configuration_file.file_name
+                log.exception(f"Unexpected error reading balances of {file_name}")
+            else:
+                self.block_number = block_number
+                if balances is not None:
+                    self._update(balances)
+            await asyncio.sleep(self.interval)
+
+    def _read_balances(self, w3: Web3) -> Tuple[int, Optional[dict]]:
+        """ Returns the latest block number, and the balances if it is a new block """
+        block_number = w3.eth.blockNumber
+        if block_number == self.block_number:
+            return block_number, None
+        return block_number, get_balances(w3, self.configuration_file)
+
+    def _update(self, balances: dict):
+        changes = {
+            role: balance
+            for role, balance in balances.items()
+            if self.balances is None or self.balances.get(role) != balance
+        }
+        self.balances = balances
+        if not changes:
+            return
+
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber(changes)
+            except Exception as exc:
+                log.warning(f"Failed to pass on balances: {exc}")
+
+
+BALANCE_WATCHERS: Dict[str, BalanceWatcher] = {}
+
+
+def get_balance_watcher(configuration_file: RaidenConfigurationFile) -> BalanceWatcher:
+    watcher = BALANCE_WATCHERS.get(configuration_file.file_name)
+    if watcher is None:
+        watcher = BalanceWatcher(configuration_file)
+        BALANCE_WATCHERS[configuration_file.file_name] = watcher
+    return watcher
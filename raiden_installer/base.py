@@ -1,7 +1,7 @@
 import glob
 import os
 from pathlib import Path
-from typing import List, Union
+from typing import List, Optional, Set, Union
 
 import toml
 from eth_utils import to_canonical_address, to_checksum_address
@@ -45,6 +45,7 @@ class RaidenConfigurationFile:
         self.routing_mode = kw.get("routing_mode", self.settings.routing_mode)
         self.services_version = self.settings.services_version
         self._initial_funding_txhash = kw.get("_initial_funding_txhash")
+        self.api_port: Optional[int] = kw.get("api_port")
 
     @property
     def configuration_data(self):
@@ -59,6 +60,8 @@ class RaidenConfigurationFile:
             "enable-monitoring": self.enable_monitoring,
             "_initial_funding_txhash": self._initial_funding_txhash,
         }
+        if self.api_port is not None:
+            base_config["api-address"] = f"127.0.0.1:{self.api_port}"
 
         # If the config is for a demo-env we'll need to add/overwrite some settings
         if self.settings.client_release_channel == "demo_env":
@@ -135,8 +138,32 @@ class RaidenConfigurationFile:
                 routing_mode=data["routing-mode"],
                 enable_monitoring=data["enable-monitoring"],
                 _initial_funding_txhash=data.get("_initial_funding_txhash"),
+                api_port=cls._get_api_port(data),
             )
 
+    @staticmethod
+    def _get_api_port(data: dict) -> Optional[int]:
+        api_address = data.get("api-address")
+        if not api_address:
+            return None
+        _, _, port = api_address.rpartition(":")
+        return int(port)
+
+    @classmethod
+    def get_api_ports(cls) -> Set[int]:
+        """ Returns the API ports of the configurations of all settings """
+        api_ports = set()
+        for config_file_path in glob.glob(str(cls.FOLDER_PATH.joinpath("config-*.toml"))):
+            try:
+                with open(config_file_path) as config_file:
+                    api_port = cls._get_api_port(toml.load(config_file))
+            except (OSError, ValueError) as exc:
+                log.warn(f"Failed to read API port of {config_file_path}: {exc}")
+                continue
+            if api_port is not None:
+                api_ports.add(api_port)
+        return api_ports
+
     @classmethod
     def get_by_filename(cls, file_name):
         file_path = cls.FOLDER_PATH.joinpath(file_name)
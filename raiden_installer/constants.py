@@ -1,13 +1,78 @@
 from eth_utils import to_canonical_address
+from xdg import XDG_CACHE_HOME, XDG_DATA_HOME
+
+# local storage
+WIZARD_DATA_FOLDER_PATH = XDG_DATA_HOME.joinpath("raiden-wizard")
+PROCESS_FOLDER_PATH = WIZARD_DATA_FOLDER_PATH.joinpath("processes")
+NODE_LOG_FOLDER_PATH = WIZARD_DATA_FOLDER_PATH.joinpath("logs")
+TASK_FOLDER_PATH = WIZARD_DATA_FOLDER_PATH.joinpath("tasks")
+DOWNLOAD_CACHE_FOLDER_PATH = XDG_CACHE_HOME.joinpath("raiden-wizard", "downloads")
+RELEASE_INDEX_CACHE_FOLDER_PATH = XDG_CACHE_HOME.joinpath("raiden-wizard", "releases")
 
 # web3 constants
 WEB3_TIMEOUT = 300
 GAS_PRICE_MARGIN = 1.35
 GAS_LIMIT_MARGIN = 1.25
 EXCHANGE_PRICE_MARGIN = 1.2
+EXCHANGE_QUOTE_DEADLINE = 10
+KYBER_RATE_MAX_ERROR = 0.005
+SPLIT_ROUTE_STEPS = 100
+PAIR_RESERVES_CACHED_BLOCKS = 4
 REQUIRED_BLOCK_CONFIRMATIONS = 5
 NULL_ADDRESS = to_canonical_address("0x0000000000000000000000000000000000000000")
 
+# token metadata
+TOKEN_METADATA_FAILURE_TTL = 10 * 60
+
+# downloads
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_PROGRESS_INTERVAL = 1024 * 1024
+DOWNLOAD_PROGRESS_STEP = 10
+DOWNLOAD_CONNECTIONS = 4
+DOWNLOAD_RANGE_SIZE = 8 * 1024 * 1024
+# Seconds to connect, and to wait for data once connected
+DOWNLOAD_TIMEOUT = (10, 60)
+PREFETCH_DELAY = 5
+PREFETCH_MAX_RATE = 1024 * 1024
+
+# release index
+RELEASE_INDEX_TTL = 60 * 60
+RELEASE_INDEX_TIMEOUT = 10
+OFFLINE_ENVIRONMENT_VARIABLE = "RAIDEN_INSTALLER_OFFLINE"
+
+# raiden api
+RAIDEN_API_HOST = "127.0.0.1"
+RAIDEN_API_PORT_POOL = range(5001, 5101)
+RAIDEN_STATUS_TIMEOUT = 5
+RAIDEN_STATUS_MIN_INTERVAL = 0.5
+RAIDEN_STATUS_MAX_INTERVAL = 5
+RAIDEN_PROCESS_CHECK_INTERVAL = 0.25
+
+# raiden node logs
+NODE_LOG_BUFFER_SIZE = 1000
+NODE_LOG_MAX_LINE_LENGTH = 16 * 1024
+NODE_LOG_BACKLOG_SIZE = 1024 * 1024
+NODE_LOG_POLL_INTERVAL = 0.25
+NODE_LOG_MAX_FILE_SIZE = 50 * 1024 * 1024
+
+# raiden node supervision
+TELEMETRY_SAMPLE_INTERVAL = 5
+TELEMETRY_HISTORY_SIZE = 720
+SUPERVISOR_RESTART_MIN_DELAY = 1
+SUPERVISOR_RESTART_MAX_DELAY = 5 * 60
+SUPERVISOR_STABLE_UPTIME = 10 * 60
+SYNC_STALL_TIMEOUT = 10 * 60
+
+# websocket tasks
+TASK_THREADS = 8
+CONNECTION_ACTIONS = 4
+TASK_SESSION_THREADS = 4
+BALANCE_THREADS = 2
+TASK_SESSION_TTL = 7 * 24 * 60 * 60
+
+# balances pushed to the pages
+BALANCE_WATCH_INTERVAL = 4
+
 # 3rd party urls
 ETH_GAS_STATION_API = "https://ethgasstation.info/api/ethgasAPI.json"
 
@@ -0,0 +1,79 @@
+""" Precompiled encoders for the contract calls the wizard makes most often
+
+Going through web3's ``Contract`` machinery (ABI lookup, argument
+normalizers, result formatters) costs far more than the call data itself.
+The signatures of these calls are fixed, so their selectors and types are
+prepared once and the data is encoded with ``eth_abi`` directly. Calls are
+sent as raw ``eth_call`` requests, skipping the formatters of ``w3.eth.call``.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Tuple
+
+from eth_abi import decode_abi, encode_abi
+from eth_abi.exceptions import DecodingError
+from eth_typing import Address
+from eth_utils import encode_hex, function_signature_to_4byte_selector, to_checksum_address
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.types import RPCEndpoint
+
+from raiden_installer.ethereum_rpc import RPCRequest
+
+
+@dataclass(frozen=True)
+class PrecompiledCall:
+    name: str
+    input_types: Tuple[str, ...]
+    output_types: Tuple[str, ...]
+    selector: bytes = field(init=False, repr=False)
+
+    def __post_init__(self):
+        signature = f"{self.name}({','.join(self.input_types)})"
+        object.__setattr__(self, "selector", function_signature_to_4byte_selector(signature))
+
+    def encode(self, *args) -> bytes:
+        return self.selector + encode_abi(self.input_types, args)
+
+    def decode(self, result) -> Any:
+        """ Decodes the result of a call
+
+        Single return values are unpacked. Raises ``ValueError`` if the call
+        failed or returned no data.
+        """
+        data = HexBytes(result) if result else b""
+        if not data:
+            raise ValueError(f"Call to {self.name} failed")
+        try:
+            values = decode_abi(self.output_types, data)
+        except DecodingError as exc:
+            raise ValueError(f"Could not decode result of {self.name}") from exc
+        return values[0] if len(values) == 1 else tuple(values)
+
+    def request(self, address: Address, *args, block_identifier: str = "latest") -> RPCRequest:
+        call = {"to": to_checksum_address(address), "data": encode_hex(self.encode(*args))}
+        return ("eth_call", [call, block_identifier])
+
+    def call(self, w3: Web3, address: Address, *args, block_identifier: str = "latest") -> Any:
+        method, params = self.request(address, *args, block_identifier=block_identifier)
+        return self.decode(w3.manager.request_blocking(RPCEndpoint(method), params))
+
+
+# ERC20
+BALANCE_OF = PrecompiledCall("balanceOf", ("address",), ("uint256",))
+ALLOWANCE = PrecompiledCall("allowance", ("address", "address"), ("uint256",))
+
+# User deposit contract
+EFFECTIVE_BALANCE = PrecompiledCall("effectiveBalance", ("address",), ("uint256",))
+TOTAL_DEPOSIT = PrecompiledCall("total_deposit", ("address",), ("uint256",))
+DEPOSIT_TOKEN = PrecompiledCall("token", (), ("address",))
+
+# Kyber network proxy
+GET_EXPECTED_RATE = PrecompiledCall(
+    "getExpectedRate", ("address", "address", "uint256"), ("uint256", "uint256")
+)
+MAX_GAS_PRICE = PrecompiledCall("maxGasPrice", (), ("uint256",))
+
+# Uniswap
+GET_AMOUNTS_IN = PrecompiledCall("getAmountsIn", ("uint256", "address[]"), ("uint256[]",))
+GET_PAIR = PrecompiledCall("getPair", ("address", "address"), ("address",))
+GET_RESERVES = PrecompiledCall("getReserves", (), ("uint112", "uint112", "uint32"))
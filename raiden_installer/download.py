@@ -0,0 +1,614 @@
+""" Streaming download and installation of the Raiden binaries
+
+The release archives are large, so they are never held in memory: the
+response is streamed into a file while being hashed, the binary is copied
+out of the archive in bounded chunks and finally renamed into place, so that
+an interrupted installation never leaves a partial binary behind.
+
+Archives are kept in a content-addressed cache. Interrupted downloads are
+resumed with range requests and identical archives are stored only once,
+whichever release channel they were installed from. Where the server allows
+it, archives are fetched over several connections at once. An archive that
+is already being downloaded (e.g. prefetched in the background) is not
+downloaded again, the download in progress is awaited instead.
+
+Background downloads use a single connection at a limited rate, so that they
+leave the bandwidth to the user. The limit is lifted as soon as somebody
+waits for the download.
+"""
+import hashlib
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from raiden_installer import log
+from raiden_installer.constants import (
+    DOWNLOAD_CACHE_FOLDER_PATH,
+    DOWNLOAD_CHUNK_SIZE,
+    DOWNLOAD_CONNECTIONS,
+    DOWNLOAD_PROGRESS_INTERVAL,
+    DOWNLOAD_RANGE_SIZE,
+    DOWNLOAD_TIMEOUT,
+)
+
+
+class DownloadError(Exception):
+    pass
+
+
+class ChecksumMismatchError(DownloadError):
+    pass
+
+
+class RangeNotSupportedError(DownloadError):
+    pass
+
+
+@dataclass(frozen=True)
+class DownloadProgress:
+    downloaded: int
+    total: Optional[int] = None
+
+    @property
+    def percentage(self) -> Optional[int]:
+        if not self.total:
+            return None
+        return min(100, self.downloaded * 100 // self.total)
+
+
+ProgressCallback = Callable[[DownloadProgress], None]
+
+
+def _hash_file(file: BinaryIO, digest, chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> int:
+    """ Feeds the content of ``file`` to ``digest`` and returns its size """
+    file.seek(0)
+    size = 0
+    for block in iter(lambda: file.read(chunk_size), b""):
+        digest.update(block)
+        size += len(block)
+    return size
+
+
+class _Throttle:
+    """ Limits a download to ``max_rate`` bytes per second, until it is lifted """
+
+    def __init__(self, max_rate: Optional[float] = None):
+        self.max_rate = max_rate
+        self._started = time.monotonic()
+        self._amount = 0
+
+    def lift(self):
+        self.max_rate = None
+
+    def wait(self, amount: int):
+        """ Accounts for ``amount`` bytes and sleeps while the download is ahead """
+        self._amount += amount
+        max_rate = self.max_rate
+        if max_rate is None:
+            return
+        delay = self._started + self._amount / max_rate - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _write_response(
+    response: requests.Response,
+    target_file: BinaryIO,
+    digest,
+    downloaded: int,
+    progress_callback: Optional[ProgressCallback],
+    chunk_size: int,
+    throttle: _Throttle,
+):
+    content_length = response.headers.get("Content-Length")
+    total = downloaded + int(content_length) if content_length else None
+
+    next_report = downloaded + DOWNLOAD_PROGRESS_INTERVAL
+    for chunk in response.iter_content(chunk_size):
+        target_file.write(chunk)
+        digest.update(chunk)
+        downloaded += len(chunk)
+        throttle.wait(len(chunk))
+        if progress_callback is not None and downloaded >= next_report:
+            progress_callback(DownloadProgress(downloaded, total))
+            next_report = downloaded + DOWNLOAD_PROGRESS_INTERVAL
+
+    if progress_callback is not None:
+        progress_callback(DownloadProgress(downloaded, total))
+
+
+def _get_validator(response: requests.Response) -> Optional[str]:
+    return response.headers.get("ETag") or response.headers.get("Last-Modified")
+
+
+def _get_content_range_total(response: requests.Response) -> Optional[int]:
+    """ The total size from a ``Content-Range: bytes 0-99/1234`` header """
+    _, _, total = response.headers.get("Content-Range", "").partition("/")
+    return int(total) if total.isdigit() else None
+
+
+def _remove_file(path: Path):
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _write_atomically(path: Path, text: str):
+    temporary_path = path.with_name(f".{path.name}.tmp")
+    temporary_path.write_text(text)
+    os.replace(temporary_path, path)
+
+
+class _SharedDownload:
+    """ A download in progress, with everyone waiting for it """
+
+    def __init__(self, max_rate: Optional[float] = None):
+        self.future: Future = Future()
+        self.throttle = _Throttle(max_rate)
+        self.is_background = max_rate is not None
+        self._lock = threading.Lock()
+        self._callbacks: List[ProgressCallback] = []
+        self._progress: Optional[DownloadProgress] = None
+
+    def add_callback(self, progress_callback: Optional[ProgressCallback]):
+        if progress_callback is None:
+            return
+        with self._lock:
+            self._callbacks.append(progress_callback)
+            progress = self._progress
+        if progress is not None:
+            progress_callback(progress)
+
+    def report(self, progress: DownloadProgress):
+        with self._lock:
+            self._progress = progress
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            callback(progress)
+
+
+class DownloadCache:
+    """ Keeps downloaded archives, addressed by their SHA256 checksum
+
+    ``partial/`` holds unfinished downloads (and the validator of the
+    response they came from), ``sha256/`` the complete archives and
+    ``urls/`` maps every downloaded url to the checksum of its content.
+
+    With more than one ``connections``, archives are fetched in ranges of
+    ``chunk_size`` bytes over concurrent connections, if the server
+    supports range requests.
+
+    Requests give up after the (connect, read) ``timeout``. The partial
+    download is kept, so that fetching the archive again resumes it.
+    """
+
+    def __init__(
+        self,
+        folder_path: Path,
+        connections: int = DOWNLOAD_CONNECTIONS,
+        chunk_size: int = DOWNLOAD_RANGE_SIZE,
+        timeout: Tuple[float, float] = DOWNLOAD_TIMEOUT,
+    ):
+        self.folder_path = folder_path
+        self.connections = connections
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self._downloads: Dict[str, _SharedDownload] = {}
+        self._downloads_lock = threading.Lock()
+
+    @staticmethod
+    def _get_url_key(url: str) -> str:
+        return hashlib.sha256(url.encode()).hexdigest()
+
+    def _get_content_path(self, checksum: str) -> Path:
+        return self.folder_path.joinpath("sha256", checksum)
+
+    def _get_url_index_path(self, url: str) -> Path:
+        return self.folder_path.joinpath("urls", self._get_url_key(url))
+
+    def _get_partial_path(self, url: str) -> Path:
+        return self.folder_path.joinpath("partial", self._get_url_key(url))
+
+    @staticmethod
+    def _get_validator_path(partial_path: Path) -> Path:
+        return partial_path.with_suffix(".validator")
+
+    @staticmethod
+    def _get_ranges_path(partial_path: Path) -> Path:
+        return partial_path.with_suffix(".ranges")
+
+    def _remove_partial_download(self, partial_path: Path):
+        _remove_file(partial_path)
+        _remove_file(self._get_validator_path(partial_path))
+        _remove_file(self._get_ranges_path(partial_path))
+
+    def get(self, url: str, checksum: Optional[str] = None) -> Optional[Path]:
+        """ Returns the cached archive for ``url``, if it was downloaded before
+
+        If the published ``checksum`` is known, any archive with that content
+        is returned, even if it was downloaded from another url.
+        """
+        if checksum is None:
+            try:
+                checksum = self._get_url_index_path(url).read_text().strip()
+            except FileNotFoundError:
+                return None
+
+        content_path = self._get_content_path(checksum)
+        return content_path if content_path.is_file() else None
+
+    def fetch(
+        self,
+        url: str,
+        checksum: Optional[str] = None,
+        progress_callback: Optional[ProgressCallback] = None,
+        max_rate: Optional[float] = None,
+    ) -> Path:
+        """ Returns the path of the archive at ``url``, downloading it if needed
+
+        Raises ``ChecksumMismatchError`` if the content does not match the
+        published ``checksum``. If ``url`` is being downloaded already, that
+        download is awaited and its progress reported. Should it fail, the
+        archive is downloaded again.
+
+        With a ``max_rate`` (in bytes per second), the archive is downloaded
+        in the background, over a single connection. Fetching it without a
+        ``max_rate`` in the meantime lifts the limit.
+        """
+        cached_path = self.get(url, checksum)
+        if cached_path is not None:
+            log.info(f"Using cached download of {url}")
+            if progress_callback is not None:
+                size = cached_path.stat().st_size
+                progress_callback(DownloadProgress(size, size))
+            return cached_path
+
+        with self._downloads_lock:
+            download = self._downloads.get(url)
+            is_downloading = download is not None
+            if download is None:
+                download = self._downloads[url] = _SharedDownload(max_rate)
+            elif max_rate is None:
+                download.throttle.lift()
+        download.add_callback(progress_callback)
+
+        if is_downloading:
+            log.info(f"Waiting for the download of {url} in progress")
+            try:
+                return download.future.result()
+            except Exception as exc:
+                if max_rate is not None or not download.is_background:
+                    raise
+                log.warning(f"Background download of {url} failed, downloading it: {exc}")
+                return self.fetch(url, checksum, progress_callback)
+
+        try:
+            content_path = self._fetch(url, checksum, download)
+        except BaseException as exc:
+            # Removed first, so that retries do not find the failed download
+            self._end_download(url)
+            download.future.set_exception(exc)
+            raise
+        self._end_download(url)
+        download.future.set_result(content_path)
+        return content_path
+
+    def _end_download(self, url: str):
+        with self._downloads_lock:
+            del self._downloads[url]
+
+    def _fetch(self, url: str, checksum: Optional[str], download: _SharedDownload) -> Path:
+        for folder_name in ("partial", "sha256", "urls"):
+            self.folder_path.joinpath(folder_name).mkdir(parents=True, exist_ok=True)
+
+        partial_path = self._get_partial_path(url)
+        digest = self._download(
+            url,
+            partial_path,
+            download.report,
+            connections=1 if download.is_background else self.connections,
+            throttle=download.throttle,
+        )
+
+        if checksum is not None and digest != checksum:
+            self._remove_partial_download(partial_path)
+            raise ChecksumMismatchError(
+                f"Checksum of {url} is {digest}, but {checksum} was published"
+            )
+
+        content_path = self._get_content_path(digest)
+        os.replace(partial_path, content_path)
+        _write_atomically(self._get_url_index_path(url), digest)
+        self._remove_partial_download(partial_path)
+        return content_path
+
+    def discard(self, url: str, checksum: Optional[str] = None):
+        """ Removes a cached archive, e.g. because it turned out to be broken """
+        content_path = self.get(url, checksum)
+        if content_path is not None:
+            _remove_file(content_path)
+        _remove_file(self._get_url_index_path(url))
+
+    def _download(
+        self,
+        url: str,
+        partial_path: Path,
+        progress_callback: Optional[ProgressCallback],
+        connections: int,
+        throttle: _Throttle,
+    ) -> str:
+        """ Downloads ``url`` into ``partial_path`` and returns its SHA256 checksum
+
+        Downloads that were started over a single connection are continued
+        that way, downloads started in ranges go on in ranges, over as many
+        ``connections`` as allowed. Everything else is fetched in parallel if
+        possible.
+        """
+        has_ranges = self._get_ranges_path(partial_path).exists()
+        is_streamed = partial_path.exists() and not has_ranges
+        if (connections > 1 or has_ranges) and not is_streamed:
+            try:
+                return self._download_ranges(
+                    url, partial_path, progress_callback, connections, throttle
+                )
+            except RangeNotSupportedError as exc:
+                log.info(f"Downloading {url} over a single connection: {exc}")
+                self._remove_partial_download(partial_path)
+
+        return self._download_stream(url, partial_path, progress_callback, throttle)
+
+    def _download_ranges(
+        self,
+        url: str,
+        partial_path: Path,
+        progress_callback: Optional[ProgressCallback],
+        connections: int,
+        throttle: _Throttle,
+    ) -> str:
+        """ Downloads ``url`` in ranges over concurrent connections
+
+        The ranges are written into a preallocated file. Completed ranges are
+        recorded, so that an interrupted download only fetches the missing
+        ones, as long as the validator of the first response still matches.
+        """
+        validator_path = self._get_validator_path(partial_path)
+        ranges_path = self._get_ranges_path(partial_path)
+
+        try:
+            validator: Optional[str] = validator_path.read_text()
+            completed = {int(start) for start in ranges_path.read_text().split()}
+            total = partial_path.stat().st_size
+        except (FileNotFoundError, ValueError):
+            self._remove_partial_download(partial_path)
+            validator, completed, total = None, set(), None
+
+        first_response = None
+        if total is None or validator is None:
+            first_response = requests.get(
+                url,
+                headers={"Range": f"bytes=0-{self.chunk_size - 1}"},
+                stream=True,
+                timeout=self.timeout,
+            )
+            first_response.raise_for_status()
+            if first_response.status_code != 206:
+                log.info(f"Downloading {url} over a single connection")
+                with first_response:
+                    return self._write_full_response(
+                        first_response, partial_path, progress_callback, throttle
+                    )
+
+            validator = _get_validator(first_response)
+            total = _get_content_range_total(first_response)
+            if total is None or validator is None:
+                first_response.close()
+                raise RangeNotSupportedError("Server does not identify the content")
+
+            with partial_path.open("wb") as partial_file:
+                partial_file.truncate(total)
+            _write_atomically(validator_path, validator)
+            ranges_path.write_text("")
+
+        def write_range(start: int, response: requests.Response) -> int:
+            end = min(start + self.chunk_size, total) - 1
+            with response:
+                response.raise_for_status()
+                if response.status_code != 206:
+                    raise RangeNotSupportedError(f"Content of {url} changed during download")
+                with partial_path.open("r+b") as partial_file:
+                    partial_file.seek(start)
+                    for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                        partial_file.write(chunk)
+                        throttle.wait(len(chunk))
+                    if partial_file.tell() != end + 1:
+                        raise DownloadError(f"Incomplete range {start}-{end} of {url}")
+            return end + 1 - start
+
+        def download_range(start: int) -> int:
+            end = min(start + self.chunk_size, total) - 1
+            headers = {"Range": f"bytes={start}-{end}", "If-Range": validator}
+            response = requests.get(url, headers=headers, stream=True, timeout=self.timeout)
+            return write_range(start, response)
+
+        missing = [
+            start
+            for start in range(0, total, self.chunk_size)
+            if start not in completed and not (start == 0 and first_response is not None)
+        ]
+        downloaded = sum(min(self.chunk_size, total - start) for start in completed)
+        if progress_callback is not None:
+            progress_callback(DownloadProgress(downloaded, total))
+
+        with ThreadPoolExecutor(
+            max_workers=connections, thread_name_prefix="download"
+        ) as executor, ranges_path.open("a") as ranges_file:
+            futures = {}
+            if first_response is not None:
+                # The first range is already on its way, it only needs to be written
+                futures[executor.submit(write_range, 0, first_response)] = 0
+            for start in missing:
+                futures[executor.submit(download_range, start)] = start
+            try:
+                # Bookkeeping and progress stay on the calling thread
+                for future in as_completed(futures):
+                    downloaded += future.result()
+                    ranges_file.write(f"{futures[future]}\n")
+                    ranges_file.flush()
+                    if progress_callback is not None:
+                        progress_callback(DownloadProgress(downloaded, total))
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+        with partial_path.open("rb") as downloaded_file:
+            digest = hashlib.sha256()
+            _hash_file(downloaded_file, digest)
+        return digest.hexdigest()
+
+    def _download_stream(
+        self,
+        url: str,
+        partial_path: Path,
+        progress_callback: Optional[ProgressCallback],
+        throttle: _Throttle,
+    ) -> str:
+        """ Downloads ``url`` into ``partial_path``, resuming a previous attempt
+
+        The download is only resumed if the server still serves the same
+        content, which ``If-Range`` checks against the ETag (or modification
+        date) of the response the partial download came from.
+        """
+        try:
+            validator: Optional[str] = self._get_validator_path(partial_path).read_text()
+            downloaded = partial_path.stat().st_size
+        except FileNotFoundError:
+            validator, downloaded = None, 0
+
+        headers = {}
+        if downloaded and validator:
+            headers = {"Range": f"bytes={downloaded}-", "If-Range": validator}
+
+        response = requests.get(url, headers=headers, stream=True, timeout=self.timeout)
+        if response.status_code == 416:
+            # The partial download can not be continued, start over
+            response.close()
+            response = requests.get(url, stream=True, timeout=self.timeout)
+
+        with response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                return self._write_full_response(
+                    response, partial_path, progress_callback, throttle
+                )
+
+            log.info(f"Resuming download of {url} at {downloaded} bytes")
+            with partial_path.open("a+b") as partial_file:
+                digest = hashlib.sha256()
+                _hash_file(partial_file, digest)
+                _write_response(
+                    response,
+                    partial_file,
+                    digest,
+                    downloaded,
+                    progress_callback,
+                    DOWNLOAD_CHUNK_SIZE,
+                    throttle,
+                )
+        return digest.hexdigest()
+
+    def _write_full_response(
+        self,
+        response: requests.Response,
+        partial_path: Path,
+        progress_callback: Optional[ProgressCallback],
+        throttle: _Throttle,
+    ) -> str:
+        validator = _get_validator(response)
+        validator_path = self._get_validator_path(partial_path)
+        if validator:
+            _write_atomically(validator_path, validator)
+        else:
+            _remove_file(validator_path)
+        _remove_file(self._get_ranges_path(partial_path))
+
+        digest = hashlib.sha256()
+        with partial_path.open("wb") as partial_file:
+            _write_response(
+                response, partial_file, digest, 0, progress_callback, DOWNLOAD_CHUNK_SIZE, throttle
+            )
+        return digest.hexdigest()
+
+
+DOWNLOAD_CACHE = DownloadCache(DOWNLOAD_CACHE_FOLDER_PATH)
+
+
+def extract_binary(
+    archive_file: BinaryIO, binary_file: BinaryIO, chunk_size: int = DOWNLOAD_CHUNK_SIZE
+):
+    """ Copies the first member of a zip or tar archive into ``binary_file`` """
+    try:
+        if zipfile.is_zipfile(archive_file):
+            archive_file.seek(0)
+            with zipfile.ZipFile(archive_file) as zipped:
+                with zipped.open(zipped.infolist()[0]) as member:
+                    shutil.copyfileobj(member, binary_file, chunk_size)
+            return
+
+        archive_file.seek(0)
+        with tarfile.open(mode="r:*", fileobj=archive_file) as tar:
+            # Only the first header is read, instead of decompressing the
+            # whole archive to list all members
+            tar_member = tar.next()
+            member_file = tar.extractfile(tar_member) if tar_member else None
+            if not member_file:
+                raise DownloadError("Archive does not contain a binary")
+            with member_file:
+                shutil.copyfileobj(member_file, binary_file, chunk_size)
+    except (tarfile.TarError, zipfile.BadZipFile, EOFError, IndexError) as exc:
+        raise DownloadError(f"Could not extract archive: {exc}") from exc
+
+
+def install_binary(
+    url: str,
+    install_path: Path,
+    progress_callback: Optional[ProgressCallback] = None,
+    checksum: Optional[str] = None,
+    download_cache: DownloadCache = DOWNLOAD_CACHE,
+) -> str:
+    """ Installs the binary of the archive at ``url`` at ``install_path``
+
+    The archive is taken from the download cache if possible. Returns the
+    SHA256 hex digest of the archive.
+    """
+    archive_path = download_cache.fetch(url, checksum, progress_callback)
+    log.info(f"Installing {archive_path.name} at {install_path}", url=url)
+
+    install_path.parent.mkdir(parents=True, exist_ok=True)
+    # Extract next to the destination, so that the rename is atomic
+    fd, temporary_path = tempfile.mkstemp(dir=install_path.parent, prefix=f".{install_path.name}-")
+    try:
+        with archive_path.open("rb") as archive_file, open(fd, "wb") as binary_file:
+            try:
+                extract_binary(archive_file, binary_file)
+            except DownloadError:
+                download_cache.discard(url, checksum)
+                raise
+        os.chmod(temporary_path, 0o770)
+        os.replace(temporary_path, install_path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+    return archive_path.name
@@ -1,5 +1,6 @@
 import time
 from re import search
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from urllib.parse import urlparse
 
 import requests
@@ -10,7 +11,7 @@ from web3.eth import Eth
 from web3.exceptions import BlockNotFound
 from web3.gas_strategies.time_based import construct_time_based_gas_price_strategy
 from web3.middleware import construct_sign_and_send_raw_middleware, simple_cache_middleware
-from web3.types import Wei
+from web3.types import RPCEndpoint, Wei
 
 from raiden_installer.account import Account
 from raiden_installer.constants import ETH_GAS_STATION_API, GAS_PRICE_MARGIN
@@ -20,6 +21,9 @@ log = structlog.get_logger()
 
 EXTRA_DATA_LENGTH = 66  # 32 bytes hex encoded + `0x` prefix
 WEB3_BLOCK_NOT_FOUND_RETRY_COUNT = 3
+BATCH_REQUEST_TIMEOUT = 30
+
+RPCRequest = Tuple[str, Sequence[Any]]
 
 
 def make_web3_provider(url: str, account: Account) -> Web3:
@@ -160,6 +164,69 @@ def make_patched_web3_get_block(original_func):
     return patched_web3_get_block
 
 
+def make_batch_request(w3: Web3, rpc_requests: List[RPCRequest]) -> List[Optional[Any]]:
+    """ Sends several JSON-RPC requests to the ethereum node in one round trip
+
+    The requests are sent as a single JSON-RPC batch, which bypasses the web3
+    middlewares, so it should only be used for plain reads (``eth_call``,
+    ``eth_getBalance``, ...).
+
+    Returns the raw results in the order of the requests. Requests that failed
+    (e.g. a reverted ``eth_call``) have ``None`` as result. Providers that can
+    not send batches fall back to one request at a time.
+    """
+    if not rpc_requests:
+        return []
+
+    if not isinstance(w3.provider, HTTPProvider) or w3.provider.endpoint_uri is None:
+        return [_make_single_request(w3, method, params) for method, params in rpc_requests]
+
+    payload: List[Dict[str, Any]] = [
+        {"jsonrpc": "2.0", "method": method, "params": list(params), "id": request_id}
+        for request_id, (method, params) in enumerate(rpc_requests)
+    ]
+    request_kwargs = {"timeout": BATCH_REQUEST_TIMEOUT, **w3.provider.get_request_kwargs()}
+    response = requests.post(w3.provider.endpoint_uri, json=payload, **request_kwargs)
+    response.raise_for_status()
+
+    responses = response.json()
+    if not isinstance(responses, list):
+        # Some nodes answer a batch with a single error object
+        raise ValueError(f"Ethereum node does not support batch requests: {responses}")
+
+    results: List[Optional[Any]] = [None] * len(rpc_requests)
+    for item in responses:
+        request_id = _get_batch_index(item, len(rpc_requests))
+        if request_id is None:
+            # Without a valid id the response can not be matched to its request,
+            # whichever request it answered is left as failed
+            log.debug("Batch response without a valid id", response=item)
+            continue
+        if "error" in item:
+            log.debug(
+                "Batch request failed", request=rpc_requests[request_id], error=item["error"]
+            )
+            continue
+        results[request_id] = item.get("result")
+
+    return results
+
+
+def _get_batch_index(item: Any, request_count: int) -> Optional[int]:
+    request_id = item.get("id") if isinstance(item, dict) else None
+    if isinstance(request_id, bool) or not isinstance(request_id, int):
+        return None
+    return request_id if 0 <= request_id < request_count else None
+
+
+def _make_single_request(w3: Web3, method: str, params: Sequence[Any]) -> Optional[Any]:
+    try:
+        return w3.manager.request_blocking(RPCEndpoint(method), list(params))
+    except ValueError as exc:
+        log.debug("Request failed", method=method, error=str(exc))
+        return None
+
+
 def is_infura(web3: Web3) -> bool:
     return (
         isinstance(web3.provider, HTTPProvider)
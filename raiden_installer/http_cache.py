@@ -0,0 +1,129 @@
+""" On-disk cache for the release indexes
+
+Looking up a release should not depend on GitHub or the nightly bucket being
+reachable, nor cost a round trip every time the wizard launches Raiden.
+Responses are stored on disk and served while they are fresh. Stale entries
+are revalidated with ``If-None-Match`` / ``If-Modified-Since``, and served
+anyway if the network fails or the wizard runs in offline mode.
+"""
+import hashlib
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+import requests
+from requests.exceptions import RequestException
+
+from raiden_installer import log
+from raiden_installer.constants import (
+    OFFLINE_ENVIRONMENT_VARIABLE,
+    RELEASE_INDEX_CACHE_FOLDER_PATH,
+    RELEASE_INDEX_TIMEOUT,
+    RELEASE_INDEX_TTL,
+)
+
+
+class NotCachedError(Exception):
+    pass
+
+
+def _write_atomically(path: Path, data: bytes):
+    temporary_path = path.with_name(f".{path.name}.tmp")
+    temporary_path.write_bytes(data)
+    os.replace(temporary_path, path)
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    content: bytes
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float = 0
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+class HTTPCache:
+    def __init__(self, folder_path: Path, offline: bool = False):
+        self.folder_path = folder_path
+        self.offline = offline
+
+    def _get_paths(self, url: str):
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return self.folder_path.joinpath(f"{key}.json"), self.folder_path.joinpath(key)
+
+    def _load(self, url: str) -> Optional[CachedResponse]:
+        metadata_path, content_path = self._get_paths(url)
+        try:
+            metadata = json.loads(metadata_path.read_text())
+            return CachedResponse(content=content_path.read_bytes(), **metadata)
+        except (FileNotFoundError, ValueError, TypeError):
+            return None
+
+    def _store(self, cached_response: CachedResponse, content_changed: bool = True):
+        self.folder_path.mkdir(parents=True, exist_ok=True)
+        metadata_path, content_path = self._get_paths(cached_response.url)
+        metadata = asdict(cached_response)
+        content = metadata.pop("content")
+
+        # The metadata is written last, so it never describes other content
+        if content_changed:
+            _write_atomically(content_path, content)
+        _write_atomically(metadata_path, json.dumps(metadata).encode())
+
+    def get(self, url: str, ttl: float = RELEASE_INDEX_TTL) -> CachedResponse:
+        """ Returns the response for ``url``, from the cache if it is younger than ``ttl``
+
+        Raises ``NotCachedError`` if the response is neither cached nor can be
+        fetched.
+        """
+        cached_response = self._load(url)
+        if cached_response is not None and (self.offline or cached_response.age < ttl):
+            return cached_response
+        if self.offline:
+            raise NotCachedError(f"{url} is not cached and the wizard is offline")
+
+        headers = {}
+        if cached_response is not None:
+            if cached_response.etag:
+                headers["If-None-Match"] = cached_response.etag
+            if cached_response.last_modified:
+                headers["If-Modified-Since"] = cached_response.last_modified
+
+        try:
+            response = requests.get(url, headers=headers, timeout=RELEASE_INDEX_TIMEOUT)
+            response.raise_for_status()
+        except RequestException as exc:
+            if cached_response is None:
+                raise NotCachedError(f"{url} is not cached and could not be fetched") from exc
+            log.warning(f"Could not fetch {url}, using cached response: {exc}")
+            return cached_response
+
+        if response.status_code == 304 and cached_response is not None:
+            cached_response.fetched_at = time.time()
+            self._store(cached_response, content_changed=False)
+            return cached_response
+
+        cached_response = CachedResponse(
+            url=url,
+            content=response.content,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            fetched_at=time.time(),
+        )
+        self._store(cached_response)
+        return cached_response
+
+
+RELEASE_INDEX_CACHE = HTTPCache(
+    RELEASE_INDEX_CACHE_FOLDER_PATH, offline=OFFLINE_ENVIRONMENT_VARIABLE in os.environ
+)
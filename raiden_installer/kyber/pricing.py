@@ -0,0 +1,96 @@
+""" Kyber rate curves
+
+Kyber only tells the expected rate for one amount per call. To quote many
+amounts (e.g. while a slider is moved) the rate is sampled for a ladder of
+amounts once per block and any amount in between is served by interpolation.
+"""
+import bisect
+import threading
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from eth_typing import Address
+
+from raiden_installer.constants import KYBER_RATE_MAX_ERROR
+
+# Amounts in whole tokens, from 0.1 to 500_000
+DEFAULT_LADDER: Tuple[Decimal, ...] = tuple(
+    Decimal(mantissa) * Decimal(10) ** exponent
+    for exponent in range(-1, 6)
+    for mantissa in (1, 2, 5)
+)
+
+RateCurveKey = Tuple[Address, Address]
+
+
+def get_sample_amounts(decimals: int, ladder: Sequence[Decimal] = DEFAULT_LADDER) -> List[int]:
+    return [int(amount * 10 ** decimals) for amount in ladder]
+
+
+@dataclass(frozen=True)
+class RateCurve:
+    """ Rates (max of expected and slippage rate) sampled at ``block_number``
+
+    ``amounts`` are token amounts in wei, sorted ascending, with the rate of
+    the same index in ``rates``. A rate of zero means Kyber can not trade that
+    amount.
+    """
+
+    block_number: int
+    amounts: Tuple[int, ...]
+    rates: Tuple[int, ...]
+
+    def get_rate(self, amount: int, max_error: float = KYBER_RATE_MAX_ERROR) -> Optional[int]:
+        """ Returns the interpolated rate for ``amount``
+
+        Kyber rates change monotonically with the amount, so the true rate lies
+        between the rates of the two neighbouring samples. If those differ by
+        more than ``max_error`` (relative), or the amount is outside of the
+        sampled range, ``None`` is returned and the exact rate has to be asked.
+        """
+        index = bisect.bisect_left(self.amounts, amount)
+        if index < len(self.amounts) and self.amounts[index] == amount:
+            return self.rates[index] or None
+        if index == 0 or index == len(self.amounts):
+            return None
+
+        lower_amount, upper_amount = self.amounts[index - 1], self.amounts[index]
+        lower_rate, upper_rate = self.rates[index - 1], self.rates[index]
+        if lower_rate == 0 or upper_rate == 0:
+            return None
+
+        spread = abs(upper_rate - lower_rate) / max(lower_rate, upper_rate)
+        if spread > max_error:
+            return None
+
+        return lower_rate + (upper_rate - lower_rate) * (amount - lower_amount) // (
+            upper_amount - lower_amount
+        )
+
+
+class RateCurveCache:
+    """ Keeps the rate curves of the most recent block """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._block_number: Optional[int] = None
+        self._curves: Dict[RateCurveKey, RateCurve] = {}
+
+    def get(self, key: RateCurveKey, block_number: int) -> Optional[RateCurve]:
+        with self._lock:
+            if block_number != self._block_number:
+                return None
+            return self._curves.get(key)
+
+    def add(self, key: RateCurveKey, curve: RateCurve):
+        with self._lock:
+            if self._block_number is not None and curve.block_number < self._block_number:
+                return
+            if curve.block_number != self._block_number:
+                self._block_number = curve.block_number
+                self._curves = {}
+            self._curves[key] = curve
+
+
+RATE_CURVE_CACHE = RateCurveCache()
@@ -0,0 +1,84 @@
+""" Listing of the nightly builds in the nightlies bucket
+
+The bucket holds thousands of nightlies for all platforms. Its listing is
+requested page by page (S3 returns at most 1000 keys per request) and every
+page is parsed incrementally, instead of building a tree of the whole page.
+The nightlies are kept in an index sorted by date, which only needs the
+pages after the last known one to be updated.
+"""
+import bisect
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from io import BytesIO
+from typing import Dict, Iterator, List, Optional
+from xml.etree import ElementTree
+
+S3_XMLNS = "http://s3.amazonaws.com/doc/2006-03-01/"
+
+
+@dataclass(frozen=True)
+class ListingPage:
+    keys: List[str]
+    is_truncated: bool
+
+
+def parse_listing_page(content: bytes) -> ListingPage:
+    """ Collects the object keys of a ``ListObjectsV2`` response """
+    key_tag = f"{{{S3_XMLNS}}}Key"
+    contents_tag = f"{{{S3_XMLNS}}}Contents"
+    truncated_tag = f"{{{S3_XMLNS}}}IsTruncated"
+
+    keys, is_truncated = [], False
+    for _, element in ElementTree.iterparse(BytesIO(content), events=("end",)):
+        if element.tag == key_tag:
+            keys.append(element.text)
+        elif element.tag == truncated_tag:
+            is_truncated = element.text == "true"
+        elif element.tag == contents_tag:
+            element.clear()
+    return ListingPage(keys=keys, is_truncated=is_truncated)
+
+
+@dataclass(frozen=True)
+class NightlyEntry:
+    key: str
+    release_tag: str
+    release_datetime: datetime
+
+
+class NightlyIndex:
+    """ Nightlies sorted by date, with lookups by release tag
+
+    ``last_page_start_after`` is the ``start-after`` parameter of the last
+    listing page, new nightlies will show up on that page or after it.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.refreshed_at: Optional[float] = None
+        self.last_page_start_after: Optional[str] = None
+        self._dates: List[datetime] = []
+        self._entries: List[NightlyEntry] = []
+        self._entries_by_tag: Dict[str, NightlyEntry] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, entry: NightlyEntry):
+        if entry.release_tag in self._entries_by_tag:
+            return
+        # Keys are listed in chronological order, so this is an append most of the time
+        position = bisect.bisect_right(self._dates, entry.release_datetime)
+        self._dates.insert(position, entry.release_datetime)
+        self._entries.insert(position, entry)
+        self._entries_by_tag[entry.release_tag] = entry
+
+    def get(self, release_tag: str) -> Optional[NightlyEntry]:
+        return self._entries_by_tag.get(release_tag)
+
+    def latest(self) -> Optional[NightlyEntry]:
+        return self._entries[-1] if self._entries else None
+
+    def newest_first(self) -> Iterator[NightlyEntry]:
+        return reversed(self._entries)
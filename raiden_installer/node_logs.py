@@ -0,0 +1,198 @@
+""" Capture of the output of launched Raiden nodes
+
+A node is launched with its output going to a log file of its own, so it
+never depends on the wizard to read its output: a node that outlives the
+wizard which launched it keeps running. The file is followed by a reader
+thread, also by a restarted wizard that finds the node running, until the
+node exits. Only the last lines are kept, in a ring buffer, and a file grown
+too large is moved aside, so a node running for days uses constant memory
+and disk space. Raiden logs JSON lines, which are parsed into events and
+passed on to the subscribers (e.g. the websocket of the launch page).
+"""
+import json
+import os
+import shutil
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, List, Optional
+
+from raiden_installer import log
+from raiden_installer.constants import (
+    NODE_LOG_BACKLOG_SIZE,
+    NODE_LOG_BUFFER_SIZE,
+    NODE_LOG_MAX_FILE_SIZE,
+    NODE_LOG_MAX_LINE_LENGTH,
+    NODE_LOG_POLL_INTERVAL,
+)
+
+
+@dataclass(frozen=True)
+class LogEvent:
+    line: str
+    event: Optional[str] = None
+    level: Optional[str] = None
+    fields: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self):
+        return {"line": self.line, "event": self.event, "level": self.level, "fields": self.fields}
+
+
+LogSubscriber = Callable[[LogEvent], None]
+
+
+def parse_log_line(line: str) -> LogEvent:
+    """ Parses a JSON log line, other lines are kept as they are """
+    try:
+        data = json.loads(line)
+    except ValueError:
+        data = None
+
+    if not isinstance(data, dict):
+        return LogEvent(line=line)
+
+    fields = dict(data)
+    event = fields.pop("event", None)
+    level = fields.pop("level", None)
+    return LogEvent(
+        line=line,
+        event=None if event is None else str(event),
+        level=None if level is None else str(level),
+        fields=fields,
+    )
+
+
+class NodeLog:
+    """ The last lines logged by a node, and the subscribers to the new ones """
+
+    def __init__(
+        self,
+        size: int = NODE_LOG_BUFFER_SIZE,
+        poll_interval: float = NODE_LOG_POLL_INTERVAL,
+        max_file_size: int = NODE_LOG_MAX_FILE_SIZE,
+    ):
+        self.poll_interval = poll_interval
+        self.max_file_size = max_file_size
+        self._events: deque = deque(maxlen=size)
+        self._subscribers: List[LogSubscriber] = []
+        self._lock = threading.Lock()
+        self._stop_following: Optional[threading.Event] = None
+
+    @property
+    def is_following(self) -> bool:
+        return self._stop_following is not None and not self._stop_following.is_set()
+
+    @property
+    def events(self) -> List[LogEvent]:
+        with self._lock:
+            return list(self._events)
+
+    def append(self, event: LogEvent):
+        with self._lock:
+            self._events.append(event)
+            subscribers = list(self._subscribers)
+
+        for subscriber in subscribers:
+            try:
+                subscriber(event)
+            except Exception as exc:
+                log.warning(f"Failed to pass on node log event: {exc}")
+
+    def subscribe(self, subscriber: LogSubscriber) -> List[LogEvent]:
+        """ Adds a subscriber and returns the events logged before """
+        with self._lock:
+            self._subscribers.append(subscriber)
+            return list(self._events)
+
+    def unsubscribe(self, subscriber: LogSubscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def _append_line(self, raw_line: bytes):
+        line = raw_line.decode("utf-8", errors="replace").rstrip("\r\n")
+        if line:
+            self.append(parse_log_line(line))
+
+    def _rotate(self, path: Path, log_file: IO[bytes]):
+        """ Moves the content of the log file, which is read up to its end, to ``<path>.1``
+
+        The node keeps the file open, so it is copied and truncated. This needs
+        the node to write in append mode, and lines written in between the two
+        are lost.
+        """
+        try:
+            shutil.copyfile(path, path.with_name(f"{path.name}.1"))
+            os.truncate(path, 0)
+        except OSError as exc:
+            log.warning(f"Failed to rotate {path}: {exc}")
+            return
+        log_file.seek(0)
+
+    def _read(self, path: Path, log_file: IO[bytes], stopped: threading.Event):
+        """ Reads the lines appended to ``log_file``, until ``stopped`` is set and all are read
+
+        Lines still being written are kept back until they are complete. Longer
+        lines are split, so a single line cannot exhaust the memory. Once the
+        file is read up to ``max_file_size``, it is rotated.
+        """
+        pending = b""
+        with log_file:
+            while True:
+                chunk = log_file.readline(NODE_LOG_MAX_LINE_LENGTH - len(pending))
+                if not chunk:
+                    if stopped.is_set():
+                        return
+                    if log_file.tell() >= self.max_file_size:
+                        self._rotate(path, log_file)
+                    stopped.wait(self.poll_interval)
+                    continue
+
+                pending += chunk
+                if pending.endswith(b"\n") or len(pending) >= NODE_LOG_MAX_LINE_LENGTH:
+                    self._append_line(pending)
+                    pending = b""
+
+    def follow(self, path: Path, from_start: bool = True) -> threading.Thread:
+        """ Follows the lines written to the log file at ``path`` in the background
+
+        Replaces the log file followed before. Unless ``from_start``, reading
+        starts at the last ``NODE_LOG_BACKLOG_SIZE`` bytes of the file.
+        """
+        self.stop_following()
+
+        log_file = path.open("rb")
+        if not from_start:
+            size = path.stat().st_size
+            if size > NODE_LOG_BACKLOG_SIZE:
+                log_file.seek(size - NODE_LOG_BACKLOG_SIZE - 1)
+                if log_file.read(1) != b"\n":
+                    # Skip the rest of the line the backlog starts in
+                    log_file.readline(NODE_LOG_MAX_LINE_LENGTH)
+
+        stopped = threading.Event()
+        with self._lock:
+            self._stop_following = stopped
+        thread = threading.Thread(target=self._read, args=(path, log_file, stopped), daemon=True)
+        thread.start()
+        return thread
+
+    def stop_following(self):
+        with self._lock:
+            if self._stop_following is not None:
+                self._stop_following.set()
+
+
+NODE_LOGS: Dict[str, NodeLog] = {}
+
+
+def get_node_log(name: str) -> NodeLog:
+    return NODE_LOGS.setdefault(name, NodeLog())
+
+
+def release_node_log(name: str):
+    """ Stops following the log of a node that exited, and forgets it """
+    node_log = NODE_LOGS.pop(name, None)
+    if node_log is not None:
+        node_log.stop_following()
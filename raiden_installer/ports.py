@@ -0,0 +1,35 @@
+""" Allocation of the ports the Raiden nodes serve their API on """
+import socket
+import threading
+from contextlib import closing
+from typing import Iterable, Set
+
+from raiden_installer.constants import RAIDEN_API_HOST, RAIDEN_API_PORT_POOL
+
+
+class PortAllocationError(Exception):
+    pass
+
+
+PORT_ALLOCATION_LOCK = threading.Lock()
+
+
+def is_port_free(port: int, host: str = RAIDEN_API_HOST) -> bool:
+    with closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as sock:
+        try:
+            sock.bind((host, port))
+        except OSError:
+            return False
+        return True
+
+
+def allocate_port(reserved_ports: Set[int], pool: Iterable[int] = RAIDEN_API_PORT_POOL) -> int:
+    """ Returns the first free port of the pool which is not reserved
+
+    Ports are reserved by the configurations, whether their node runs or not.
+    Callers hold ``PORT_ALLOCATION_LOCK`` until the port is stored as reserved.
+    """
+    for port in pool:
+        if port not in reserved_ports and is_port_free(port):
+            return port
+    raise PortAllocationError("All ports for the Raiden API are in use")
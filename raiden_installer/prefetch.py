@@ -0,0 +1,49 @@
+""" Download of the Raiden release while the user is still onboarding
+
+The release to install is known as soon as the settings are loaded, so it is
+downloaded into the download cache in the background, while the account is
+being funded. Launching then only awaits what is left of that download.
+
+The prefetch waits a moment, so that it does not compete with the first page
+loads, and then downloads over a single connection at a limited rate, which
+is lifted once launching waits for it. Failures are only logged: launching
+downloads the release anyway.
+"""
+import threading
+from pathlib import Path
+from typing import Optional
+
+from raiden_installer import Settings, log
+from raiden_installer.constants import PREFETCH_DELAY, PREFETCH_MAX_RATE
+from raiden_installer.download import DOWNLOAD_CACHE, DownloadCache
+from raiden_installer.raiden import RaidenClient
+
+
+def prefetch_binary(
+    settings: Settings, download_cache: DownloadCache = DOWNLOAD_CACHE
+) -> Optional[Path]:
+    """ Downloads the release of ``settings`` into the cache, unless it is installed """
+    raiden_client = RaidenClient.get_client(settings)
+    if raiden_client.is_installed:
+        return None
+
+    log.info(f"Prefetching raiden {raiden_client.release}")
+    archive_path = download_cache.fetch(
+        raiden_client.download_url, raiden_client.checksum, max_rate=PREFETCH_MAX_RATE
+    )
+    log.info(f"Prefetched raiden {raiden_client.release}")
+    return archive_path
+
+
+def _prefetch_binary_in_background(settings: Settings):
+    try:
+        prefetch_binary(settings)
+    except Exception as exc:
+        log.warning(f"Failed to prefetch raiden, it will be downloaded on launch: {exc}")
+
+
+def start_prefetch(settings: Settings, delay: float = PREFETCH_DELAY) -> threading.Timer:
+    timer = threading.Timer(delay, _prefetch_binary_in_background, args=(settings,))
+    timer.daemon = True
+    timer.start()
+    return timer
@@ -0,0 +1,145 @@
+""" Tracking of the processes the wizard launches
+
+Looking for a process by name means inspecting every process on the machine.
+Instead, launched processes are remembered together with a pidfile holding
+their pid and start time. A restarted wizard finds them again through the
+pidfile, and the start time guards against a reused pid being mistaken for
+them. Only processes without a pidfile (e.g. launched by an older wizard) are
+searched for, and only once per name.
+"""
+import json
+import subprocess
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional, Set
+
+import psutil
+
+from raiden_installer import log
+from raiden_installer.constants import PROCESS_FOLDER_PATH
+
+# Receives processes with their ``name`` and ``cmdline`` in ``info``
+ProcessMatcher = Callable[[psutil.Process], bool]
+
+
+class ProcessTracker:
+    def __init__(self, folder_path: Path):
+        self.folder_path = folder_path
+        self._processes: Dict[str, psutil.Process] = {}
+        self._children: Dict[str, subprocess.Popen] = {}
+        self._searched_names: Set[str] = set()
+        self._exit_codes: Dict[str, Optional[int]] = {}
+        self._lock = threading.Lock()
+
+    def _get_pidfile_path(self, name: str) -> Path:
+        return self.folder_path.joinpath(f"{name}.pid")
+
+    def _write_pidfile(self, name: str, process: psutil.Process):
+        self.folder_path.mkdir(parents=True, exist_ok=True)
+        pidfile_data = {"pid": process.pid, "create_time": process.create_time()}
+        self._get_pidfile_path(name).write_text(json.dumps(pidfile_data))
+
+    def _load_pidfile(self, name: str) -> Optional[psutil.Process]:
+        pidfile_path = self._get_pidfile_path(name)
+        try:
+            pidfile_data = json.loads(pidfile_path.read_text())
+            process = psutil.Process(pidfile_data["pid"])
+            if process.create_time() == pidfile_data["create_time"]:
+                return process
+            log.info(f"Process {process.pid} is not {name}, its pid has been reused")
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError, psutil.Error):
+            pass
+
+        self._remove_pidfile(name)
+        return None
+
+    def _remove_pidfile(self, name: str):
+        try:
+            self._get_pidfile_path(name).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _find_process(
+        self, name: str, matches: Optional[ProcessMatcher]
+    ) -> Optional[psutil.Process]:
+        log.info(f"Searching for running {name} process")
+        if matches is None:
+
+            def matches(process):
+                return (process.info["name"] or "").lower() == name.lower()
+
+        processes = [
+            process for process in psutil.process_iter(["name", "cmdline"]) if matches(process)
+        ]
+        return max(processes, key=lambda process: process.pid, default=None)
+
+    def _is_alive(self, name: str, process: psutil.Process) -> bool:
+        child = self._children.get(name)
+        if child is not None:
+            # Polling also reaps the child, so it does not linger as a zombie
+            return child.poll() is None
+
+        try:
+            # Also compares the start time, to detect reused pids
+            return process.is_running() and process.status() != psutil.STATUS_ZOMBIE
+        except psutil.Error:
+            return False
+
+    def track(self, name: str, child: subprocess.Popen) -> psutil.Process:
+        process = psutil.Process(child.pid)
+        with self._lock:
+            self._processes[name] = process
+            self._children[name] = child
+            self._searched_names.add(name)
+            self._exit_codes.pop(name, None)
+            self._write_pidfile(name, process)
+        return process
+
+    def get(
+        self, name: str, matches: Optional[ProcessMatcher] = None
+    ) -> Optional[psutil.Process]:
+        """ Returns the running process launched as ``name``
+
+        Without a pidfile, it is searched for once among the processes ``matches``
+        accepts, which defaults to the processes called ``name``.
+        """
+        with self._lock:
+            process = self._processes.get(name) or self._load_pidfile(name)
+            if process is None and name not in self._searched_names:
+                self._searched_names.add(name)
+                process = self._find_process(name, matches)
+                if process is not None:
+                    self._write_pidfile(name, process)
+
+            if process is None:
+                return None
+            if not self._is_alive(name, process):
+                child = self._children.get(name)
+                self._exit_codes[name] = None if child is None else child.returncode
+                self._forget(name)
+                return None
+
+            self._processes[name] = process
+            return process
+
+    def get_exit_code(self, name: str) -> Optional[int]:
+        """ Returns the exit code of the process launched as ``name``, once it has exited
+
+        The exit code is unknown (``None``) for processes launched by a former wizard.
+        """
+        with self._lock:
+            return self._exit_codes.get(name)
+
+    def forget(self, name: str):
+        with self._lock:
+            self._forget(name)
+
+    def _forget(self, name: str):
+        self._processes.pop(name, None)
+        self._children.pop(name, None)
+        self._remove_pidfile(name)
+
+
+PROCESS_TRACKER = ProcessTracker(PROCESS_FOLDER_PATH)
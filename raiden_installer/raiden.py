@@ -1,27 +1,41 @@
+import asyncio
 import functools
+import json
+import math
 import os
 import re
-import socket
 import subprocess
 import sys
-import tarfile
 import tempfile
 import time
-import zipfile
-from contextlib import closing, contextmanager
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime
-from io import BytesIO
+from operator import attrgetter
 from pathlib import Path
 from typing import Callable, Optional, Tuple, Type, Union
-from urllib.parse import urlparse
-from xml.etree import ElementTree
+from urllib.parse import urlencode
 
-import psutil
-import requests
-from requests.exceptions import ConnectionError
+from eth_utils import to_checksum_address
+from tornado.httpclient import AsyncHTTPClient, HTTPClientError
 
 from raiden_installer import Settings, log
+from raiden_installer.base import RaidenConfigurationFile
+from raiden_installer.constants import (
+    NODE_LOG_FOLDER_PATH,
+    RAIDEN_API_HOST,
+    RAIDEN_PROCESS_CHECK_INTERVAL,
+    RAIDEN_STATUS_MAX_INTERVAL,
+    RAIDEN_STATUS_MIN_INTERVAL,
+    RAIDEN_STATUS_TIMEOUT,
+    RELEASE_INDEX_TTL,
+)
+from raiden_installer.download import ProgressCallback, install_binary
+from raiden_installer.http_cache import RELEASE_INDEX_CACHE
+from raiden_installer.nightlies import NightlyEntry, NightlyIndex, parse_listing_page
+from raiden_installer.node_logs import NodeLog, get_node_log, release_node_log
+from raiden_installer.ports import PORT_ALLOCATION_LOCK, allocate_port, is_port_free
+from raiden_installer.processes import PROCESS_TRACKER
 
 
 @contextmanager
@@ -63,10 +77,12 @@ def extract_version_modifier(release_name):
     return (release, match.groupdict()["number"])
 
 
+VERSION_MODIFIERS = ["dev", "alpha", "beta", "rc"]
+
+
 def order_version_modifier(version_modifier):
-    types = ["dev", "alpha", "beta", "rc"]
     try:
-        return types.index(version_modifier)
+        return VERSION_MODIFIERS.index(version_modifier)
     except (ValueError, IndexError):
         return -1
 
@@ -83,70 +99,67 @@ class VersionData:
     extra: Optional[str] = None
 
 
+VersionSortKey = Tuple[int, int, int, int, int]
+
+
+def make_version_sort_key(
+    version_data: VersionData, version_modifier: Optional[Tuple[str, str]]
+) -> VersionSortKey:
+    """ Numeric key that orders versions like PEP 440 does
+
+    Pre-releases come before the final release of the same version, which
+    ranks after all version modifiers.
+    """
+    if version_modifier:
+        modifier_order = order_version_modifier(version_modifier[0])
+        modifier_number = int(version_modifier[1])
+    else:
+        modifier_order, modifier_number = len(VERSION_MODIFIERS), 0
+
+    return (
+        int(version_data.major),
+        int(version_data.minor),
+        int(version_data.revision),
+        modifier_order,
+        modifier_number,
+    )
+
+
+@functools.total_ordering
 class RaidenClient:
     BINARY_FOLDER_PATH = Path.home().joinpath(".local", "bin")
     BINARY_NAME_FORMAT = "raiden-{release}"
-    WEB_UI_INDEX_URL = "http://127.0.0.1:5001"
-    RAIDEN_API_STATUS_ENDPOINT = "/api/v1/status"
 
     RELEASE_INDEX_URL = "https://api.github.com/repos/raiden-network/raiden/releases"
     FILE_NAME_SUFFIX = "macOS-x86_64.zip" if sys.platform == "darwin" else "linux-x86_64.tar.gz"
+    # Leads the sort key, so that clients with keys of different types still compare
+    SORT_GROUP = 0
 
-    def __init__(self, download_url: str, version_data: VersionData):
+    def __init__(
+        self, download_url: str, version_data: VersionData, checksum: Optional[str] = None
+    ):
         self.download_url = download_url
         self.version_data = version_data
-        self._process_id = self.get_process_id()
+        self.checksum = checksum
+        self._version_modifier = extract_version_modifier(version_data.extra)
+        self._sort_key = self._make_sort_key()
 
     def __eq__(self, other):
-        return all(
-            [
-                self.version_data.major == other.version_data.major,
-                self.version_data.minor == other.version_data.minor,
-                self.version_data.revision == other.version_data.revision,
-                self.version_modifier == other.version_modifier,
-                self.version_modifier_number == other.version_modifier_number,
-            ]
-        )
+        if not isinstance(other, RaidenClient):
+            return NotImplemented
+        return self.sort_key == other.sort_key
 
     def __lt__(self, other):
-        if self.version_data.major != other.version_data.major:
-            return self.version_data.major < other.version_data.major
-
-        if self.version_data.minor != other.version_data.minor:
-            return self.version_data.minor < other.version_data.minor
-
-        if self.version_data.revision != other.version_data.revision:
-            return self.version_data.revision < other.version_data.revision
-
-        if self.version_modifier != other.version_modifier:
-            return order_version_modifier(self.version_modifier) < order_version_modifier(
-                other.version_modifier_number
-            )
-
-        if self.version_modifier_number and other.version_modifier_number:
-            return self.version_modifier_number < other.version_modifier_number
-
-        return False
-
-    def __gt__(self, other):
-        if self.version_data.major != other.version_data.major:
-            return self.version_data.major > other.version_data.major
+        if not isinstance(other, RaidenClient):
+            return NotImplemented
+        return self.sort_key < other.sort_key
 
-        if self.version_data.minor != other.version_data.minor:
-            return self.version_data.minor > other.version_data.minor
-
-        if self.version_data.revision != other.version_data.revision:
-            return self.version_data.revision > other.version_data.revision
-
-        if self.version_modifier != other.version_modifier:
-            return order_version_modifier(self.version_modifier) > order_version_modifier(
-                other.version_modifier
-            )
-
-        if self.version_modifier_number and other.version_modifier_number:
-            return self.version_modifier_number > other.version_modifier_number
+    @property
+    def sort_key(self):
+        return self._sort_key
 
-        return False
+    def _make_sort_key(self):
+        return (self.SORT_GROUP, *make_version_sort_key(self.version_data, self._version_modifier))
 
     @property
     def FILE_NAME_PATTERN(self):  # pragma: no cover
@@ -165,121 +178,23 @@ class RaidenClient:
 
     @property
     def version_modifier(self):
-        version_modifier = extract_version_modifier(self.version_data.extra)
-        return version_modifier and version_modifier[0]
+        return self._version_modifier and self._version_modifier[0]
 
     @property
     def version_modifier_number(self):
-        version_modifier = extract_version_modifier(self.version_data.extra)
-        return version_modifier and version_modifier[1]
+        return self._version_modifier and self._version_modifier[1]
 
     @property
     def version(self):  # pragma: no cover
         raise NotImplementedError
 
-    def install(self, force=False):
+    def install(self, force=False, progress_callback: Optional[ProgressCallback] = None):
         if self.install_path.exists() and not force:
             raise RuntimeError(f"{self.install_path} already exists")
 
-        self.BINARY_FOLDER_PATH.mkdir(parents=True, exist_ok=True)
-
-        download = requests.get(self.download_url)
-        download.raise_for_status()
-
-        action = self._extract_gzip if self.download_url.endswith("gz") else self._extract_zip
-
-        action(BytesIO(download.content), self.install_path)
-        os.chmod(self.install_path, 0o770)
-
-    def launch(self, configuration_file, passphrase_file):
-        proc = subprocess.Popen(
-            [
-                str(self.install_path),
-                "--config-file",
-                str(configuration_file.path),
-                "--password-file",
-                str(passphrase_file),
-            ]
+        install_binary(
+            self.download_url, self.install_path, progress_callback, checksum=self.checksum
         )
-        self._process_id = proc.pid
-
-    def kill(self):
-        process = self._process_id and psutil.Process(self._process_id)
-        if process is not None:
-            log.info(f"Killing process {self._process_id}")
-            process.kill()
-            process.wait()
-            self._process_id = self.get_process_id()
-            assert self._process_id is None
-
-    def check_status_api(self, status_callback: Callable = None):
-        """
-        Params:
-            status_callback:  A function, that will receive the /status API responses before the
-                              status is `ready`.
-        """
-        log.info("Checking /status endpoint")
-        try:
-            response = requests.get(
-                RaidenClient.WEB_UI_INDEX_URL + RaidenClient.RAIDEN_API_STATUS_ENDPOINT
-            )
-            if response and response.status_code == 200:
-                result = response.json()
-                if result.get("status") == "ready":
-                    return True
-                else:
-                    if status_callback is not None:
-                        status_callback(result)
-        except ConnectionError:
-            pass
-        return False
-
-    def wait_for_web_ui_ready(self, status_callback: Callable = None):
-        """
-        Params:
-            status_callback:  A function, that will receive the /status API responses before the
-                              status is `ready`.
-        """
-        if not self.is_running:
-            raise RuntimeError("Raiden is not running")
-
-        uri = urlparse(self.WEB_UI_INDEX_URL)
-
-        while True:
-            self._process_id = self.get_process_id()
-            if not self.is_running or self.is_zombie:
-                raise RaidenClientError("client process terminated while waiting for web ui")
-
-            log.info("Waiting for raiden to start...")
-
-            while not self.check_status_api(status_callback=status_callback):
-                time.sleep(1)
-
-            with closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as sock:
-                try:
-                    connected = sock.connect_ex((uri.hostname, uri.port)) == 0
-                    if connected:
-                        return
-                except socket.gaierror:
-                    pass
-                time.sleep(1)
-
-    def get_process_id(self):
-        def is_running_raiden(process):
-            try:
-                is_raiden = self.binary_name.lower() == process.name().lower()
-                is_dead = process.status() is [psutil.STATUS_DEAD, psutil.STATUS_ZOMBIE]
-
-                return is_raiden and not is_dead
-            except psutil.ZombieProcess:
-                return False
-
-        processes = [p for p in psutil.process_iter() if is_running_raiden(p)]
-
-        try:
-            return max(p.pid for p in processes)
-        except ValueError:
-            return None
 
     @property
     def binary_name(self):
@@ -289,44 +204,18 @@ class RaidenClient:
     def is_installed(self):
         return self.install_path.exists()
 
-    @property
-    def is_running(self):
-        return self.get_process_id() is not None
-
-    @property
-    def is_zombie(self):
-        if not self._process_id:
-            return False
-
-        return psutil.Process(self._process_id).status() == psutil.STATUS_ZOMBIE
-
     @property
     def install_path(self):
         return Path(self.BINARY_FOLDER_PATH).joinpath(self.binary_name)
 
-    def _extract_zip(self, compressed_data, destination_path):
-        with zipfile.ZipFile(compressed_data) as zipped:
-            with destination_path.open("wb") as binary_file:
-                binary_file.write(zipped.read(zipped.filelist[0]))
-
-    def _extract_gzip(self, compressed_data, destination_path):
-        with tarfile.open(mode="r:*", fileobj=compressed_data) as tar:
-            with destination_path.open("wb") as binary_file:
-                compressed_data = tar.extractfile(tar.getmembers()[0])
-                if compressed_data:
-                    binary_file.write(compressed_data.read())
-
     @classmethod
     def get_file_pattern(cls):
         return fr"{cls.FILE_NAME_PATTERN}-{cls.FILE_NAME_SUFFIX}"
 
     @classmethod
-    @functools.lru_cache()
-    def get_available_releases(cls):
-        response = requests.get(cls.RELEASE_INDEX_URL)
-        response.raise_for_status()
-
-        return sorted(cls._make_releases(response), reverse=True)
+    def get_available_releases(cls, ttl: float = RELEASE_INDEX_TTL):
+        response = RELEASE_INDEX_CACHE.get(cls.RELEASE_INDEX_URL, ttl=ttl)
+        return sorted(cls._make_releases(response), key=attrgetter("sort_key"), reverse=True)
 
     @classmethod
     def _make_release(cls, release_data):
@@ -336,8 +225,15 @@ class RaidenClient:
                 return cls(
                     asset_data.get("browser_download_url"),
                     version_data,
+                    checksum=cls._get_asset_checksum(asset_data),
                 )
 
+    @staticmethod
+    def _get_asset_checksum(asset_data) -> Optional[str]:
+        """ The SHA256 checksum GitHub publishes as ``digest`` of release assets """
+        algorithm, _, checksum = (asset_data.get("digest") or "").partition(":")
+        return checksum.lower() if algorithm == "sha256" and checksum else None
+
     @classmethod
     def _make_releases(cls, index_response):
         releases = [cls._make_release(release_data) for release_data in index_response.json()]
@@ -357,8 +253,8 @@ class RaidenClient:
     @classmethod
     def make_by_tag(cls, release_tag):
         tag_url = f"{cls.RELEASE_INDEX_URL}/tags/{release_tag}"
-        response = requests.get(tag_url)
-        response.raise_for_status()
+        # Published releases do not change, so they never need to be revalidated
+        response = RELEASE_INDEX_CACHE.get(tag_url, ttl=math.inf)
         return cls._make_release(response.json())
 
     @staticmethod
@@ -400,9 +296,19 @@ class RaidenNightly(RaidenClient):
         r"T(?P<hour>\d+)-(?P<minute>\d+)-(?P<second>\d+)-"
         r"v(?P<major>\d+)\.(?P<minor>\d+)\.(?P<revision>\d+)(?P<extra>.*)"
     )
-
-    def __init__(self, version_data: VersionData, release_datetime: datetime):
-        download_url = self._get_download_url(version_data, release_datetime)
+    LISTING_PREFIX = "NIGHTLY/raiden-nightly-"
+    # Nightlies rank after all versioned releases
+    SORT_GROUP = 1
+
+    _index = NightlyIndex()
+
+    def __init__(
+        self,
+        version_data: VersionData,
+        release_datetime: datetime,
+        download_url: Optional[str] = None,
+    ):
+        download_url = download_url or self._get_download_url(version_data, release_datetime)
         self.release_datetime = release_datetime
         super().__init__(download_url, version_data)
 
@@ -412,50 +318,101 @@ class RaidenNightly(RaidenClient):
 
     @property
     def release(self):
-        formatted_date = self.release_datetime.strftime("%Y%m%d")
+        return self._format_release(self.version_data, self.release_datetime)
+
+    @staticmethod
+    def _format_release(version_data: VersionData, release_datetime: datetime) -> str:
+        formatted_date = release_datetime.strftime("%Y%m%d")
         return (
-            f"{self.version_data.major}.{self.version_data.minor}.{self.version_data.revision}"
-            f"{self.version_data.extra}-{formatted_date}"
+            f"{version_data.major}.{version_data.minor}.{version_data.revision}"
+            f"{version_data.extra}-{formatted_date}"
         )
 
-    def __eq__(self, other):
-        return self.release_datetime == other.release_datetime
+    def _make_sort_key(self):
+        # Nightlies are ordered by their build time only
+        return (self.SORT_GROUP, self.release_datetime)
 
-    def __lt__(self, other):
-        return self.release_datetime < other.release_datetime
+    @classmethod
+    def make_by_tag(cls, release_tag):
+        # Nightlies are never changed either, any listing containing the tag will do
+        for ttl in (math.inf, RELEASE_INDEX_TTL):
+            entry = cls._update_index(ttl).get(release_tag)
+            if entry is not None:
+                return cls._make_from_entry(entry)
+        return None
 
-    def __gt__(self, other):
-        return self.release_datetime > other.release_datetime
+    @classmethod
+    def get_latest_release(cls, ttl: float = RELEASE_INDEX_TTL):
+        entry = cls._update_index(ttl).latest()
+        return entry and cls._make_from_entry(entry)
 
     @classmethod
-    def make_by_tag(cls, release_tag):
-        log.info("Getting list of all nightly releases")
-        return {r.release: r for r in cls.get_available_releases()}.get(release_tag)
+    def get_available_releases(cls, ttl: float = RELEASE_INDEX_TTL):
+        return [cls._make_from_entry(entry) for entry in cls._update_index(ttl).newest_first()]
 
     @staticmethod
     def _make_release():  # pragma: no cover
         raise NotImplementedError
 
     @classmethod
-    def _make_releases(cls, index_response):
-        xmlns = "http://s3.amazonaws.com/doc/2006-03-01/"
+    def _make_from_entry(cls, entry: NightlyEntry):
+        release_data = cls._get_release_data(entry.key)
+        if release_data is None:
+            # Only builds with release data are indexed
+            raise RaidenClientError(f"{entry.key} is not a nightly build")
+        version_data, release_datetime = release_data
+        return cls(version_data, release_datetime, f"{cls.RELEASE_INDEX_URL}/{entry.key}")
 
-        def get_children_by_tag(node, tag):
-            return node.findall(f"{{{xmlns}}}{tag}", namespaces={"xmlns": xmlns})
-
-        tree = ElementTree.fromstring(index_response.content)
+    @classmethod
+    def _make_index_entry(cls, file_key: str) -> Optional[NightlyEntry]:
+        # The bucket holds the builds for all platforms
+        if not file_key.endswith(cls.FILE_NAME_SUFFIX):
+            return None
+        release_data = cls._get_release_data(file_key)
+        if release_data is None:
+            return None
+        version_data, release_datetime = release_data
+        return NightlyEntry(
+            key=file_key,
+            release_tag=cls._format_release(version_data, release_datetime),
+            release_datetime=release_datetime,
+        )
 
-        content_nodes = get_children_by_tag(tree, "Contents")
-        all_keys = [get_children_by_tag(node, "Key")[0].text for node in content_nodes]
+    @classmethod
+    def _get_listing_url(cls, start_after: Optional[str]) -> str:
+        query = {"list-type": "2", "prefix": cls.LISTING_PREFIX}
+        if start_after is not None:
+            query["start-after"] = start_after
+        return f"{cls.RELEASE_INDEX_URL}/?{urlencode(query)}"
 
-        releases = []
-        for file_key in all_keys:
-            release_data = cls._get_release_data(file_key)
-            if release_data:
-                version_data, release_datetime = release_data
-                releases.append(cls(version_data, release_datetime))
+    @classmethod
+    def _update_index(cls, ttl: float) -> NightlyIndex:
+        """ Adds the nightlies published since the index was last updated
 
-        return releases
+        Only the last known listing page and the ones after it are requested.
+        """
+        index = cls._index
+        with index.lock:
+            if index.refreshed_at is not None and time.monotonic() - index.refreshed_at < ttl:
+                return index
+
+            log.info("Updating list of nightly releases")
+            start_after = index.last_page_start_after
+            while True:
+                response = RELEASE_INDEX_CACHE.get(cls._get_listing_url(start_after), ttl=ttl)
+                page = parse_listing_page(response.content)
+                for file_key in page.keys:
+                    entry = cls._make_index_entry(file_key)
+                    if entry is not None:
+                        index.add(entry)
+                if not (page.is_truncated and page.keys):
+                    break
+                start_after = page.keys[-1]
+
+            index.last_page_start_after = start_after
+            # The listing is only as fresh as the cached response it came from
+            index.refreshed_at = time.monotonic() - response.age
+        return index
 
     @classmethod
     def _get_release_data(cls, file_key) -> Optional[Tuple[VersionData, datetime]]:
@@ -489,3 +446,165 @@ class RaidenNightly(RaidenClient):
             f"{version_data.revision}.{version_data.extra}-"
             f"{cls.FILE_NAME_SUFFIX}"
         )
+
+
+@dataclass
+class RaidenNode:
+    """ A Raiden client running with a configuration
+
+    Every configuration has a node of its own, with its own API port, so the
+    nodes of several accounts can run side by side.
+    """
+
+    client: RaidenClient
+    configuration_file: RaidenConfigurationFile
+
+    # Raiden serves its API there, unless the configuration says otherwise
+    DEFAULT_API_PORT = 5001
+    RAIDEN_API_STATUS_ENDPOINT = "/api/v1/status"
+
+    @property
+    def name(self) -> str:
+        address = to_checksum_address(self.configuration_file.account.address)
+        settings_name = self.configuration_file.settings.name
+        return f"{self.client.binary_name}-{address}-{settings_name}"
+
+    @property
+    def api_port(self) -> int:
+        return self.configuration_file.api_port or self.DEFAULT_API_PORT
+
+    @property
+    def web_ui_url(self) -> str:
+        return f"http://{RAIDEN_API_HOST}:{self.api_port}"
+
+    @property
+    def log_path(self) -> Path:
+        return NODE_LOG_FOLDER_PATH.joinpath(f"{self.name}.log")
+
+    @property
+    def node_log(self) -> NodeLog:
+        node_log = get_node_log(self.name)
+        if not node_log.is_following and self.log_path.exists() and self.is_running:
+            # The node was launched by a former wizard, only its latest lines matter
+            node_log.follow(self.log_path, from_start=False)
+        return node_log
+
+    @property
+    def is_running(self) -> bool:
+        return self._get_process() is not None
+
+    def _is_node_process(self, process) -> bool:
+        """ Recognizes the node when it was launched by an older wizard """
+        command_line = process.info["cmdline"] or []
+        return (
+            process.info["name"] == self.client.binary_name
+            and str(self.configuration_file.path) in command_line
+        )
+
+    def _get_process(self):
+        return PROCESS_TRACKER.get(self.name, matches=self._is_node_process)
+
+    def assign_api_port(self) -> int:
+        """ Allocates an API port to the configuration, unless its port can be used """
+        with PORT_ALLOCATION_LOCK:
+            api_port = self.configuration_file.api_port
+            if api_port is not None and (self.is_running or is_port_free(api_port)):
+                return api_port
+
+            reserved_ports = RaidenConfigurationFile.get_api_ports() - {api_port}
+            self.configuration_file.api_port = allocate_port(reserved_ports)
+            self.configuration_file.save()
+            log.info(f"{self.name} serves its API on port {self.configuration_file.api_port}")
+            return self.configuration_file.api_port
+
+    def launch(self, passphrase_file):
+        """ Starts the node, its output goes to ``log_path``
+
+        The log of the previous launch is kept next to it, with a ``.1`` suffix.
+        The node appends to its log, so that it can be rotated while it runs.
+        """
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.log_path.exists():
+            os.replace(self.log_path, self.log_path.with_name(f"{self.log_path.name}.1"))
+
+        with self.log_path.open("ab") as log_file:
+            proc = subprocess.Popen(
+                [
+                    str(self.client.install_path),
+                    "--config-file",
+                    str(self.configuration_file.path),
+                    "--password-file",
+                    str(passphrase_file),
+                    "--log-json",
+                ],
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+            )
+        PROCESS_TRACKER.track(self.name, proc)
+        get_node_log(self.name).follow(self.log_path)
+
+    def kill(self):
+        process = self._get_process()
+        if process is not None:
+            log.info(f"Killing process {process.pid}")
+            process.kill()
+            process.wait()
+            PROCESS_TRACKER.forget(self.name)
+        release_node_log(self.name)
+
+    async def get_status(self, http_client: AsyncHTTPClient) -> Optional[dict]:
+        """ Returns the response of the /status API, ``None`` while it is not reachable """
+        try:
+            response = await http_client.fetch(
+                self.web_ui_url + self.RAIDEN_API_STATUS_ENDPOINT,
+                request_timeout=RAIDEN_STATUS_TIMEOUT,
+            )
+            return json.loads(response.body)
+        except (OSError, HTTPClientError, ValueError):
+            return None
+
+    async def _sleep_while_running(self, delay: float):
+        deadline = time.monotonic() + delay
+        while True:
+            if not self.is_running:
+                raise RaidenClientError("client process terminated while waiting for web ui")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(min(remaining, RAIDEN_PROCESS_CHECK_INTERVAL))
+
+    async def wait_for_web_ui_ready(self, status_callback: Callable = None):
+        """
+        Params:
+            status_callback:  A function, that will receive the /status API responses before the
+                              status is `ready`, whenever the response changes.
+
+        The API is polled more and more slowly while its response stays the same,
+        the process is checked in between and waiting stops as soon as it exits.
+        """
+        if not self.is_running:
+            raise RuntimeError("Raiden is not running")
+
+        log.info("Waiting for raiden to start...")
+        http_client = AsyncHTTPClient()
+        last_status = None
+        interval = RAIDEN_STATUS_MIN_INTERVAL
+
+        while True:
+            status = await self.get_status(http_client)
+            if status is not None and status.get("status") == "ready":
+                return
+
+            if status != last_status:
+                last_status = status
+                interval = RAIDEN_STATUS_MIN_INTERVAL
+                if status is not None and status_callback is not None:
+                    status_callback(status)
+            else:
+                interval = min(interval * 2, RAIDEN_STATUS_MAX_INTERVAL)
+
+            await self._sleep_while_running(interval)
+
+    def get_process_id(self) -> Optional[int]:
+        process = self._get_process()
+        return process and process.pid
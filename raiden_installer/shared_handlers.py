@@ -1,37 +1,60 @@
+import asyncio
+import functools
 import json
 import os
 import sys
+import threading
 import time
 import webbrowser
 from glob import glob
 from pathlib import Path
 from re import search
-from typing import Optional
+from typing import Optional, Set
 
 import tornado.ioloop
 import wtforms
 from eth_utils import to_canonical_address, to_checksum_address
+from requests.exceptions import RequestException
 from tornado.netutil import bind_sockets
-from tornado.web import Application, HTTPServer, RequestHandler, url
-from tornado.websocket import WebSocketHandler
+from tornado.web import Application, HTTPError, HTTPServer, RequestHandler, url
+from tornado.websocket import WebSocketClosedError, WebSocketHandler
 from wtforms.validators import EqualTo
 from wtforms_tornado import Form
 
 from raiden_contracts.contract_manager import ContractManager, contracts_precompiled_path
 from raiden_installer import get_resource_folder_path, load_settings, log
 from raiden_installer.account import Account, find_keystore_folder_path
+from raiden_installer.balance_watch import get_balance_watcher, get_balances
 from raiden_installer.base import RaidenConfigurationFile
-from raiden_installer.constants import RAMP_API_KEY
+from raiden_installer.constants import CONNECTION_ACTIONS, DOWNLOAD_PROGRESS_STEP, RAMP_API_KEY
+from raiden_installer.download import DownloadError, DownloadProgress
 from raiden_installer.ethereum_rpc import Infura, make_web3_provider
+from raiden_installer.http_cache import NotCachedError
 from raiden_installer.network import Network
-from raiden_installer.raiden import RaidenClient, RaidenClientError, temporary_passphrase_file
-from raiden_installer.tokens import Erc20Token, RequiredAmounts
-from raiden_installer.transactions import (
-    deposit_service_tokens,
-    get_token_balance,
-    get_token_deposit,
-    get_total_token_owned,
+from raiden_installer.node_logs import LogEvent, NodeLog
+from raiden_installer.ports import PortAllocationError
+from raiden_installer.prefetch import start_prefetch
+from raiden_installer.raiden import (
+    RaidenClient,
+    RaidenClientError,
+    RaidenNode,
+    temporary_passphrase_file,
 )
+from raiden_installer.supervisor import SUPERVISORS, stop_supervising, supervise
+from raiden_installer.task_sessions import (
+    TASK_SESSIONS,
+    TaskSession,
+    TaskSessionError,
+    TaskState,
+)
+from raiden_installer.tasks import (
+    TASK_SESSION_EXECUTOR,
+    TaskCancelled,
+    run_blocking,
+    run_blocking_on,
+)
+from raiden_installer.tokens import RequiredAmounts
+from raiden_installer.transactions import deposit_service_tokens, get_token_deposit
 from raiden_installer.utils import (
     check_eth_node_responsivity,
     recover_ld_library_env_path,
@@ -89,13 +112,162 @@ class AsyncTaskHandler(WebSocketHandler):
             "setup": self._run_setup,
             "unlock": self._run_unlock,
             "create_wallet": self._run_create_wallet,
+            "attach": self._run_attach,
+            "watch_balances": self._run_watch_balances,
         }
-
-    def on_message(self, message):
+        # Actions running as task sessions, which go on when the connection closes
+        self.durable_actions: Set[str] = set()
+        self.running_sessions: Set[asyncio.Future] = set()
+        # The task session of the action running in the current thread, if any
+        self.session_state = threading.local()
+        self.node_log_subscriptions = []
+        self.task_subscriptions = []
+        self.balance_subscriptions = []
+        self.io_loop = tornado.ioloop.IOLoop.current()
+        self.io_loop_thread_id = threading.get_ident()
+        # Set when the connection closes, cancels the running actions
+        self.cancelled = threading.Event()
+        self.running_actions: Set[asyncio.Future] = set()
+
+    def on_close(self):
+        self.cancelled.set()
+        for running_action in list(self.running_actions):
+            running_action.cancel()
+        self.running_actions.clear()
+        for node_log, subscriber in self.node_log_subscriptions:
+            node_log.unsubscribe(subscriber)
+        self.node_log_subscriptions.clear()
+        for task_session, subscriber in self.task_subscriptions:
+            task_session.unsubscribe(subscriber)
+        self.task_subscriptions.clear()
+        for watcher, subscriber in self.balance_subscriptions:
+            watcher.unsubscribe(subscriber)
+        self.balance_subscriptions.clear()
+
+    async def on_message(self, message):
+        """ Starts the requested action, without waiting for it to finish
+
+        Tornado reads the next message of the connection, including its close,
+        only once this returns. So the actions run on their own: coroutine
+        actions on the IOLoop, any other action on the task thread pool. Up to
+        ``CONNECTION_ACTIONS`` run at once, they are cancelled when the
+        connection closes. Durable actions run as task sessions, which are
+        neither limited nor cancelled when the connection closes.
+        """
         data = json.loads(message)
         method = data.pop("method", None)
         action = method and self.actions.get(method)
-        return action and action(**data)
+        if not action:
+            return
+
+        if method in self.durable_actions:
+            running_session = asyncio.ensure_future(self._start_task_session(method, action, data))
+            self.running_sessions.add(running_session)
+            running_session.add_done_callback(self.running_sessions.discard)
+            return
+
+        if len(self.running_actions) >= CONNECTION_ACTIONS:
+            self._send_error_message(f"Too many actions running, {method} is rejected")
+            return
+
+        if asyncio.iscoroutinefunction(action):
+            running_action = asyncio.ensure_future(action(**data))
+        else:
+            running_action = asyncio.ensure_future(self._run_blocking(action, **data))
+        self.running_actions.add(running_action)
+        running_action.add_done_callback(functools.partial(self._finish_action, method))
+
+    def _finish_action(self, method: str, running_action: asyncio.Future):
+        self.running_actions.discard(running_action)
+        if running_action.cancelled():
+            log.info(f"Cancelled {method}, the connection was closed")
+            return
+        exc = running_action.exception()
+        if isinstance(exc, TaskCancelled):
+            log.info(f"Cancelled {method}, the connection was closed")
+        elif exc is not None:
+            log.error(f"{method} failed", exc_info=exc)
+
+    async def _run_blocking(self, func, *args, **kwargs):
+        return await run_blocking(self.cancelled, func, *args, **kwargs)
+
+    async def _start_task_session(self, method, action, data):
+        try:
+            task_session, created = TASK_SESSIONS.start(method, data)
+        except TaskSessionError as exc:
+            self._send_error_message(str(exc))
+            return
+
+        self._attach_task_session(task_session)
+        if not created:
+            log.info(f"{method} is already running as task {task_session.id}, attached to it")
+            return
+
+        def run_action():
+            # Messages of the action go to the task session, which passes them on
+            self.session_state.task_session = task_session
+            try:
+                task_session.set_state(TaskState.RUNNING)
+                action(**data)
+            finally:
+                self.session_state.task_session = None
+
+        state = TaskState.FAILED
+        try:
+            # The session is not cancelled by closing the connection
+            await run_blocking_on(TASK_SESSION_EXECUTOR, threading.Event(), run_action)
+            if not task_session.has_errors:
+                state = TaskState.SUCCEEDED
+        except Exception as exc:
+            log.exception(f"Task {task_session.id} failed")
+            task_session.record({"type": "error-message", "text": [f"{method} failed: {exc}"]})
+        finally:
+            task_session.set_state(state)
+
+    def _attach_task_session(self, task_session: TaskSession, last_seq: int = 0):
+        """ Passes on the messages of the session, starting with the ones after ``last_seq`` """
+
+        def subscriber(message):
+            # Called from the thread running the action
+            self.io_loop.add_callback(self._write_to_connection, message, False)
+
+        for message in task_session.subscribe(subscriber, last_seq):
+            self._write_to_connection(message, False)
+        self.task_subscriptions.append((task_session, subscriber))
+
+    async def _run_attach(self, **kw):
+        task_id = kw.get("task_id")
+        task_session = TASK_SESSIONS.get(task_id) if task_id else None
+        if task_session is None:
+            self.write_message({"type": "task-state", "task_id": task_id, "state": None})
+            return
+        try:
+            last_seq = int(kw.get("last_seq", 0))
+        except (TypeError, ValueError):
+            last_seq = 0
+        self._attach_task_session(task_session, last_seq)
+
+    def write_message(self, message, binary=False):
+        """ Writes on the IOLoop, also when called from an action on the task thread pool
+
+        Messages of an action running as task session are recorded by the
+        session, which passes them on to the attached connections.
+        """
+        task_session = getattr(self.session_state, "task_session", None)
+        if task_session is not None:
+            if not isinstance(message, dict):
+                message = json.loads(message)
+            task_session.record(message)
+            return
+        if threading.get_ident() == self.io_loop_thread_id:
+            return super().write_message(message, binary)
+        self.io_loop.add_callback(self._write_to_connection, message, binary)
+
+    def _write_to_connection(self, message, binary):
+        try:
+            super().write_message(message, binary)
+        except WebSocketClosedError:
+            pass
 
     def _send_status_update(self, message_text, icon=None):
         if not isinstance(message_text, list):
@@ -118,6 +290,24 @@ class AsyncTaskHandler(WebSocketHandler):
         self.write_message(json.dumps({"type": "redirect", "redirect_url": redirect_url}))
         log.info(f"Redirecting to {redirect_url}")
 
+    def _make_download_progress_callback(self, raiden_client):
+        reported_steps = set()
+
+        def send_progress(progress: DownloadProgress):
+            # The callback fires every megabyte, only report every few percent
+            if progress.percentage is None:
+                megabytes = progress.downloaded // 2 ** 20
+                step, text = megabytes // DOWNLOAD_PROGRESS_STEP, f"{megabytes} MB"
+            else:
+                step = progress.percentage // DOWNLOAD_PROGRESS_STEP
+                text = f"{progress.percentage}%"
+
+            if step not in reported_steps:
+                reported_steps.add(step)
+                self._send_status_update(f"Downloading raiden {raiden_client.release}: {text}")
+
+        return send_progress
+
     def _deposit_to_udc(self, w3, account, service_token, deposit_amount):
         self._send_status_update(
             f"Making deposit of {deposit_amount.formatted} to the "
@@ -193,38 +383,128 @@ class AsyncTaskHandler(WebSocketHandler):
         else:
             self._send_error_message(f"Failed to create account. Error: {form.errors}")
 
-    def _run_launch(self, **kw):
+    def _send_log_event(self, event: LogEvent):
+        try:
+            self.write_message(json.dumps({"type": "log-event", **event.to_dict()}))
+        except WebSocketClosedError:
+            pass
+
+    def _subscribe_node_log(self, node_log: NodeLog):
+        """ Streams the node log to the client, starting with the lines logged before """
+        io_loop = tornado.ioloop.IOLoop.current()
+
+        def subscriber(event):
+            # Called from the thread reading the node output
+            io_loop.add_callback(self._send_log_event, event)
+
+        for event in node_log.subscribe(subscriber):
+            self._send_log_event(event)
+        self.node_log_subscriptions.append((node_log, subscriber))
+
+    def _send_balance_update(self, configuration_file_name, balance):
+        # Not part of the progress of a task session, which may be running meanwhile
+        message = {
+            "type": "balance-update",
+            "configuration_file_name": configuration_file_name,
+            "balance": balance,
+        }
+        self._write_to_connection(message, False)
+
+    async def _run_watch_balances(self, **kw):
+        """ Pushes the balances of the configuration, and from then on the ones that changed """
+        try:
+            configuration_file = RaidenConfigurationFile.get_by_filename(
+                kw.get("configuration_file_name")
+            )
+        except (ValueError, TypeError) as exc:
+            self._send_error_message(f"Invalid request: {exc}")
+            return
+
+        file_name = configuration_file.file_name
+        watcher = get_balance_watcher(configuration_file)
+
+        def subscriber(balance):
+            self._send_balance_update(file_name, balance)
+
+        balance = watcher.subscribe(subscriber)
+        if balance is not None:
+            self._send_balance_update(file_name, balance)
+        self.balance_subscriptions.append((watcher, subscriber))
+
+    def _send_raiden_status(self, status):
+        blocks_to_sync = status.get("blocks_to_sync")
+        if blocks_to_sync is not None:
+            self._send_status_update(f"Raiden is syncing, {blocks_to_sync} blocks to go")
+        else:
+            self._send_status_update(f"Raiden is {status.get('status', 'starting')}")
+
+    async def _run_launch(self, **kw):
         configuration_file_name = kw.get("configuration_file_name")
         configuration_file = RaidenConfigurationFile.get_by_filename(configuration_file_name)
         account = configuration_file.account
-        try_unlock(account)
-        if account.passphrase is None:
+        await self._run_blocking(try_unlock, account)
+        passphrase = account.passphrase
+        if passphrase is None:
             self._send_error_message("Failed to unlock account! Please reload page")
             return
 
-        raiden_client = RaidenClient.get_client(self.installer_settings)
+        try:
+            raiden_client = await self._run_blocking(
+                RaidenClient.get_client, self.installer_settings
+            )
+        except NotCachedError as exc:
+            self._send_error_message(f"Could not find raiden release: {exc}")
+            return
+
         if not raiden_client.is_installed:
             self._send_status_update(f"Downloading and installing raiden {raiden_client.release}")
-            raiden_client.install()
+            try:
+                await self._run_blocking(
+                    raiden_client.install,
+                    progress_callback=self._make_download_progress_callback(raiden_client),
+                )
+            except (DownloadError, RequestException) as exc:
+                self._send_error_message(f"Failed to install raiden: {exc}")
+                return
             self._send_status_update("Installation complete")
 
         self._send_status_update(
             "Launching Raiden, this might take a couple of minutes, do not close the browser"
         )
 
-        with temporary_passphrase_file(get_passphrase()) as passphrase_file:
-            if not raiden_client.is_running:
-                raiden_client.launch(configuration_file, passphrase_file)
-
+        raiden_node = RaidenNode(raiden_client, configuration_file)
+        with temporary_passphrase_file(passphrase) as passphrase_file:
             try:
-                raiden_client.wait_for_web_ui_ready(
-                    status_callback=lambda stat: log.info(str(stat))
+                node_log = await self._run_blocking(
+                    self._launch_unless_running, raiden_node, passphrase_file
                 )
+            except PortAllocationError as exc:
+                self._send_error_message(f"Failed to launch raiden: {exc}")
+                return
+            self._subscribe_node_log(node_log)
+
+            try:
+                await raiden_node.wait_for_web_ui_ready(status_callback=self._send_raiden_status)
+                supervise(raiden_node, passphrase)
                 self._send_task_complete("Raiden is ready!")
-                self._send_redirect(RaidenClient.WEB_UI_INDEX_URL)
+                self._send_redirect(raiden_node.web_ui_url)
             except (RaidenClientError, RuntimeError) as exc:
                 self._send_error_message(f"Raiden process failed to start: {exc}")
-                raiden_client.kill()
+                stop_supervising(raiden_node)
+                # Killed also when the connection was closed meanwhile
+                await run_blocking(threading.Event(), raiden_node.kill)
+
+    @staticmethod
+    def _launch_unless_running(raiden_node: RaidenNode, passphrase_file) -> NodeLog:
+        """ Launches the node on its API port, unless it runs already, and returns its log
+
+        Looking for the process and launching it block, so this runs on the task
+        thread pool.
+        """
+        if not raiden_node.is_running:
+            raiden_node.assign_api_port()
+            raiden_node.launch(passphrase_file)
+        return raiden_node.node_log
 
 
 class BaseRequestHandler(RequestHandler):
@@ -391,48 +671,34 @@ class GasPriceHandler(APIHandler):
 class ConfigurationItemAPIHandler(APIHandler):
     def get(self, configuration_file_name):
         configuration_file = RaidenConfigurationFile.get_by_filename(configuration_file_name)
-        network = configuration_file.network.name
-
         account = configuration_file.account
 
         try_unlock(account)
         w3 = make_web3_provider(configuration_file.ethereum_client_rpc_endpoint, account)
 
-        settings = configuration_file.settings
-        required = RequiredAmounts.from_settings(settings)
-        service_token = Erc20Token.find_by_ticker(required.service_token.ticker, network)
-        transfer_token = Erc20Token.find_by_ticker(required.transfer_token.ticker, network)
-
-        service_token_balance = get_total_token_owned(
-            w3=w3, account=configuration_file.account, token=service_token
-        )
-        transfer_token_balance = get_token_balance(
-            w3=w3, account=configuration_file.account, token=transfer_token
-        )
-        eth_balance = configuration_file.account.get_ethereum_balance(w3)
-
-        def serialize_balance(balance_amount):
-            return (
-                {"as_wei": balance_amount.as_wei, "formatted": balance_amount.formatted}
-                if balance_amount
-                else None
-            )
-
         self.render_json(
             {
                 "file_name": configuration_file.file_name,
                 "account": to_checksum_address(configuration_file.account.address),
                 "network": configuration_file.network.name,
-                "balance": {
-                    "ETH": serialize_balance(eth_balance),
-                    "service_token": serialize_balance(service_token_balance),
-                    "transfer_token": serialize_balance(transfer_token_balance),
-                },
+                "balance": get_balances(w3, configuration_file),
                 "_initial_funding_txhash": configuration_file._initial_funding_txhash,
             }
         )
 
 
+class TelemetryAPIHandler(APIHandler):
+    def get(self):
+        try:
+            since = float(self.get_argument("since", "0"))
+        except ValueError:
+            raise HTTPError(400, "since must be a timestamp")
+
+        self.render_json(
+            {name: supervisor.to_dict(since) for name, supervisor in SUPERVISORS.items()}
+        )
+
+
 def create_app(settings_name: str, additional_handlers: list) -> Application:
     log.info("Starting web server")
 
@@ -451,6 +717,7 @@ def create_app(settings_name: str, additional_handlers: list) -> Application:
             ConfigurationItemAPIHandler,
             name="api-configuration-detail",
         ),
+        url(r"/api/telemetry", TelemetryAPIHandler, name="api-telemetry"),
     ]
 
     settings = load_settings(settings_name)
@@ -473,6 +740,8 @@ def run_server(app: Application, port: int):  # pragma: no cover
     local_url = f"http://localhost:{socket_port}"
     log.info(f"Installer page ready on {local_url}")
 
+    start_prefetch(app.settings["installer_settings"])
+
     if not DEBUG:
         log.info("Should open automatically in browser...")
         recover_ld_library_env_path()
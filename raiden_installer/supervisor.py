@@ -0,0 +1,217 @@
+""" Supervision of launched Raiden nodes
+
+A supervisor runs on the IOLoop next to the node it launched. It samples the
+resource usage of the node together with its /status API response, keeping
+the last samples as a time series. Looking for the process and measuring it
+runs on the task thread pool. When the node exits abnormally, or its sync
+stops making progress, it is launched again, waiting longer after every
+failure until it has been running stably for a while.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+
+import psutil
+from tornado.httpclient import AsyncHTTPClient
+
+from raiden_installer import log
+from raiden_installer.constants import (
+    RAIDEN_STATUS_MIN_INTERVAL,
+    SUPERVISOR_RESTART_MAX_DELAY,
+    SUPERVISOR_RESTART_MIN_DELAY,
+    SUPERVISOR_STABLE_UPTIME,
+    SYNC_STALL_TIMEOUT,
+    TELEMETRY_HISTORY_SIZE,
+    TELEMETRY_SAMPLE_INTERVAL,
+)
+from raiden_installer.node_logs import get_node_log, release_node_log
+from raiden_installer.processes import PROCESS_TRACKER
+from raiden_installer.raiden import RaidenNode, temporary_passphrase_file
+from raiden_installer.tasks import run_blocking
+
+
+@dataclass(frozen=True)
+class ResourceSample:
+    timestamp: float
+    cpu_percent: float
+    rss: int
+    open_files: Optional[int]
+    status: Optional[str]
+    blocks_to_sync: Optional[int]
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def measure_process(process: psutil.Process) -> Tuple[float, int, Optional[int]]:
+    """ Returns the cpu usage since the last call, the rss and the number of open fds """
+    with process.oneshot():
+        cpu_percent = process.cpu_percent()
+        rss = process.memory_info().rss
+        if hasattr(process, "num_fds"):
+            open_files = process.num_fds()
+        else:
+            open_files = process.num_handles()
+    return cpu_percent, rss, open_files
+
+
+class RaidenSupervisor:
+    def __init__(
+        self,
+        raiden_node: RaidenNode,
+        passphrase: str,
+        sample_interval: float = TELEMETRY_SAMPLE_INTERVAL,
+        history_size: int = TELEMETRY_HISTORY_SIZE,
+    ):
+        self.raiden_node = raiden_node
+        self.passphrase = passphrase
+        self.sample_interval = sample_interval
+        self.samples: deque = deque(maxlen=history_size)
+        self.restarts = 0
+        self.sync_stalled = False
+        self._failures = 0
+        self._launched_at = time.monotonic()
+        self._sync_progress: Optional[Tuple[int, float]] = None
+        self._task: Optional[asyncio.Future] = None
+        self._stopped = threading.Event()
+
+    @property
+    def name(self) -> str:
+        return self.raiden_node.name
+
+    @property
+    def is_supervising(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        self._task = asyncio.ensure_future(self.run())
+
+    def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    def get_samples(self, since: float = 0) -> List[ResourceSample]:
+        return [sample for sample in self.samples if sample.timestamp > since]
+
+    def to_dict(self, since: float = 0):
+        return {
+            "supervising": self.is_supervising,
+            "restarts": self.restarts,
+            "sync_stalled": self.sync_stalled,
+            "samples": [sample.to_dict() for sample in self.get_samples(since)],
+        }
+
+    async def run(self):
+        http_client = AsyncHTTPClient()
+        while True:
+            process = await run_blocking(self._stopped, PROCESS_TRACKER.get, self.name)
+            if process is None:
+                exit_code = PROCESS_TRACKER.get_exit_code(self.name)
+                if exit_code == 0:
+                    log.info(f"{self.name} has been shut down, no longer supervising it")
+                    release_node_log(self.name)
+                    return
+                # The relaunch follows the log again
+                get_node_log(self.name).stop_following()
+                await self._restart(f"exited with code {exit_code}", http_client)
+                continue
+
+            status = await self.raiden_node.get_status(http_client)
+            try:
+                measurement = await run_blocking(self._stopped, measure_process, process)
+            except psutil.Error:
+                # The process exited meanwhile, which is handled on the next iteration
+                pass
+            else:
+                self._record_sample(measurement, status)
+
+            if self.sync_stalled:
+                await run_blocking(self._stopped, self.raiden_node.kill)
+                await self._restart("stopped making progress syncing", http_client)
+                continue
+            await asyncio.sleep(self.sample_interval)
+
+    def _record_sample(
+        self, measurement: Tuple[float, int, Optional[int]], status: Optional[dict]
+    ):
+        cpu_percent, rss, open_files = measurement
+        status = status or {}
+        blocks_to_sync = status.get("blocks_to_sync")
+        self._check_sync_progress(status.get("status"), blocks_to_sync)
+        self.samples.append(
+            ResourceSample(
+                timestamp=time.time(),
+                cpu_percent=cpu_percent,
+                rss=rss,
+                open_files=open_files,
+                status=status.get("status"),
+                blocks_to_sync=blocks_to_sync,
+            )
+        )
+
+    def _check_sync_progress(self, status: Optional[str], blocks_to_sync: Optional[int]):
+        if status != "syncing" or blocks_to_sync is None:
+            self._sync_progress = None
+            self.sync_stalled = False
+            return
+
+        now = time.monotonic()
+        if self._sync_progress is None or blocks_to_sync < self._sync_progress[0]:
+            self._sync_progress = (blocks_to_sync, now)
+
+        sync_stalled = now - self._sync_progress[1] >= SYNC_STALL_TIMEOUT
+        if sync_stalled and not self.sync_stalled:
+            log.warning(f"{self.name} has been syncing without progress, {blocks_to_sync} to go")
+        self.sync_stalled = sync_stalled
+
+    async def _restart(self, reason: str, http_client: AsyncHTTPClient):
+        if time.monotonic() - self._launched_at >= SUPERVISOR_STABLE_UPTIME:
+            self._failures = 0
+        delay = min(
+            SUPERVISOR_RESTART_MIN_DELAY * 2 ** self._failures, SUPERVISOR_RESTART_MAX_DELAY
+        )
+        self._failures += 1
+
+        log.warning(f"{self.name} {reason}, restarting it in {delay}s")
+        await asyncio.sleep(delay)
+
+        self._launched_at = time.monotonic()
+        self._sync_progress = None
+        self.sync_stalled = False
+        with temporary_passphrase_file(self.passphrase) as passphrase_file:
+            try:
+                await run_blocking(self._stopped, self.raiden_node.launch, passphrase_file)
+            except OSError as exc:
+                log.error(f"Failed to restart {self.name}: {exc}")
+                return
+            self.restarts += 1
+            # The passphrase file is read before the API starts
+            await self._wait_for_api(http_client)
+
+    async def _wait_for_api(self, http_client: AsyncHTTPClient):
+        while self.raiden_node.is_running:
+            if await self.raiden_node.get_status(http_client) is not None:
+                return
+            await asyncio.sleep(RAIDEN_STATUS_MIN_INTERVAL)
+
+
+SUPERVISORS: Dict[str, RaidenSupervisor] = {}
+
+
+def supervise(raiden_node: RaidenNode, passphrase: str) -> RaidenSupervisor:
+    """ Starts supervising the node, replacing a former supervisor of it """
+    stop_supervising(raiden_node)
+    supervisor = RaidenSupervisor(raiden_node, passphrase)
+    SUPERVISORS[supervisor.name] = supervisor
+    supervisor.start()
+    return supervisor
+
+
+def stop_supervising(raiden_node: RaidenNode):
+    supervisor = SUPERVISORS.get(raiden_node.name)
+    if supervisor is not None:
+        supervisor.stop()
@@ -0,0 +1,279 @@
+""" Splits large swaps over several exchanges
+
+Buying a large amount on a single exchange moves its price considerably. The
+router reads the quote curves of all exchanges for one block and divides the
+amount so that the total cost (including the gas of every leg) is minimal.
+"""
+import heapq
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import List, Optional, Sequence, Tuple, Type
+
+import structlog
+from requests.exceptions import RequestException
+from web3 import Web3
+
+from raiden_installer.account import Account
+from raiden_installer.constants import SPLIT_ROUTE_STEPS
+from raiden_installer.token_exchange import (
+    Exchange,
+    ExchangeError,
+    QuoteCurve,
+    TransactionCosts,
+)
+from raiden_installer.tokens import EthereumAmount, TokenAmount, Wei
+from raiden_installer.utils import wait_for_transaction
+
+log = structlog.get_logger()
+
+
+def _get_total_cost(
+    amounts: Sequence[int], curves: Sequence[QuoteCurve], fixed_costs: Sequence[int]
+) -> Optional[int]:
+    total = 0
+    for amount, curve, fixed_cost in zip(amounts, curves, fixed_costs):
+        if amount == 0:
+            continue
+        cost = curve(amount)
+        if cost is None:
+            return None
+        total += cost + fixed_cost
+    return total
+
+
+def find_best_split(
+    total_amount: int,
+    curves: Sequence[QuoteCurve],
+    fixed_costs: Sequence[int],
+    steps: int = SPLIT_ROUTE_STEPS,
+) -> Optional[List[int]]:
+    """ Divides ``total_amount`` over the curves so that the total cost is minimal
+
+    The amount is split into ``steps`` equal chunks which are handed out one
+    by one to the curve with the lowest marginal cost. As buying more always
+    gets more expensive (the curves are convex), this finds the best split on
+    that grid with ``steps`` curve evaluations. Because of the fixed (gas)
+    costs of every leg, using a single exchange is considered as well.
+
+    Returns the amount per curve, or ``None`` if the amount can not be bought.
+    """
+    if total_amount <= 0 or not curves:
+        return None
+
+    chunk_amounts = [total_amount * step // steps for step in range(steps + 1)]
+
+    def marginal_cost(index: int, step: int) -> Optional[int]:
+        amount, next_amount = chunk_amounts[step], chunk_amounts[step + 1]
+        cost = curves[index](amount) if amount else 0
+        next_cost = curves[index](next_amount)
+        if cost is None or next_cost is None:
+            return None
+        return next_cost - cost
+
+    allocated_steps = [0] * len(curves)
+    heap: List[Tuple[int, int]] = []
+    for index in range(len(curves)):
+        cost = marginal_cost(index, 0)
+        if cost is not None:
+            heapq.heappush(heap, (cost, index))
+
+    for _ in range(steps):
+        if not heap:
+            break
+        _, index = heapq.heappop(heap)
+        allocated_steps[index] += 1
+        if allocated_steps[index] < steps:
+            cost = marginal_cost(index, allocated_steps[index])
+            if cost is not None:
+                heapq.heappush(heap, (cost, index))
+
+    candidates = []
+    if sum(allocated_steps) == steps:
+        candidates.append([chunk_amounts[allocated] for allocated in allocated_steps])
+    for index in range(len(curves)):
+        single = [0] * len(curves)
+        single[index] = total_amount
+        candidates.append(single)
+
+    best_amounts, best_cost = None, None
+    for amounts in candidates:
+        # Chunk boundaries are rounded down, the remainder goes to the largest leg
+        amounts[amounts.index(max(amounts))] += total_amount - sum(amounts)
+        cost = _get_total_cost(amounts, curves, fixed_costs)
+        if cost is not None and (best_cost is None or cost < best_cost):
+            best_amounts, best_cost = amounts, cost
+
+    return best_amounts
+
+
+@dataclass(frozen=True)
+class RouteLeg:
+    exchange: Exchange
+    token_amount: TokenAmount
+    eth_cost: EthereumAmount
+    gas_cost: EthereumAmount
+
+
+@dataclass(frozen=True)
+class SwapRoute:
+    legs: Tuple[RouteLeg, ...]
+    block_number: int
+
+    @property
+    def total(self) -> EthereumAmount:
+        return EthereumAmount(
+            Wei(sum(leg.eth_cost.as_wei + leg.gas_cost.as_wei for leg in self.legs))
+        )
+
+    def describe_legs(self) -> str:
+        legs = [f"{leg.token_amount.formatted} at {leg.exchange.name}" for leg in self.legs]
+        return ", ".join(legs)
+
+
+@dataclass(frozen=True)
+class SwapReport:
+    route: SwapRoute
+    transaction_hashes: Tuple[bytes, ...]
+    quoted_total: EthereumAmount
+    realized_total: EthereumAmount
+
+    @property
+    def slippage(self) -> Decimal:
+        """ Relative difference of the realized and the quoted costs """
+        if self.quoted_total.value == 0:
+            return Decimal(0)
+        return (self.realized_total.value - self.quoted_total.value) / self.quoted_total.value
+
+
+class PartialSwapError(ExchangeError):
+    """ Some legs of a route were sent, the ones after them failed """
+
+    def __init__(self, message: str, report: SwapReport):
+        super().__init__(message)
+        self.report = report
+
+
+class SplitRouter:
+    def __init__(self, w3: Web3, exchanges: Sequence[Exchange], steps: int = SPLIT_ROUTE_STEPS):
+        self.w3 = w3
+        self.exchanges = exchanges
+        self.steps = steps
+
+    @classmethod
+    def from_exchange_classes(
+        cls, w3: Web3, exchange_classes: Sequence[Type[Exchange]]
+    ) -> "SplitRouter":
+        """ Creates a router over the exchanges available on the network of ``w3`` """
+        exchanges = []
+        for exchange_class in exchange_classes:
+            try:
+                exchanges.append(exchange_class(w3=w3))
+            except (ExchangeError, RequestException, KeyError, ValueError) as exc:
+                log.warn(f"Can not route over {exchange_class.__name__}: {exc}")
+        return cls(w3, exchanges)
+
+    def get_route(
+        self,
+        token_amount: TokenAmount,
+        gas_price: Optional[Wei] = None,
+        block_number: Optional[int] = None,
+    ) -> SwapRoute:
+        if block_number is None:
+            block_number = self.w3.eth.blockNumber
+        if gas_price is None:
+            gas_price = Wei(self.w3.eth.generateGasPrice() or self.w3.eth.gasPrice)
+
+        exchanges, curves = [], []
+        for exchange in self.exchanges:
+            try:
+                curves.append(exchange.get_quote_curve(token_amount.currency, block_number))
+                exchanges.append(exchange)
+            except (ExchangeError, RequestException, ValueError) as exc:
+                log.warn(f"Can not route {token_amount.ticker} over {exchange.name}: {exc}")
+
+        fixed_costs = [exchange.ESTIMATED_SWAP_GAS * gas_price for exchange in exchanges]
+        amounts = find_best_split(int(token_amount.as_wei), curves, fixed_costs, self.steps)
+        if amounts is None:
+            raise ExchangeError(f"No route can provide {token_amount.formatted} at the moment")
+
+        legs = []
+        for exchange, curve, fixed_cost, amount in zip(exchanges, curves, fixed_costs, amounts):
+            eth_cost = curve(amount) if amount > 0 else None
+            if eth_cost is None:
+                continue
+            legs.append(
+                RouteLeg(
+                    exchange=exchange,
+                    token_amount=TokenAmount(Wei(amount), token_amount.currency),
+                    eth_cost=EthereumAmount(Wei(eth_cost)),
+                    gas_cost=EthereumAmount(Wei(fixed_cost)),
+                )
+            )
+        return SwapRoute(legs=tuple(legs), block_number=block_number)
+
+    def execute(self, route: SwapRoute, account: Account) -> SwapReport:
+        """ Sends the transactions of all legs and waits until they are confirmed
+
+        The transactions are sent back to back with consecutive nonces, so the
+        legs are confirmed in the same blocks instead of one after the other.
+        If sending a leg fails, the legs sent before are still waited for, and
+        ``PartialSwapError`` reports them.
+        """
+        leg_costs: List[TransactionCosts] = [
+            leg.exchange.calculate_transaction_costs(leg.token_amount, account)
+            for leg in route.legs
+        ]
+        needed_funds = EthereumAmount(Wei(sum(costs.total.as_wei for costs in leg_costs)))
+        balance_before_swap = account.get_ethereum_balance(self.w3)
+        if needed_funds > balance_before_swap:
+            raise ExchangeError(
+                f"Not enough ETH. {balance_before_swap.formatted} available, but "
+                f"{needed_funds.formatted} needed"
+            )
+
+        nonce = self.w3.eth.getTransactionCount(account.address, "pending")
+        transaction_hashes: List[bytes] = []
+        try:
+            for index, (leg, costs) in enumerate(zip(route.legs, leg_costs)):
+                transaction_hashes.append(
+                    leg.exchange.buy_tokens(account, leg.token_amount, costs, nonce=nonce + index)
+                )
+        except Exception as exc:
+            if not transaction_hashes:
+                raise
+            sent_route = SwapRoute(
+                legs=route.legs[: len(transaction_hashes)], block_number=route.block_number
+            )
+            report = self._wait_for_legs(
+                sent_route, transaction_hashes, account, balance_before_swap
+            )
+            raise PartialSwapError(
+                f"Only bought {sent_route.describe_legs()}, the next leg failed: {exc}", report
+            ) from exc
+
+        report = self._wait_for_legs(route, transaction_hashes, account, balance_before_swap)
+        log.info(
+            "split swap complete",
+            legs=route.describe_legs(),
+            quoted=report.quoted_total.formatted,
+            realized=report.realized_total.formatted,
+        )
+        return report
+
+    def _wait_for_legs(
+        self,
+        route: SwapRoute,
+        transaction_hashes: Sequence[bytes],
+        account: Account,
+        balance_before_swap: EthereumAmount,
+    ) -> SwapReport:
+        for transaction_hash in transaction_hashes:
+            wait_for_transaction(self.w3, transaction_hash)
+
+        balance_after_swap = account.get_ethereum_balance(self.w3)
+        return SwapReport(
+            route=route,
+            transaction_hashes=tuple(transaction_hashes),
+            quoted_total=route.total,
+            realized_total=balance_before_swap - balance_after_swap,
+        )
@@ -0,0 +1,208 @@
+""" Websocket actions which outlive their connection
+
+Swaps, deposits and fundings wait for transactions, which keep going when the
+browser reloads or the websocket drops. These actions run as task sessions:
+every message they send is numbered and appended to a progress log on disk,
+so a client attaching to the session again gets the messages it missed. A
+session is identified by its action and configuration file, submitting the
+same action again joins the running session instead of repeating its
+transactions.
+
+The arguments of an action are stored in its progress log, so actions
+receiving a passphrase cannot run as task sessions.
+"""
+import json
+import re
+import threading
+import time
+import uuid
+from enum import Enum
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from raiden_installer import log
+from raiden_installer.constants import TASK_FOLDER_PATH, TASK_SESSION_TTL
+
+TASK_ID_PATTERN = re.compile("[0-9a-f]{32}")
+
+
+class TaskSessionError(Exception):
+    pass
+
+
+class TaskState(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    # The wizard stopped while the session was running
+    INTERRUPTED = "interrupted"
+
+
+TRANSITIONS = {
+    TaskState.PENDING: {TaskState.RUNNING, TaskState.FAILED, TaskState.INTERRUPTED},
+    TaskState.RUNNING: {TaskState.SUCCEEDED, TaskState.FAILED, TaskState.INTERRUPTED},
+}
+
+MessageSubscriber = Callable[[dict], None]
+
+
+def is_error_message(message: dict) -> bool:
+    return message.get("type") == "error-message" or message.get("icon") == "error"
+
+
+class TaskSession:
+    def __init__(self, task_id: str, action: str, arguments: dict, log_path: Path):
+        self.id = task_id
+        self.action = action
+        self.arguments = arguments
+        self.log_path = log_path
+        self.state = TaskState.PENDING
+        self.has_errors = False
+        self._messages: List[dict] = []
+        self._subscribers: List[MessageSubscriber] = []
+        self._lock = threading.Lock()
+
+    @property
+    def key(self) -> Tuple[str, Optional[str]]:
+        return self.action, self.arguments.get("configuration_file_name")
+
+    @property
+    def is_finished(self) -> bool:
+        return self.state not in TRANSITIONS
+
+    @property
+    def messages(self) -> List[dict]:
+        with self._lock:
+            return list(self._messages)
+
+    @classmethod
+    def create(cls, folder_path: Path, action: str, arguments: dict) -> "TaskSession":
+        task_id = uuid.uuid4().hex
+        session = cls(task_id, action, arguments, folder_path.joinpath(f"{task_id}.jsonl"))
+        header = {"task_id": task_id, "action": action, "arguments": arguments}
+        folder_path.mkdir(parents=True, exist_ok=True)
+        session.log_path.write_text(json.dumps(header) + "\n")
+        return session
+
+    @classmethod
+    def load(cls, log_path: Path) -> "TaskSession":
+        """ Restores a session from its progress log, a running one was interrupted """
+        try:
+            lines = log_path.read_text().splitlines()
+            header = json.loads(lines[0])
+            session = cls(header["task_id"], header["action"], header["arguments"], log_path)
+            for line in lines[1:]:
+                session._add_message(json.loads(line))
+        except (IndexError, KeyError, TypeError, ValueError) as exc:
+            raise TaskSessionError(f"Invalid progress log {log_path}: {exc}")
+
+        if not session.is_finished:
+            session.set_state(TaskState.INTERRUPTED)
+        return session
+
+    def _add_message(self, message: dict):
+        self._messages.append(message)
+        if message.get("type") == "task-state":
+            self.state = TaskState(message["state"])
+        elif is_error_message(message):
+            self.has_errors = True
+
+    def record(self, message: dict):
+        """ Numbers the message, appends it to the progress log and passes it on """
+        with self._lock:
+            message = dict(message, task_id=self.id, seq=len(self._messages) + 1)
+            self._add_message(message)
+            with self.log_path.open("a") as log_file:
+                log_file.write(json.dumps(message) + "\n")
+            subscribers = list(self._subscribers)
+
+        for subscriber in subscribers:
+            try:
+                subscriber(message)
+            except Exception as exc:
+                log.warning(f"Failed to pass on message of task {self.id}: {exc}")
+
+    def set_state(self, state: TaskState):
+        if state not in TRANSITIONS.get(self.state, set()):
+            raise TaskSessionError(f"Task {self.id} cannot go from {self.state} to {state}")
+        self.record({"type": "task-state", "state": state.value})
+
+    def subscribe(self, subscriber: MessageSubscriber, last_seq: int = 0) -> List[dict]:
+        """ Adds a subscriber and returns the messages sent after ``last_seq`` """
+        with self._lock:
+            self._subscribers.append(subscriber)
+            return self._messages[last_seq:]
+
+    def unsubscribe(self, subscriber: MessageSubscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+
+class TaskSessionRegistry:
+    def __init__(self, folder_path: Path, ttl: float = TASK_SESSION_TTL):
+        self.folder_path = folder_path
+        self.ttl = ttl
+        self._sessions: Dict[str, TaskSession] = {}
+        self._lock = threading.Lock()
+
+    def start(self, action: str, arguments: dict) -> Tuple[TaskSession, bool]:
+        """ Creates a session, unless the action is already running for the configuration
+
+        Returns the session and whether it was created. The running session is
+        only joined when it was submitted with the same arguments.
+        """
+        key = (action, arguments.get("configuration_file_name"))
+        with self._lock:
+            for session in self._sessions.values():
+                if session.key != key or session.is_finished:
+                    continue
+                if session.arguments != arguments:
+                    raise TaskSessionError(
+                        f"Another {action} is still running for {key[1]}, try again later"
+                    )
+                return session, False
+
+            self._remove_expired()
+            session = TaskSession.create(self.folder_path, action, arguments)
+            self._sessions[session.id] = session
+            return session, True
+
+    def get(self, task_id: str) -> Optional[TaskSession]:
+        """ Returns the session, also when it was started by a former wizard """
+        # The id comes from the client and becomes part of a file path
+        if not isinstance(task_id, str) or not TASK_ID_PATTERN.fullmatch(task_id):
+            return None
+
+        with self._lock:
+            session = self._sessions.get(task_id)
+            if session is not None:
+                return session
+
+            log_path = self.folder_path.joinpath(f"{task_id}.jsonl")
+            if not log_path.exists():
+                return None
+            try:
+                session = TaskSession.load(log_path)
+            except TaskSessionError as exc:
+                log.warning(str(exc))
+                return None
+            self._sessions[task_id] = session
+            return session
+
+    def _remove_expired(self):
+        expired_at = time.time() - self.ttl
+        for log_path in self.folder_path.glob("*.jsonl"):
+            session = self._sessions.get(log_path.stem)
+            if session is not None and not session.is_finished:
+                continue
+            try:
+                if log_path.stat().st_mtime < expired_at:
+                    log_path.unlink()
+                    self._sessions.pop(log_path.stem, None)
+            except FileNotFoundError:
+                pass
+
+
+TASK_SESSIONS = TaskSessionRegistry(TASK_FOLDER_PATH)
@@ -0,0 +1,66 @@
+""" Blocking work of the websocket actions, kept off the IOLoop
+
+Waiting for transactions, faucets and scrypt would block every request the
+wizard serves, so actions run on a bounded thread pool instead. Threads
+cannot be interrupted, so each task gets an event which is set when it is
+cancelled (e.g. its websocket closed). The waits of the task go through
+``sleep``, which stops it with ``TaskCancelled`` once the event is set.
+
+Task sessions wait for transactions for minutes, and balance watchers read
+all the time, so both get their own pool. Otherwise they could take every
+thread and leave actions like launch and unlock waiting.
+"""
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from tornado.ioloop import IOLoop
+
+from raiden_installer.constants import BALANCE_THREADS, TASK_SESSION_THREADS, TASK_THREADS
+
+TASK_EXECUTOR = ThreadPoolExecutor(max_workers=TASK_THREADS, thread_name_prefix="task")
+TASK_SESSION_EXECUTOR = ThreadPoolExecutor(
+    max_workers=TASK_SESSION_THREADS, thread_name_prefix="task-session"
+)
+BALANCE_EXECUTOR = ThreadPoolExecutor(max_workers=BALANCE_THREADS, thread_name_prefix="balance")
+
+_task_state = threading.local()
+
+
+class TaskCancelled(Exception):
+    pass
+
+
+def sleep(seconds: float):
+    """ Sleeps like ``time.sleep``, unless the task running in this thread is cancelled """
+    cancelled = getattr(_task_state, "cancelled", None)
+    if cancelled is None:
+        time.sleep(seconds)
+    elif cancelled.wait(seconds):
+        raise TaskCancelled()
+
+
+def _run_task(cancelled: threading.Event, func: Callable, *args, **kwargs) -> Any:
+    if cancelled.is_set():
+        raise TaskCancelled()
+
+    _task_state.cancelled = cancelled
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _task_state.cancelled = None
+
+
+async def run_blocking_on(
+    executor: ThreadPoolExecutor, cancelled: threading.Event, func: Callable, *args, **kwargs
+) -> Any:
+    """ Runs ``func`` on ``executor``, as a task cancelled by ``cancelled`` """
+    task = functools.partial(_run_task, cancelled, func, *args, **kwargs)
+    return await IOLoop.current().run_in_executor(executor, task)
+
+
+async def run_blocking(cancelled: threading.Event, func: Callable, *args, **kwargs) -> Any:
+    """ Runs ``func`` on the task thread pool, as a task cancelled by ``cancelled`` """
+    return await run_blocking_on(TASK_EXECUTOR, cancelled, func, *args, **kwargs)
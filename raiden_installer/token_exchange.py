@@ -1,32 +1,69 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 from decimal import Decimal
-from typing import List
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type
 
 import structlog
 from eth_typing import Address
-from eth_utils import to_canonical_address
+from eth_utils import to_canonical_address, to_checksum_address
 from web3 import Web3
 
+from raiden_installer import contract_calls
 from raiden_installer.account import Account
 from raiden_installer.constants import (
     EXCHANGE_PRICE_MARGIN,
+    EXCHANGE_QUOTE_DEADLINE,
     GAS_LIMIT_MARGIN,
-    NULL_ADDRESS,
     WEB3_TIMEOUT,
 )
+from raiden_installer.ethereum_rpc import RPCRequest, make_batch_request
+from raiden_installer.kyber import pricing as kyber_pricing
 from raiden_installer.kyber.web3 import contracts as kyber_contracts, tokens as kyber_tokens
 from raiden_installer.network import Network
-from raiden_installer.tokens import Erc20Token, EthereumAmount, TokenAmount, TokenTicker, Wei
+from raiden_installer.tokens import (
+    Currency,
+    Erc20Token,
+    EthereumAmount,
+    TokenAmount,
+    TokenTicker,
+    Wei,
+)
+from raiden_installer.uniswap import pricing as uniswap_pricing
 from raiden_installer.uniswap.web3 import contracts as uniswap_contracts
-from raiden_installer.utils import estimate_gas, send_raw_transaction
+from raiden_installer.utils import TransactionSimulationError, send_raw_transaction
 
 log = structlog.get_logger()
 
+# Shared by all quote engines, so that slow exchanges can not pile up threads
+QUOTE_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="exchange-quote")
+# Runs gas price strategies while the exchange state is read
+COST_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="transaction-costs")
+
 
 class ExchangeError(Exception):
     pass
 
 
+# Maps a token amount (in wei) to the ETH (in wei) needed to buy it
+QuoteCurve = Callable[[int], Optional[int]]
+
+
+@dataclass(frozen=True)
+class TransactionCosts:
+    gas_price: EthereumAmount
+    gas: int
+    eth_sold: EthereumAmount
+    total: EthereumAmount
+    exchange_rate: EthereumAmount
+    block_number: int
+
+
 class Exchange:
+    ESTIMATED_SWAP_GAS = 200_000
+
     def __init__(self, w3: Web3):
         self.w3 = w3
 
@@ -42,100 +79,211 @@ class Exchange:
     def name(self):
         return self.__class__.__name__
 
-    def get_current_rate(self, token_amount: TokenAmount) -> EthereumAmount:  # pragma: no cover
-        raise NotImplementedError
-
-    def calculate_transaction_costs(self, token_amount: TokenAmount, account: Account) -> dict:
-        if not self.is_listing_token(token_amount.ticker):
-            raise ExchangeError(
-                f"Cannot calculate costs because {self.name} is not listing {token_amount.ticker}"
-            )
+    def get_current_rate(self, token_amount: TokenAmount) -> EthereumAmount:
+        results = self._make_reads(self._get_rate_reads(token_amount, None))
+        return self._get_exchange_rate(token_amount, results, None)
+
+    def calculate_transaction_costs(
+        self, token_amount: TokenAmount, account: Account, block_number: Optional[int] = None
+    ) -> TransactionCosts:
+        """ Calculates the costs of a swap with at most two round trips to the node
+
+        Everything that does not depend on the exchange rate (block, gas price
+        and the exchange state) is read in one batch. Only the gas estimation,
+        which needs the amount of ETH to sell, follows after it.
+
+        Quotes pass a ``block_number`` to read a consistent state, which also
+        lets exchanges serve rates from data they already read for that block.
+        Without it the exact rate at the latest block is used.
+
+        Whether the exchange lists the token is checked first, or with the
+        batch by exchanges whose listings are on-chain.
+        """
+        block_identifier = "latest" if block_number is None else hex(block_number)
+        listing_reads = self._get_listing_reads(token_amount, block_identifier)
+        if listing_reads is None and not self.is_listing_token(token_amount.ticker):
+            raise self._get_not_listing_error(token_amount)
         if token_amount.as_wei <= 0:
             raise ExchangeError(f"Cannot calculate costs for a swap of {token_amount.formatted}")
 
-        log.debug("calculating exchange rate")
-        exchange_rate = self.get_current_rate(token_amount)
+        reads: Dict[str, RPCRequest] = {
+            "block": ("eth_getBlockByNumber", [block_identifier, False])
+        }
+        gas_price_future = None
+        if self.w3.eth.gasPriceStrategy is None:  # type: ignore
+            reads["gas_price"] = ("eth_gasPrice", [])
+        else:
+            # Gas price strategies may query other services, so they run alongside the batch
+            gas_price_future = COST_EXECUTOR.submit(self.w3.eth.generateGasPrice)
+        reads.update(listing_reads or {})
+        reads.update(self._get_rate_reads(token_amount, block_number))
+        reads.update(self._get_gas_price_reads(block_identifier))
+
+        log.debug("reading exchange state")
+        results = self._make_reads(reads)
+        if listing_reads is not None and not self._is_listing_token_in(token_amount, results):
+            raise self._get_not_listing_error(token_amount)
+        block = results["block"]
+        if block is None:
+            raise ExchangeError("Could not read the latest block")
+
+        exchange_rate = self._get_exchange_rate(token_amount, results, block_number)
         eth_sold = EthereumAmount(
             token_amount.value * exchange_rate.value * Decimal(EXCHANGE_PRICE_MARGIN)
         )
 
-        log.debug("calculating gas price")
-        gas_price = self._get_gas_price()
+        if gas_price_future is not None:
+            web3_gas_price = gas_price_future.result()
+        elif results["gas_price"] is not None:
+            web3_gas_price = int(results["gas_price"], 16)
+        else:
+            raise ExchangeError("Could not read the gas price")
+        gas_price = self._get_gas_price(Wei(web3_gas_price), results)
 
-        transaction_params = {
-            "from": account.address,
-            "value": eth_sold.as_wei,
-            "gasPrice": gas_price.as_wei,
-        }
         log.debug("estimating gas")
-        gas = self._estimate_gas(
-            token_amount,
+        contract_function, args = self._get_swap_call(
             account,
-            transaction_params,
-            exchange_rate=exchange_rate
+            token_amount,
+            exchange_rate,
+            eth_sold,
+            deadline=int(block["timestamp"], 16) + WEB3_TIMEOUT,
+        )
+        gas = contract_function(*args).estimateGas(
+            {"from": account.address, "value": eth_sold.as_wei, "gasPrice": gas_price.as_wei}
         )
 
-        block = self.w3.eth.getBlock(self.w3.eth.blockNumber)
-        max_gas_limit = Wei(int(block["gasLimit"] * 0.9))
+        max_gas_limit = Wei(int(int(block["gasLimit"], 16) * 0.9))
         gas_with_margin = Wei(int(gas * GAS_LIMIT_MARGIN))
         gas = min(gas_with_margin, max_gas_limit)
         gas_cost = EthereumAmount(Wei(gas * gas_price.as_wei))
         total = EthereumAmount(gas_cost.value + eth_sold.value)
 
         log.debug("transaction cost", gas_price=gas_price, gas=gas, eth=eth_sold)
-        return {
-            "gas_price": gas_price,
-            "gas": gas,
-            "eth_sold": eth_sold,
-            "total": total,
-            "exchange_rate": exchange_rate,
-        }
+        return TransactionCosts(
+            gas_price=gas_price,
+            gas=gas,
+            eth_sold=eth_sold,
+            total=total,
+            exchange_rate=exchange_rate,
+            block_number=int(block["number"], 16),
+        )
+
+    def get_quote_curve(
+        self, token: Erc20Token, block_number: int
+    ) -> QuoteCurve:  # pragma: no cover
+        """ Returns a function which tells the ETH (in wei) needed to buy an amount of tokens
+
+        The exchange state is read once, so that the function can be evaluated
+        for many amounts without further requests. It returns ``None`` for
+        amounts it can not price.
+        """
+        raise NotImplementedError
 
-    def buy_tokens(self, account: Account, token_amount: TokenAmount, transaction_costs=None):
+    def buy_tokens(
+        self,
+        account: Account,
+        token_amount: TokenAmount,
+        transaction_costs=None,
+        nonce: Optional[int] = None,
+    ):
         if not transaction_costs:
             try:
                 transaction_costs = self.calculate_transaction_costs(token_amount, account)
             except ExchangeError as exc:
                 raise ExchangeError("Failed to get transactions costs") from exc
 
-        return self._buy_tokens(account, token_amount, transaction_costs)
+        return self._buy_tokens(account, token_amount, transaction_costs, nonce)
 
-    def _buy_tokens(self, account: Account, token_amount: TokenAmount, transaction_costs: dict):  # pragma: no cover
+    def _buy_tokens(
+        self,
+        account: Account,
+        token_amount: TokenAmount,
+        transaction_costs: TransactionCosts,
+        nonce: Optional[int],
+    ):  # pragma: no cover
         raise NotImplementedError
 
     def is_listing_token(self, ticker: TokenTicker):  # pragma: no cover
         raise NotImplementedError
 
-    def _get_gas_price(self):  # pragma: no cover
+    def _get_not_listing_error(self, token_amount: TokenAmount) -> ExchangeError:
+        return ExchangeError(
+            f"Cannot calculate costs because {self.name} is not listing {token_amount.ticker}"
+        )
+
+    def _get_listing_reads(
+        self, token_amount: TokenAmount, block_identifier: str
+    ) -> Optional[Dict[str, RPCRequest]]:
+        """ Returns the reads that tell whether the token is listed
+
+        ``None`` if the exchange knows without reading from the node, then
+        ``is_listing_token`` is asked before the batch.
+        """
+        return None
+
+    def _is_listing_token_in(
+        self, token_amount: TokenAmount, results: Dict[str, Any]
+    ) -> bool:  # pragma: no cover
+        raise NotImplementedError
+
+    def _make_reads(self, reads: Dict[str, RPCRequest]) -> Dict[str, Any]:
+        results = make_batch_request(self.w3, list(reads.values()))
+        return dict(zip(reads.keys(), results))
+
+    def _get_rate_reads(
+        self, token_amount: TokenAmount, block_number: Optional[int]
+    ) -> Dict[str, RPCRequest]:  # pragma: no cover
+        raise NotImplementedError
+
+    def _get_exchange_rate(
+        self, token_amount: TokenAmount, results: Dict[str, Any], block_number: Optional[int]
+    ) -> EthereumAmount:  # pragma: no cover
         raise NotImplementedError
 
-    def _estimate_gas(
+    def _get_gas_price_reads(self, block_identifier: str) -> Dict[str, RPCRequest]:
+        return {}
+
+    def _get_gas_price(self, web3_gas_price: Wei, results: Dict[str, Any]) -> EthereumAmount:
+        return EthereumAmount(web3_gas_price)
+
+    def _get_swap_call(
         self,
-        token_amount: TokenAmount,
         account: Account,
-        transaction_params: dict,
-        **kw
-    ):  # pragma: no cover
+        token_amount: TokenAmount,
+        exchange_rate: EthereumAmount,
+        eth_sold: EthereumAmount,
+        deadline: int,
+    ) -> Tuple[Callable, list]:  # pragma: no cover
         raise NotImplementedError
 
-    def _send_buy_transaction(self, account: Account, transaction_costs: dict, contract_function, *args):
-        eth_to_sell = transaction_costs["eth_sold"]
-        gas = transaction_costs["gas"]
-        gas_price = transaction_costs["gas_price"]
+    def _send_buy_transaction(
+        self,
+        account: Account,
+        transaction_costs: TransactionCosts,
+        contract_function,
+        *args,
+        nonce: Optional[int] = None,
+    ):
         transaction_params = {
             "from": account.address,
-            "value": eth_to_sell.as_wei,
-            "gas": gas,
-            "gas_price": gas_price.as_wei,
+            "value": transaction_costs.eth_sold.as_wei,
+            "gas": transaction_costs.gas,
+            "gas_price": transaction_costs.gas_price.as_wei,
         }
+        if nonce is not None:
+            transaction_params["nonce"] = nonce
 
-        return send_raw_transaction(
-            self.w3,
-            account,
-            contract_function,
-            *args,
-            **transaction_params,
-        )
+        try:
+            return send_raw_transaction(
+                self.w3,
+                account,
+                contract_function,
+                *args,
+                simulate=True,
+                **transaction_params,
+            )
+        except TransactionSimulationError as exc:
+            raise ExchangeError(f"Swap at {self.name} would fail: {exc}") from exc
 
     @classmethod
     def get_by_name(cls, name):
@@ -143,6 +291,9 @@ class Exchange:
 
 
 class Kyber(Exchange):
+    # Rough gas usage of a trade, only used to compare routes
+    ESTIMATED_SWAP_GAS = 350_000
+
     def __init__(self, w3: Web3):
         super().__init__(w3=w3)
         self.network_contract_proxy = kyber_contracts.get_network_contract_proxy(self.w3)
@@ -163,69 +314,191 @@ class Kyber(Exchange):
         except (KeyError, TypeError) as exc:
             raise ExchangeError(f"{self.name} is not listing {ticker}") from exc
 
-    def get_current_rate(self, token_amount: TokenAmount) -> EthereumAmount:
+    def _get_expected_rate_request(
+        self, token: Currency, amount: int, block_identifier: str
+    ) -> RPCRequest:
         eth_address = self.get_token_network_address(TokenTicker("ETH"))
-        token_network_address = self.get_token_network_address(token_amount.ticker)
-
-        expected_rate, slippage_rate = self.network_contract_proxy.functions.getExpectedRate(
-            token_network_address, eth_address, token_amount.as_wei
-        ).call()
+        token_network_address = self.get_token_network_address(TokenTicker(token.ticker))
+        return contract_calls.GET_EXPECTED_RATE.request(
+            self.network_contract_proxy.address,
+            token_network_address,
+            eth_address,
+            amount,
+            block_identifier=block_identifier,
+        )
 
+    def _decode_expected_rate(self, result: Any) -> int:
+        expected_rate, slippage_rate = contract_calls.GET_EXPECTED_RATE.decode(result)
         if expected_rate == 0 or slippage_rate == 0:
+            return 0
+        return max(expected_rate, slippage_rate)
+
+    def _get_rate_curve_key(self, token: Currency) -> kyber_pricing.RateCurveKey:
+        return (
+            to_canonical_address(self.network_contract_proxy.address),
+            self.get_token_network_address(TokenTicker(token.ticker)),
+        )
+
+    def _get_rate_sample_reads(
+        self, token: Currency, block_number: int
+    ) -> Dict[str, RPCRequest]:
+        if kyber_pricing.RATE_CURVE_CACHE.get(self._get_rate_curve_key(token), block_number):
+            return {}
+
+        return {
+            f"rate_sample_{amount}": self._get_expected_rate_request(
+                token, amount, hex(block_number)
+            )
+            for amount in kyber_pricing.get_sample_amounts(token.decimals)
+        }
+
+    def _get_rate_reads(
+        self, token_amount: TokenAmount, block_number: Optional[int]
+    ) -> Dict[str, RPCRequest]:
+        """ Reads the rate curve of the block, and the exact rate if the curve may not serve it
+
+        Whether a curve that is still to be sampled can serve the amount is only
+        known once the samples are read, so the exact rate is read in the same
+        batch unless the curve of the block is cached already.
+        """
+        token = token_amount.currency
+        amount = int(token_amount.as_wei)
+        if block_number is None:
+            return {"expected_rate": self._get_expected_rate_request(token, amount, "latest")}
+
+        reads = self._get_rate_sample_reads(token, block_number)
+        curve = kyber_pricing.RATE_CURVE_CACHE.get(self._get_rate_curve_key(token), block_number)
+        if curve is None or curve.get_rate(amount) is None:
+            reads["expected_rate"] = self._get_expected_rate_request(
+                token, amount, hex(block_number)
+            )
+        return reads
+
+    def _get_rate_curve(
+        self, token: Currency, results: Dict[str, Any], block_number: int
+    ) -> Optional[kyber_pricing.RateCurve]:
+        curve_key = self._get_rate_curve_key(token)
+        curve = kyber_pricing.RATE_CURVE_CACHE.get(curve_key, block_number)
+        if curve is not None:
+            return curve
+
+        sample_amounts = kyber_pricing.get_sample_amounts(token.decimals)
+        if not all(f"rate_sample_{amount}" in results for amount in sample_amounts):
+            # The curve was read for this block, but got replaced by a newer one
+            return None
+
+        rates = []
+        for amount in sample_amounts:
+            try:
+                rates.append(self._decode_expected_rate(results[f"rate_sample_{amount}"]))
+            except ValueError:
+                rates.append(0)
+
+        curve = kyber_pricing.RateCurve(
+            block_number=block_number, amounts=tuple(sample_amounts), rates=tuple(rates)
+        )
+        kyber_pricing.RATE_CURVE_CACHE.add(curve_key, curve)
+        return curve
+
+    def _get_exchange_rate(
+        self, token_amount: TokenAmount, results: Dict[str, Any], block_number: Optional[int]
+    ) -> EthereumAmount:
+        """ Serves the rate from the curve of the block, or else from the exact rate read
+
+        The exact rate is only missing from ``results`` if the cached curve
+        served the amount, but got replaced by the curve of a newer block in
+        the meantime. Only then it is read in an extra round trip.
+        """
+        amount = int(token_amount.as_wei)
+        rate = None
+        if block_number is not None:
+            curve = self._get_rate_curve(token_amount.currency, results, block_number)
+            if curve is not None:
+                rate = curve.get_rate(amount)
+
+        if rate is None:
+            result = results.get("expected_rate")
+            if "expected_rate" not in results and block_number is not None:
+                log.debug("rate curve got replaced, reading exact rate")
+                rate_request = self._get_expected_rate_request(
+                    token_amount.currency, amount, hex(block_number)
+                )
+                result = make_batch_request(self.w3, [rate_request])[0]
+            try:
+                rate = self._decode_expected_rate(result)
+            except ValueError as exc:
+                raise ExchangeError(f"Could not get the exchange rate from {self.name}") from exc
+
+        if rate == 0:
             raise ExchangeError("Trade not possible at the moment due to lack of liquidity")
 
-        return EthereumAmount(Wei(max(expected_rate, slippage_rate)))
+        return EthereumAmount(Wei(rate))
 
-    def _get_gas_price(self):
-        web3_gas_price = self.w3.eth.generateGasPrice()
-        kyber_max_gas_price = self.network_contract_proxy.functions.maxGasPrice().call()
-        max_gas_price = min(web3_gas_price, kyber_max_gas_price)
-        return EthereumAmount(Wei(max_gas_price))
+    def get_quote_curve(self, token: Erc20Token, block_number: int) -> QuoteCurve:
+        results = self._make_reads(self._get_rate_sample_reads(token, block_number))
+        curve = self._get_rate_curve(token, results, block_number)
+        if curve is None:
+            raise ExchangeError(f"Could not sample the rates of {self.name}")
 
-    def _estimate_gas(
+        def get_eth_cost(amount: int) -> Optional[int]:
+            rate = curve.get_rate(amount)
+            return None if rate is None else rate * amount // 10 ** token.decimals
+
+        return get_eth_cost
+
+    def _get_gas_price_reads(self, block_identifier: str) -> Dict[str, RPCRequest]:
+        return {
+            "max_gas_price": contract_calls.MAX_GAS_PRICE.request(
+                self.network_contract_proxy.address, block_identifier=block_identifier
+            )
+        }
+
+    def _get_gas_price(self, web3_gas_price: Wei, results: Dict[str, Any]) -> EthereumAmount:
+        try:
+            kyber_max_gas_price = contract_calls.MAX_GAS_PRICE.decode(results["max_gas_price"])
+        except ValueError as exc:
+            raise ExchangeError(f"Could not get the maximum gas price of {self.name}") from exc
+
+        return EthereumAmount(Wei(min(web3_gas_price, kyber_max_gas_price)))
+
+    def _get_swap_call(
         self,
+        account: Account,
         token_amount: TokenAmount,
+        exchange_rate: EthereumAmount,
+        eth_sold: EthereumAmount,
+        deadline: int,
+    ) -> Tuple[Callable, list]:
+        return (
+            self.network_contract_proxy.functions.trade,
+            [
+                self.get_token_network_address(TokenTicker("ETH")),
+                eth_sold.as_wei,
+                self.get_token_network_address(token_amount.ticker),
+                account.address,
+                token_amount.as_wei,
+                exchange_rate.as_wei,
+                account.address,
+            ],
+        )
+
+    def _buy_tokens(
+        self,
         account: Account,
-        transaction_params: dict,
-        **kw
+        token_amount: TokenAmount,
+        transaction_costs: TransactionCosts,
+        nonce: Optional[int],
     ):
-        exchange_rate = kw.get("exchange_rate")
-        if exchange_rate is None:
-            raise ExchangeError(
-                f"An exchange rate is needed to estimate gas for a swap on {self.name}"
-            )
-
-        eth_address = self.get_token_network_address(TokenTicker("ETH"))
-        return estimate_gas(
-            self.w3,
+        # Kyber trades do not expire
+        contract_function, args = self._get_swap_call(
             account,
-            self.network_contract_proxy.functions.trade,
-            eth_address,
-            transaction_params["value"],
-            self.get_token_network_address(token_amount.ticker),
-            account.address,
-            token_amount.as_wei,
-            exchange_rate.as_wei,
-            account.address,
-            **transaction_params,
+            token_amount,
+            transaction_costs.exchange_rate,
+            transaction_costs.eth_sold,
+            deadline=0,
         )
-
-    def _buy_tokens(self, account: Account, token_amount: TokenAmount, transaction_costs: dict):
-        exchange_rate = transaction_costs["exchange_rate"]
-        eth_to_sell = transaction_costs["eth_sold"]
-        eth_address = self.get_token_network_address(TokenTicker("ETH"))
-
         return self._send_buy_transaction(
-            account,
-            transaction_costs,
-            self.network_contract_proxy.functions.trade,
-            eth_address,
-            eth_to_sell.as_wei,
-            self.get_token_network_address(token_amount.ticker),
-            account.address,
-            token_amount.as_wei,
-            exchange_rate.as_wei,
-            account.address,
+            account, transaction_costs, contract_function, *args, nonce=nonce
         )
 
 
@@ -233,6 +506,10 @@ class Uniswap(Exchange):
     # same address on all networks
     ROUTER02_ADDRESS = to_canonical_address("0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D")
     SUPPORTED_NETWORKS = ["mainnet", "ropsten", "rinkeby", "goerli", "kovan"]
+    # Rough gas usage of a swap, only used to compare routes
+    ESTIMATED_SWAP_GAS = 150_000
+    # WETH addresses by chain id, so that quotes do not need to ask the router every time
+    WETH_ADDRESSES: Dict[int, Address] = {}
 
     def __init__(self, w3: Web3):
         super().__init__(w3=w3)
@@ -243,64 +520,326 @@ class Uniswap(Exchange):
             abi=uniswap_contracts.UNISWAP_ROUTER02_ABI,
             address=self.ROUTER02_ADDRESS,
         )
-        self.weth_address = to_canonical_address(self.router_proxy.functions.WETH().call())
+        if self.chain_id not in self.WETH_ADDRESSES:
+            self.WETH_ADDRESSES[self.chain_id] = to_canonical_address(
+                self.router_proxy.functions.WETH().call()
+            )
+        self.weth_address = self.WETH_ADDRESSES[self.chain_id]
 
-    def _get_factory_proxy(self):
-        factory_address = to_canonical_address(self.router_proxy.functions.factory().call())
-        return self.w3.eth.contract(
-            abi=uniswap_contracts.UNISWAP_FACTORY_ABI,
-            address=factory_address,
-        )
+    def _get_pair_reserves(self, token_address: Address) -> Optional[Tuple[int, int]]:
+        pair_address = uniswap_pricing.get_pair_address(self.weth_address, token_address)
+        return uniswap_pricing.PAIR_RESERVES_CACHE.get_reserves(self.w3, [pair_address])[
+            pair_address
+        ]
 
     def is_listing_token(self, token_ticker: TokenTicker):
-        factory_proxy = self._get_factory_proxy()
         token = Erc20Token.find_by_ticker(token_ticker, self.network.name)
-        pair_address = to_canonical_address(
-            factory_proxy.functions.getPair(self.weth_address, token.address).call()
+        reserves = self._get_pair_reserves(token.address)
+        return reserves is not None and all(reserves)
+
+    def _get_path(self, token_amount: TokenAmount) -> List[Address]:
+        return [self.weth_address, token_amount.address]
+
+    def _get_listing_reads(
+        self, token_amount: TokenAmount, block_identifier: str
+    ) -> Optional[Dict[str, RPCRequest]]:
+        # The same read as the reserves of the rate, so the batch does not grow
+        pair_address = uniswap_pricing.get_pair_address(self.weth_address, token_amount.address)
+        return {
+            self._get_reserves_key(pair_address): uniswap_pricing.make_reserves_request(
+                pair_address, block_identifier
+            )
+        }
+
+    def _is_listing_token_in(self, token_amount: TokenAmount, results: Dict[str, Any]) -> bool:
+        pair_address = uniswap_pricing.get_pair_address(self.weth_address, token_amount.address)
+        reserves = uniswap_pricing.decode_reserves(results[self._get_reserves_key(pair_address)])
+        return reserves is not None and all(reserves)
+
+    def _get_rate_from_reserves(
+        self, token_amount: TokenAmount, pair_reserves: uniswap_pricing.PairReserves
+    ) -> EthereumAmount:
+        path = self._get_path(token_amount)
+        try:
+            amounts_in = uniswap_pricing.get_amounts_in(token_amount.as_wei, path, pair_reserves)
+        except uniswap_pricing.InsufficientLiquidityError as exc:
+            raise ExchangeError(f"{self.name} can not provide {token_amount.formatted}: {exc}")
+
+        eth_to_sell = EthereumAmount(Wei(amounts_in[0]))
+        return EthereumAmount(eth_to_sell.value / token_amount.value)
+
+    def get_current_rate(self, token_amount: TokenAmount) -> EthereumAmount:
+        pair_reserves = uniswap_pricing.PAIR_RESERVES_CACHE.get_reserves(
+            self.w3, uniswap_pricing.get_path_pairs(self._get_path(token_amount))
+        )
+        return self._get_rate_from_reserves(token_amount, pair_reserves)
+
+    @staticmethod
+    def _get_reserves_key(pair_address: Address) -> str:
+        return f"reserves_{to_checksum_address(pair_address)}"
+
+    def get_quote_curve(self, token: Erc20Token, block_number: int) -> QuoteCurve:
+        path = [self.weth_address, token.address]
+        pair_reserves = uniswap_pricing.PAIR_RESERVES_CACHE.get_reserves(
+            self.w3, uniswap_pricing.get_path_pairs(path), block_number
         )
-        return pair_address != NULL_ADDRESS
 
-    def _get_gas_price(self):
-        return EthereumAmount(Wei(self.w3.eth.generateGasPrice()))
+        def get_eth_cost(amount: int) -> Optional[int]:
+            try:
+                return uniswap_pricing.get_amounts_in(amount, path, pair_reserves)[0]
+            except uniswap_pricing.InsufficientLiquidityError:
+                return None
+
+        return get_eth_cost
 
-    def _estimate_gas(
+    def _get_rate_reads(
+        self, token_amount: TokenAmount, block_number: Optional[int]
+    ) -> Dict[str, RPCRequest]:
+        block_identifier = "latest" if block_number is None else hex(block_number)
+        pair_addresses = uniswap_pricing.get_path_pairs(self._get_path(token_amount))
+        return {
+            self._get_reserves_key(address): uniswap_pricing.make_reserves_request(
+                address, block_identifier
+            )
+            for address in pair_addresses
+        }
+
+    def _get_exchange_rate(
+        self, token_amount: TokenAmount, results: Dict[str, Any], block_number: Optional[int]
+    ) -> EthereumAmount:
+        pair_reserves = {
+            pair_address: uniswap_pricing.decode_reserves(
+                results[self._get_reserves_key(pair_address)]
+            )
+            for pair_address in uniswap_pricing.get_path_pairs(self._get_path(token_amount))
+        }
+        return self._get_rate_from_reserves(token_amount, pair_reserves)
+
+    def _get_swap_call(
         self,
+        account: Account,
         token_amount: TokenAmount,
+        exchange_rate: EthereumAmount,
+        eth_sold: EthereumAmount,
+        deadline: int,
+    ) -> Tuple[Callable, list]:
+        return (
+            self.router_proxy.functions.swapETHForExactTokens,
+            [token_amount.as_wei, self._get_path(token_amount), account.address, deadline],
+        )
+
+    def _buy_tokens(
+        self,
         account: Account,
-        transaction_params: dict,
-        **kw
+        token_amount: TokenAmount,
+        transaction_costs: TransactionCosts,
+        nonce: Optional[int],
     ):
         latest_block = self.w3.eth.getBlock("latest")
-        deadline = latest_block.timestamp + WEB3_TIMEOUT
-        return estimate_gas(
-            self.w3,
+        contract_function, args = self._get_swap_call(
             account,
-            self.router_proxy.functions.swapETHForExactTokens,
-            token_amount.as_wei,
-            [self.weth_address, token_amount.address],
-            account.address,
-            deadline,
-            **transaction_params,
+            token_amount,
+            transaction_costs.exchange_rate,
+            transaction_costs.eth_sold,
+            deadline=latest_block.timestamp + WEB3_TIMEOUT,
+        )
+        return self._send_buy_transaction(
+            account, transaction_costs, contract_function, *args, nonce=nonce
         )
 
-    def _buy_tokens(self, account: Account, token_amount: TokenAmount, transaction_costs: dict):
-        latest_block = self.w3.eth.getBlock("latest")
-        deadline = latest_block.timestamp + WEB3_TIMEOUT
 
-        return self._send_buy_transaction(
-            account,
-            transaction_costs,
-            self.router_proxy.functions.swapETHForExactTokens,
-            token_amount.as_wei,
-            [self.weth_address, token_amount.address],
-            account.address,
-            deadline,
+@dataclass(frozen=True)
+class ExchangeQuote:
+    exchange_name: str
+    token_amount: TokenAmount
+    exchange_rate: EthereumAmount
+    gas_price: EthereumAmount
+    gas: int
+    total: EthereumAmount
+    block_number: int
+    created_at: float = field(default_factory=time.time)
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+    @classmethod
+    def from_transaction_costs(
+        cls, exchange: Exchange, token_amount: TokenAmount, costs: TransactionCosts
+    ):
+        return cls(
+            exchange_name=exchange.name,
+            token_amount=token_amount,
+            exchange_rate=costs.exchange_rate,
+            gas_price=costs.gas_price,
+            gas=costs.gas,
+            total=costs.total,
+            block_number=costs.block_number,
         )
 
-    def get_current_rate(self, token_amount: TokenAmount) -> EthereumAmount:
-        amounts_in = self.router_proxy.functions.getAmountsIn(
-            token_amount.as_wei, [self.weth_address, token_amount.address]
-        ).call()
 
-        eth_to_sell = EthereumAmount(Wei(amounts_in[0]))
-        return EthereumAmount(eth_to_sell.value / token_amount.value)
+def get_exchange_quote(
+    w3: Web3,
+    exchange_class: Type[Exchange],
+    token_amount: TokenAmount,
+    account: Account,
+    block_number: Optional[int] = None,
+) -> ExchangeQuote:
+    exchange = exchange_class(w3=w3)
+    costs = exchange.calculate_transaction_costs(token_amount, account, block_number=block_number)
+    return ExchangeQuote.from_transaction_costs(exchange, token_amount, costs)
+
+
+QuoteKey = Tuple[str, bytes, int, int]
+
+
+class QuoteCache:
+    """ Keeps the quotes of the current head block
+
+    Quotes are keyed by (exchange, token, amount in wei, block number), so all
+    requests for the same amount within one block share one quote. Concurrent
+    requests for a quote that is still being calculated wait for that
+    calculation instead of starting their own.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._quotes: Dict[QuoteKey, ExchangeQuote] = {}
+        self._pending: Dict[QuoteKey, Future] = {}
+
+    def get(
+        self,
+        exchange_name: str,
+        token_amount: TokenAmount,
+        block_number: int,
+        calculate_quote: Callable[[], ExchangeQuote],
+    ) -> ExchangeQuote:
+        key = (exchange_name.lower(), token_amount.address, token_amount.as_wei, block_number)
+
+        with self._lock:
+            quote = self._quotes.get(key)
+            if quote is not None:
+                return quote
+
+            pending = self._pending.get(key)
+            if pending is None:
+                future: Future = Future()
+                self._pending[key] = future
+
+        if pending is not None:
+            return pending.result()
+
+        try:
+            quote = calculate_quote()
+        except BaseException as exc:
+            with self._lock:
+                del self._pending[key]
+            future.set_exception(exc)
+            raise
+
+        with self._lock:
+            del self._pending[key]
+            # Quotes from older blocks will never be requested again
+            self._quotes = {
+                cached_key: cached_quote
+                for cached_key, cached_quote in self._quotes.items()
+                if cached_key[-1] >= block_number
+            }
+            self._quotes[key] = quote
+        future.set_result(quote)
+        return quote
+
+
+QUOTE_CACHE = QuoteCache()
+
+
+class QuoteEngine:
+    """ Gets quotes from all exchanges concurrently
+
+    Every exchange is created and asked for its transaction costs in its own
+    worker thread. Exchanges that fail or do not answer within ``deadline``
+    seconds are left out, so a slow exchange never delays the others.
+    """
+
+    EXCHANGE_CLASSES: Sequence[Type[Exchange]] = (Kyber, Uniswap)
+
+    def __init__(
+        self,
+        w3: Web3,
+        exchange_classes: Optional[Sequence[Type[Exchange]]] = None,
+        deadline: float = EXCHANGE_QUOTE_DEADLINE,
+        quote_cache: Optional[QuoteCache] = None,
+    ):
+        self.w3 = w3
+        self.exchange_classes = exchange_classes or self.EXCHANGE_CLASSES
+        self.deadline = deadline
+        self.quote_cache = quote_cache
+
+    def _get_quote(
+        self,
+        exchange_class: Type[Exchange],
+        token_amount: TokenAmount,
+        account: Account,
+        block_number: int,
+    ):
+        def calculate_quote():
+            return get_exchange_quote(
+                self.w3, exchange_class, token_amount, account, block_number=block_number
+            )
+
+        if self.quote_cache is None:
+            return calculate_quote()
+
+        return self.quote_cache.get(
+            exchange_class.__name__, token_amount, block_number, calculate_quote
+        )
+
+    def _submit_quotes(
+        self, token_amount: TokenAmount, account: Account, block_number: int
+    ) -> Dict[Future, Type[Exchange]]:
+        # All exchanges quote the same block, so that their prices can be compared
+        return {
+            QUOTE_EXECUTOR.submit(
+                self._get_quote, exchange_class, token_amount, account, block_number
+            ): exchange_class
+            for exchange_class in self.exchange_classes
+        }
+
+    def _collect_quotes(self, futures: Dict[Future, Type[Exchange]]) -> List[ExchangeQuote]:
+        quotes = []
+        for future, exchange_class in futures.items():
+            if not future.done():
+                log.warn(f"{exchange_class.__name__} did not send a quote in {self.deadline}s")
+                continue
+            try:
+                quotes.append(future.result())
+            except Exception as exc:
+                log.warn(f"Failed to get quote from {exchange_class.__name__}: {exc}")
+
+        return sorted(quotes, key=lambda quote: quote.total.as_wei)
+
+    def get_quotes(self, token_amount: TokenAmount, account: Account) -> List[ExchangeQuote]:
+        futures = self._submit_quotes(token_amount, account, self.w3.eth.blockNumber)
+        wait(futures, timeout=self.deadline)
+        return self._collect_quotes(futures)
+
+    async def get_quotes_async(
+        self, token_amount: TokenAmount, account: Account
+    ) -> List[ExchangeQuote]:
+        """ Same as ``get_quotes``, but waits for the exchanges on the event loop
+
+        No worker thread of ``QUOTE_EXECUTOR`` is blocked waiting for the others.
+        """
+        loop = asyncio.get_event_loop()
+        block_number = await loop.run_in_executor(QUOTE_EXECUTOR, lambda: self.w3.eth.blockNumber)
+        futures = self._submit_quotes(token_amount, account, block_number)
+        await asyncio.wait(
+            [asyncio.wrap_future(future) for future in futures], timeout=self.deadline
+        )
+        return self._collect_quotes(futures)
+
+    def get_best_quote(self, token_amount: TokenAmount, account: Account) -> ExchangeQuote:
+        quotes = self.get_quotes(token_amount, account)
+        if not quotes:
+            raise ExchangeError(f"No exchange can offer {token_amount.formatted} at the moment")
+        return quotes[0]
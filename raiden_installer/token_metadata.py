@@ -0,0 +1,203 @@
+import json
+import threading
+import time
+from dataclasses import asdict, dataclass, replace
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from eth_abi import decode_single
+from eth_abi.exceptions import DecodingError
+from eth_typing import Address
+from eth_utils import encode_hex, function_signature_to_4byte_selector, to_checksum_address
+from hexbytes import HexBytes
+from requests.exceptions import RequestException
+from web3 import Web3
+
+from raiden_installer import log
+from raiden_installer.constants import TOKEN_METADATA_FAILURE_TTL, WIZARD_DATA_FOLDER_PATH
+from raiden_installer.ethereum_rpc import RPCRequest, make_batch_request
+from raiden_installer.tokens import Erc20Token
+
+DECIMALS_SELECTOR = encode_hex(function_signature_to_4byte_selector("decimals()"))
+SYMBOL_SELECTOR = encode_hex(function_signature_to_4byte_selector("symbol()"))
+
+# Limits the size of a single JSON-RPC batch, some providers reject very large ones
+MAX_TOKENS_PER_BATCH = 100
+
+
+@dataclass(frozen=True)
+class TokenMetadata:
+    decimals: int
+    symbol: str
+
+
+def _decode_decimals(result) -> Optional[int]:
+    try:
+        return decode_single("uint8", HexBytes(result))
+    except (DecodingError, TypeError, ValueError):
+        return None
+
+
+def _decode_symbol(result) -> str:
+    data = HexBytes(result) if result else b""
+    try:
+        return decode_single("string", data)
+    except (DecodingError, OverflowError, TypeError, ValueError):
+        pass
+
+    # Some older tokens (e.g. MKR) return the symbol as bytes32
+    try:
+        return decode_single("bytes32", data).rstrip(b"\0").decode()
+    except (DecodingError, TypeError, ValueError):
+        return ""
+
+
+class TokenMetadataCache:
+    """ Stores the on-chain ``decimals()`` and ``symbol()`` of tokens
+
+    Metadata is read once for every token (in batches), persisted to
+    ``FILE_PATH`` and served from memory afterwards. Tokens whose metadata
+    could not be read are only read again after ``failure_ttl`` seconds.
+    """
+
+    FILE_PATH = WIZARD_DATA_FOLDER_PATH.joinpath("token_metadata.json")
+
+    def __init__(
+        self, file_path: Optional[Path] = None, failure_ttl: float = TOKEN_METADATA_FAILURE_TTL
+    ):
+        self.file_path = file_path or self.FILE_PATH
+        self.failure_ttl = failure_ttl
+        self._lock = threading.Lock()
+        self._metadata: Dict[int, Dict[str, TokenMetadata]] = self._load()
+        # When reading the metadata of a token failed, by chain id and address
+        self._failures: Dict[Tuple[int, str], float] = {}
+
+    def _load(self) -> Dict[int, Dict[str, TokenMetadata]]:
+        try:
+            with self.file_path.open() as metadata_file:
+                data = json.load(metadata_file)
+            return {
+                int(chain_id): {
+                    address: TokenMetadata(**metadata) for address, metadata in tokens.items()
+                }
+                for chain_id, tokens in data.items()
+            }
+        except FileNotFoundError:
+            return {}
+        except (ValueError, TypeError, AttributeError) as exc:
+            log.warn(f"Ignoring invalid token metadata file {self.file_path}: {exc}")
+            return {}
+
+    def save(self):
+        data = {
+            str(chain_id): {address: asdict(metadata) for address, metadata in tokens.items()}
+            for chain_id, tokens in self._metadata.items()
+        }
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = self.file_path.with_suffix(".tmp")
+        with temporary_path.open("w") as metadata_file:
+            json.dump(data, metadata_file)
+        temporary_path.replace(self.file_path)
+
+    def get(self, chain_id: int, address: Address) -> Optional[TokenMetadata]:
+        return self._metadata.get(chain_id, {}).get(to_checksum_address(address))
+
+    def _has_failed_recently(self, chain_id: int, address: Address) -> bool:
+        failed_at = self._failures.get((chain_id, to_checksum_address(address)))
+        return failed_at is not None and time.monotonic() - failed_at < self.failure_ttl
+
+    def fetch(
+        self, w3: Web3, chain_id: int, addresses: Iterable[Address]
+    ) -> Dict[Address, TokenMetadata]:
+        """ Returns the metadata of all given tokens
+
+        Only tokens which are not cached yet are read from the chain, using one
+        batch request for up to ``MAX_TOKENS_PER_BATCH`` tokens.
+        """
+        addresses = list(dict.fromkeys(addresses))
+        with self._lock:
+            missing = [
+                address
+                for address in addresses
+                if self.get(chain_id, address) is None
+                and not self._has_failed_recently(chain_id, address)
+            ]
+            if missing:
+                for start in range(0, len(missing), MAX_TOKENS_PER_BATCH):
+                    self._fetch_batch(w3, chain_id, missing[start : start + MAX_TOKENS_PER_BATCH])
+                self.save()
+
+        metadata = {address: self.get(chain_id, address) for address in addresses}
+        return {address: data for address, data in metadata.items() if data is not None}
+
+    def _fetch_batch(self, w3: Web3, chain_id: int, addresses: List[Address]):
+        rpc_requests: List[RPCRequest] = []
+        for address in addresses:
+            checksum_address = to_checksum_address(address)
+            for selector in (DECIMALS_SELECTOR, SYMBOL_SELECTOR):
+                rpc_requests.append(
+                    ("eth_call", [{"to": checksum_address, "data": selector}, "latest"])
+                )
+
+        results = make_batch_request(w3, rpc_requests)
+        chain_metadata = self._metadata.setdefault(chain_id, {})
+        for index, address in enumerate(addresses):
+            decimals = _decode_decimals(results[2 * index])
+            if decimals is None:
+                log.warn(f"Could not read decimals of token {to_checksum_address(address)}")
+                self._failures[(chain_id, to_checksum_address(address))] = time.monotonic()
+                continue
+
+            chain_metadata[to_checksum_address(address)] = TokenMetadata(
+                decimals=decimals, symbol=_decode_symbol(results[2 * index + 1])
+            )
+
+
+@lru_cache()
+def get_token_metadata_cache() -> TokenMetadataCache:
+    return TokenMetadataCache()
+
+
+def with_onchain_decimals(
+    w3: Web3, chain_id: int, tokens: Iterable[Erc20Token]
+) -> List[Erc20Token]:
+    """ Returns the tokens with the decimals found on-chain
+
+    The tokens of the registry are shared, so a token with other decimals is
+    replaced by a copy, the tokens themselves are left alone.
+    """
+    tokens = list(tokens)
+    try:
+        metadata = get_token_metadata_cache().fetch(
+            w3, chain_id, [token.address for token in tokens]
+        )
+    except (RequestException, ValueError) as exc:
+        log.warn(f"Could not verify token decimals: {exc}")
+        return tokens
+
+    checked_tokens = []
+    for token in tokens:
+        token_metadata = metadata.get(token.address)
+        if token_metadata is not None and token_metadata.decimals != token.decimals:
+            log.info(f"Using {token_metadata.decimals} decimals for {token.ticker}")
+            token = replace(token, decimals=token_metadata.decimals)
+        checked_tokens.append(token)
+    return checked_tokens
+
+
+def get_settings_tokens(w3: Web3, chain_id: int, settings) -> List[Erc20Token]:
+    """ Returns the service and the transfer token of the settings, with on-chain decimals
+
+    Amounts are only comparable in the same token, so the required amounts of
+    the settings have to be built from these tokens when they are compared to
+    balances read in them.
+    """
+    return with_onchain_decimals(
+        w3,
+        chain_id,
+        [
+            Erc20Token.find_by_ticker(settings.service_token.ticker, settings.network),
+            Erc20Token.find_by_ticker(settings.transfer_token.ticker, settings.network),
+        ],
+    )
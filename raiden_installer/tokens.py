@@ -1,12 +1,23 @@
+import json
+import os
 from dataclasses import dataclass, field, replace
-from decimal import Decimal, getcontext
+from decimal import Decimal, localcontext
 from enum import Enum
-from typing import Dict, Generic, NewType, Optional, TypeVar
+from functools import lru_cache
+from glob import glob
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Generic, Iterable, List, Mapping, NewType, Optional, Tuple, TypeVar
 
+import toml
 from eth_typing import Address
 from eth_utils import to_canonical_address
 
 from raiden_contracts.constants import CONTRACTS_VERSION
+from raiden_installer import get_resource_folder_path
+
+# Significant digits used for amounts of currencies with only a few decimals
+MIN_DECIMAL_PRECISION = 18
 
 Eth_T = TypeVar("Eth_T", int, Decimal, float, str, "Wei")
 Token_T = TypeVar("Token_T")
@@ -21,7 +32,7 @@ class Wei(int):
     pass
 
 
-@dataclass
+@dataclass(frozen=True)
 class Currency:
     ticker: str
     wei_ticker: str
@@ -31,7 +42,7 @@ class Currency:
         if wei_amount == 0:
             ticker = self.ticker
             value = wei_amount
-        elif wei_amount >= 10 ** 15:
+        elif wei_amount >= 10 ** max(self.decimals - 3, 0):
             ticker = self.ticker
             value = wei_amount / 10 ** self.decimals
         elif 10 ** 12 <= wei_amount < 10 ** 15:
@@ -54,7 +65,7 @@ class Currency:
         return f"{integral}{frac_string} {ticker}"
 
 
-@dataclass
+@dataclass(frozen=True)
 class Erc20Token(Currency):
     address: Address = Address(b"")
     supply: int = 10 ** 21
@@ -65,34 +76,17 @@ class Erc20Token(Currency):
 
     @staticmethod
     def find_by_ticker(ticker, network_name):
-        major, minor, _ = CONTRACTS_VERSION.split(".", 2)
-        version_string = f"{major}.{minor}"
-        token_list_version = {
-            "0.25": TokensV25,
-            "0.33": TokensV33,
-            "0.36": TokensV36,
-            "0.37": TokensV37,
-        }.get(version_string, Tokens)
-        try:
-            token_data = token_list_version[ticker].value
-            address = token_data.addresses[network_name]
-        except KeyError as exc:
-            raise TokenError(f"{ticker} is not deployed on {network_name}") from exc
-
-        return Erc20Token(
-            ticker=token_data.ticker,
-            wei_ticker=token_data.wei_ticker,
-            address=to_canonical_address(address)
-        )
+        return get_token_registry().get(ticker, network_name)
 
 
 class CurrencyAmount(Generic[Eth_T]):
     def __init__(self, value: Eth_T, currency: Currency):
-        context = getcontext()
-        context.prec = currency.decimals
-        self.value = Decimal(str(value), context=context)
-        if type(value) is Wei:
-            self.value /= 10 ** currency.decimals
+        # A local context, the precision of the other threads is left alone
+        with localcontext() as context:
+            context.prec = max(currency.decimals, MIN_DECIMAL_PRECISION)
+            self.value = Decimal(str(value))
+            if type(value) is Wei:
+                self.value /= 10 ** currency.decimals
 
         self.currency = currency
 
@@ -151,6 +145,8 @@ class CurrencyAmount(Generic[Eth_T]):
 
 
 class TokenAmount(CurrencyAmount):
+    currency: Erc20Token
+
     def __init__(self, value: Eth_T, currency: Erc20Token):
         super().__init__(value, currency)
         self.address = currency.address
@@ -169,6 +165,7 @@ class TokenData:
     ticker: str
     wei_ticker: str
     addresses: Dict[str, str]
+    decimals: int = 18
 
 
 _RDN = TokenData(
@@ -250,6 +247,175 @@ class TokensV37(Enum):
     WIZ = _WizardToken
 
 
+TOKEN_LISTS_BY_CONTRACTS_VERSION = {
+    "0.25": TokensV25,
+    "0.33": TokensV33,
+    "0.36": TokensV36,
+    "0.37": TokensV37,
+}
+DEFAULT_TOKEN_LIST = Tokens
+TOKEN_LIST_ENVIRONMENT_VARIABLE = "RAIDEN_INSTALLER_TOKEN_LIST"
+
+# Key for tokens that apply to every contracts version without a dedicated token list
+DEFAULT_VERSION_KEY = "default"
+
+TokenKey = Tuple[str, str, str]
+
+
+def get_contracts_version_key(contracts_version: str = CONTRACTS_VERSION) -> str:
+    return ".".join(str(contracts_version).split(".")[:2])
+
+
+CONTRACTS_VERSION_KEY = get_contracts_version_key()
+
+
+class TokenRegistry:
+    """ Immutable index of all known tokens, keyed by (contracts version, network, ticker)
+
+    Every entry is a shared ``Erc20Token`` instance, so looking up a token
+    is a single dictionary access instead of building a new token each time.
+    """
+
+    def __init__(self, tokens: Mapping[TokenKey, Erc20Token]):
+        self._tokens = MappingProxyType(dict(tokens))
+        self.versions = frozenset(version for version, _, _ in self._tokens)
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def __iter__(self):
+        return iter(self._tokens.values())
+
+    def get(
+        self, ticker: str, network_name: str, contracts_version_key: str = CONTRACTS_VERSION_KEY
+    ) -> Erc20Token:
+        if contracts_version_key not in self.versions:
+            contracts_version_key = DEFAULT_VERSION_KEY
+
+        try:
+            return self._tokens[(contracts_version_key, network_name, ticker)]
+        except KeyError as exc:
+            raise TokenError(f"{ticker} is not deployed on {network_name}") from exc
+
+    def extend(
+        self, token_data_list: Iterable[Tuple[Optional[str], TokenData]]
+    ) -> "TokenRegistry":
+        """ Returns a new registry with the given tokens added
+
+        Each token is given together with the contracts version key it belongs
+        to. A version key of ``None`` adds the token to every known version.
+        """
+        tokens: Dict[TokenKey, Erc20Token] = dict(self._tokens)
+        versions = set(self.versions)
+
+        for contracts_version_key, token_data in token_data_list:
+            if contracts_version_key is not None and contracts_version_key not in versions:
+                # A new version starts out with the tokens of the default list
+                for (version, network_name, ticker), token in self._tokens.items():
+                    if version == DEFAULT_VERSION_KEY:
+                        tokens[(contracts_version_key, network_name, ticker)] = token
+                versions.add(contracts_version_key)
+
+            if contracts_version_key is None:
+                target_versions = list(versions)
+            else:
+                target_versions = [contracts_version_key]
+
+            for version in target_versions:
+                for network_name, token in _make_tokens(token_data).items():
+                    tokens[(version, network_name, token.ticker)] = token
+
+        return TokenRegistry(tokens)
+
+    @classmethod
+    def from_token_lists(cls, token_lists: Mapping[str, Iterable[Enum]]) -> "TokenRegistry":
+        tokens: Dict[TokenKey, Erc20Token] = {}
+        for contracts_version_key, token_list in token_lists.items():
+            for token_enum in token_list:
+                for network_name, token in _make_tokens(token_enum.value).items():
+                    tokens[(contracts_version_key, network_name, token.ticker)] = token
+
+        return cls(tokens)
+
+
+def _make_tokens(token_data: TokenData) -> Dict[str, Erc20Token]:
+    return {
+        network_name: Erc20Token(
+            ticker=token_data.ticker,
+            wei_ticker=token_data.wei_ticker,
+            decimals=token_data.decimals,
+            address=to_canonical_address(address),
+        )
+        for network_name, address in token_data.addresses.items()
+    }
+
+
+def load_token_list(file_path: Path) -> List[Tuple[Optional[str], TokenData]]:
+    """ Reads additional tokens from a TOML or JSON token list
+
+    The file is expected to contain a ``tokens`` list, where every entry has
+    a ``ticker``, ``wei_ticker`` and ``addresses`` (network name -> address),
+    and optionally ``decimals`` and a ``contracts_version`` (e.g. "0.37").
+    """
+    with open(file_path) as token_list_file:
+        if str(file_path).endswith(".json"):
+            data = json.load(token_list_file)
+        else:
+            data = toml.load(token_list_file)
+
+    token_data_list = []
+    for entry in data.get("tokens", []):
+        try:
+            contracts_version = entry.get("contracts_version")
+            token_data = TokenData(
+                ticker=entry["ticker"],
+                wei_ticker=entry["wei_ticker"],
+                addresses=dict(entry["addresses"]),
+                decimals=int(entry.get("decimals", 18)),
+            )
+        except (KeyError, TypeError, ValueError) as exc:
+            raise TokenError(f"Invalid token list entry in {file_path}: {entry}") from exc
+
+        contracts_version_key = (
+            get_contracts_version_key(contracts_version) if contracts_version else None
+        )
+        token_data_list.append((contracts_version_key, token_data))
+
+    return token_data_list
+
+
+def get_token_list_paths() -> List[Path]:
+    token_list_folder = os.path.join(get_resource_folder_path(), "token_lists")
+    paths = sorted(
+        glob(os.path.join(token_list_folder, "*.toml"))
+        + glob(os.path.join(token_list_folder, "*.json"))
+    )
+    paths.extend(
+        path for path in os.environ.get(TOKEN_LIST_ENVIRONMENT_VARIABLE, "").split(os.pathsep)
+        if path
+    )
+    return [Path(path) for path in paths]
+
+
+@lru_cache()
+def get_token_registry() -> TokenRegistry:
+    token_lists = {DEFAULT_VERSION_KEY: DEFAULT_TOKEN_LIST, **TOKEN_LISTS_BY_CONTRACTS_VERSION}
+    registry = TokenRegistry.from_token_lists(token_lists)
+
+    for file_path in get_token_list_paths():
+        registry = registry.extend(load_token_list(file_path))
+
+    return registry
+
+
+def _find_settings_token(settings, ticker: str, tokens: Iterable[Erc20Token]) -> Erc20Token:
+    """ Returns the token with the ticker, from the given tokens if it is one of them """
+    for token in tokens:
+        if token.ticker == ticker:
+            return token
+    return Erc20Token.find_by_ticker(ticker, settings.network)
+
+
 @dataclass
 class RequiredAmounts:
     eth: EthereumAmount
@@ -258,17 +424,19 @@ class RequiredAmounts:
     transfer_token: TokenAmount
 
     @staticmethod
-    def from_settings(settings):
+    def from_settings(settings, tokens: Iterable[Erc20Token] = ()):
+        """ The given tokens replace the registry tokens with the same ticker """
+        tokens = list(tokens)
         return RequiredAmounts(
             eth=EthereumAmount(Wei(settings.ethereum_amount_required)),
             eth_after_swap=EthereumAmount(Wei(settings.ethereum_amount_required_after_swap)),
             service_token=TokenAmount(
                 Wei(settings.service_token.amount_required),
-                Erc20Token.find_by_ticker(settings.service_token.ticker, settings.network),
+                _find_settings_token(settings, settings.service_token.ticker, tokens),
             ),
             transfer_token=TokenAmount(
                 Wei(settings.transfer_token.amount_required),
-                Erc20Token.find_by_ticker(settings.transfer_token.ticker, settings.network),
+                _find_settings_token(settings, settings.transfer_token.ticker, tokens),
             ),
         )
 
@@ -279,14 +447,16 @@ class SwapAmounts:
     transfer_token: TokenAmount
 
     @staticmethod
-    def from_settings(settings):
+    def from_settings(settings, tokens: Iterable[Erc20Token] = ()):
+        """ The given tokens replace the registry tokens with the same ticker """
+        tokens = list(tokens)
         return SwapAmounts(
             service_token=TokenAmount(
                 Wei(settings.service_token.swap_amount),
-                Erc20Token.find_by_ticker(settings.service_token.ticker, settings.network),
+                _find_settings_token(settings, settings.service_token.ticker, tokens),
             ),
             transfer_token=TokenAmount(
                 Wei(settings.transfer_token.swap_amount),
-                Erc20Token.find_by_ticker(settings.transfer_token.ticker, settings.network),
+                _find_settings_token(settings, settings.transfer_token.ticker, tokens),
             ),
         )
@@ -1,36 +1,62 @@
+from functools import lru_cache
+from typing import Dict
+
+from eth_typing import Address
 from eth_utils import to_canonical_address, to_checksum_address
 from web3 import Web3
 
 from raiden_contracts.constants import CONTRACT_CUSTOM_TOKEN, CONTRACT_USER_DEPOSIT
 from raiden_contracts.contract_manager import ContractManager, contracts_precompiled_path
+from raiden_installer import contract_calls
 from raiden_installer.account import Account
 from raiden_installer.tokens import Erc20Token, TokenAmount, Wei
 from raiden_installer.utils import get_contract_address, send_raw_transaction, wait_for_transaction
 
-EIP20_ABI = ContractManager(contracts_precompiled_path()).get_contract_abi("StandardToken")
+
+@lru_cache()
+def _get_contract_manager() -> ContractManager:
+    return ContractManager(contracts_precompiled_path())
+
+
+EIP20_ABI = _get_contract_manager().get_contract_abi("StandardToken")
 
 GAS_REQUIRED_FOR_DEPOSIT: int = 200_000
 GAS_REQUIRED_FOR_APPROVE: int = 70_000
 GAS_REQUIRED_FOR_MINT: int = 100_000
 
+# The token of a deposit contract never changes, so it is read only once
+DEPOSIT_TOKEN_ADDRESSES: Dict[Address, Address] = {}
 
-def _make_deposit_proxy(w3: Web3, token: Erc20Token):
-    contract_manager = ContractManager(contracts_precompiled_path())
+
+def _get_deposit_token_address(w3: Web3, contract_address: Address) -> Address:
+    service_token_address = DEPOSIT_TOKEN_ADDRESSES.get(contract_address)
+    if service_token_address is None:
+        service_token_address = to_canonical_address(
+            contract_calls.DEPOSIT_TOKEN.call(w3, contract_address)
+        )
+        DEPOSIT_TOKEN_ADDRESSES[contract_address] = service_token_address
+    return service_token_address
+
+
+def _get_deposit_address(w3: Web3, token: Erc20Token) -> Address:
     contract_address = to_canonical_address(
         get_contract_address(w3.eth.chainId, CONTRACT_USER_DEPOSIT)
     )
-    proxy = w3.eth.contract(
-        address=contract_address, abi=contract_manager.get_contract_abi(CONTRACT_USER_DEPOSIT)
-    )
-
-    service_token_address = to_canonical_address(proxy.functions.token().call())
+    service_token_address = _get_deposit_token_address(w3, contract_address)
 
     if service_token_address != token.address:
         raise ValueError(
             f"{token.ticker} is at {to_checksum_address(token.address)}, "
             f"expected {service_token_address}"
         )
-    return proxy
+    return contract_address
+
+
+def _make_deposit_proxy(w3: Web3, token: Erc20Token):
+    return w3.eth.contract(
+        address=_get_deposit_address(w3, token),
+        abi=_get_contract_manager().get_contract_abi(CONTRACT_USER_DEPOSIT),
+    )
 
 
 def _make_token_proxy(w3: Web3, token: Erc20Token):
@@ -38,10 +64,9 @@ def _make_token_proxy(w3: Web3, token: Erc20Token):
 
 
 def mint_tokens(w3: Web3, account: Account, token: Erc20Token):
-    contract_manager = ContractManager(contracts_precompiled_path())
     token_proxy = w3.eth.contract(
         address=token.address,
-        abi=contract_manager.get_contract_abi(CONTRACT_CUSTOM_TOKEN),
+        abi=_get_contract_manager().get_contract_abi(CONTRACT_CUSTOM_TOKEN),
     )
 
     return send_raw_transaction(
@@ -52,7 +77,7 @@ def mint_tokens(w3: Web3, account: Account, token: Erc20Token):
 def deposit_service_tokens(w3: Web3, account: Account, token: Erc20Token, amount: Wei):
     deposit_proxy = _make_deposit_proxy(w3=w3, token=token)
     current_deposit_amount = TokenAmount(
-        Wei(deposit_proxy.functions.total_deposit(account.address).call()), token
+        Wei(contract_calls.TOTAL_DEPOSIT.call(w3, deposit_proxy.address, account.address)), token
     )
     new_deposit_amount = TokenAmount(amount, token)
     total_deposit = current_deposit_amount + new_deposit_amount
@@ -71,7 +96,9 @@ def deposit_service_tokens(w3: Web3, account: Account, token: Erc20Token, amount
 
 def approve(w3, account, allowed_address, allowance: Wei, token: Erc20Token):
     token_proxy = _make_token_proxy(w3=w3, token=token)
-    old_allowance = token_proxy.functions.allowance(account.address, allowed_address).call()
+    old_allowance = contract_calls.ALLOWANCE.call(
+        w3, token.address, account.address, allowed_address
+    )
 
     if old_allowance > 0:
         send_raw_transaction(
@@ -96,15 +123,14 @@ def approve(w3, account, allowed_address, allowance: Wei, token: Erc20Token):
 
 
 def get_token_balance(w3: Web3, account: Account, token: Erc20Token) -> TokenAmount:
-    token_proxy = _make_token_proxy(w3=w3, token=token)
-    amount = Wei(token_proxy.functions.balanceOf(account.address).call())
+    amount = Wei(contract_calls.BALANCE_OF.call(w3, token.address, account.address))
 
     return TokenAmount(amount, token)
 
 
 def get_token_deposit(w3: Web3, account: Account, token: Erc20Token) -> TokenAmount:
-    deposit_proxy = _make_deposit_proxy(w3=w3, token=token)
-    amount = Wei(deposit_proxy.functions.effectiveBalance(account.address).call())
+    deposit_address = _get_deposit_address(w3=w3, token=token)
+    amount = Wei(contract_calls.EFFECTIVE_BALANCE.call(w3, deposit_address, account.address))
 
     return TokenAmount(amount, token)
 
@@ -0,0 +1,176 @@
+""" Local Uniswap V2 pricing
+
+Mirrors the ``UniswapV2Library`` math with exact integer arithmetic, so that
+quotes for any amount can be calculated from the pair reserves without a
+call to the router.
+"""
+import threading
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from eth_typing import Address
+from eth_utils import keccak, to_canonical_address, to_checksum_address
+from web3 import Web3
+
+from raiden_installer.constants import PAIR_RESERVES_CACHED_BLOCKS
+from raiden_installer.contract_calls import GET_RESERVES
+from raiden_installer.ethereum_rpc import RPCRequest, make_batch_request
+
+# The factory is deployed at the same address on all networks
+FACTORY_ADDRESS = to_canonical_address("0x5C69bEe701ef814a2B6a3EDD4B1652CB9cc5aA6f")
+PAIR_INIT_CODE_HASH = bytes.fromhex(
+    "96e8ac4277198ff8b6f785478aa9a39f403cb768dd02cbee326c3e7da348845f"
+)
+
+Reserves = Tuple[int, int]
+PairReserves = Mapping[Address, Optional[Reserves]]
+
+
+class InsufficientLiquidityError(Exception):
+    pass
+
+
+def sort_tokens(token_a: Address, token_b: Address) -> Tuple[Address, Address]:
+    if token_a == token_b:
+        raise ValueError("Identical token addresses")
+    return (token_a, token_b) if token_a < token_b else (token_b, token_a)
+
+
+def get_pair_address(
+    token_a: Address,
+    token_b: Address,
+    factory_address: Address = FACTORY_ADDRESS,
+    init_code_hash: bytes = PAIR_INIT_CODE_HASH,
+) -> Address:
+    """ Derives the address of a pair the same way the factory's CREATE2 does """
+    token0, token1 = sort_tokens(token_a, token_b)
+    salt = keccak(token0 + token1)
+    return Address(keccak(b"\xff" + factory_address + salt + init_code_hash)[12:])
+
+
+def get_path_pairs(path: Sequence[Address], **kw) -> List[Address]:
+    return [
+        get_pair_address(token_in, token_out, **kw) for token_in, token_out in zip(path, path[1:])
+    ]
+
+
+def get_amount_out(amount_in: int, reserve_in: int, reserve_out: int) -> int:
+    if amount_in <= 0:
+        raise ValueError("Insufficient input amount")
+    if reserve_in <= 0 or reserve_out <= 0:
+        raise InsufficientLiquidityError("Pair has no liquidity")
+
+    amount_in_with_fee = amount_in * 997
+    numerator = amount_in_with_fee * reserve_out
+    denominator = reserve_in * 1000 + amount_in_with_fee
+    return numerator // denominator
+
+
+def get_amount_in(amount_out: int, reserve_in: int, reserve_out: int) -> int:
+    if amount_out <= 0:
+        raise ValueError("Insufficient output amount")
+    if reserve_in <= 0 or reserve_out <= amount_out:
+        raise InsufficientLiquidityError("Pair does not have enough liquidity")
+
+    numerator = reserve_in * amount_out * 1000
+    denominator = (reserve_out - amount_out) * 997
+    return numerator // denominator + 1
+
+
+def _get_path_reserves(
+    token_in: Address, token_out: Address, pair_reserves: PairReserves, **kw
+) -> Reserves:
+    pair_address = get_pair_address(token_in, token_out, **kw)
+    reserves = pair_reserves.get(pair_address)
+    if reserves is None:
+        raise InsufficientLiquidityError(
+            f"Pair {to_checksum_address(pair_address)} does not exist"
+        )
+    reserve0, reserve1 = reserves
+
+    token0, _ = sort_tokens(token_in, token_out)
+    return (reserve0, reserve1) if token_in == token0 else (reserve1, reserve0)
+
+
+def get_amounts_out(
+    amount_in: int, path: Sequence[Address], pair_reserves: PairReserves, **kw
+) -> List[int]:
+    if len(path) < 2:
+        raise ValueError("Invalid path")
+
+    amounts = [amount_in]
+    for token_in, token_out in zip(path, path[1:]):
+        reserve_in, reserve_out = _get_path_reserves(token_in, token_out, pair_reserves, **kw)
+        amounts.append(get_amount_out(amounts[-1], reserve_in, reserve_out))
+    return amounts
+
+
+def get_amounts_in(
+    amount_out: int, path: Sequence[Address], pair_reserves: PairReserves, **kw
+) -> List[int]:
+    if len(path) < 2:
+        raise ValueError("Invalid path")
+
+    amounts = [amount_out]
+    for token_in, token_out in reversed(list(zip(path, path[1:]))):
+        reserve_in, reserve_out = _get_path_reserves(token_in, token_out, pair_reserves, **kw)
+        amounts.insert(0, get_amount_in(amounts[0], reserve_in, reserve_out))
+    return amounts
+
+
+def make_reserves_request(pair_address: Address, block_identifier: str = "latest") -> RPCRequest:
+    return GET_RESERVES.request(pair_address, block_identifier=block_identifier)
+
+
+def decode_reserves(result) -> Optional[Reserves]:
+    try:
+        reserve0, reserve1, _ = GET_RESERVES.decode(result)
+        return reserve0, reserve1
+    except ValueError:
+        # Pairs which were never created have no code, so the call returns nothing
+        return None
+
+
+class PairReservesCache:
+    """ Reads the reserves of pairs at most once per block
+
+    All pairs that are not known for the requested block are read with one
+    batch request. Pairs that do not exist are cached as ``None``. The
+    reserves of the most recent blocks are kept, so quotes pinned to an older
+    block do not evict the reserves of the latest one.
+    """
+
+    def __init__(self, max_blocks: int = PAIR_RESERVES_CACHED_BLOCKS):
+        self.max_blocks = max_blocks
+        self._lock = threading.Lock()
+        self._reserves: Dict[int, Dict[Address, Optional[Reserves]]] = {}
+
+    def get_reserves(
+        self, w3: Web3, pair_addresses: Iterable[Address], block_number: Optional[int] = None
+    ) -> Dict[Address, Optional[Reserves]]:
+        pair_addresses = list(dict.fromkeys(pair_addresses))
+        if block_number is None:
+            block_number = w3.eth.blockNumber
+
+        with self._lock:
+            block_reserves = dict(self._reserves.get(block_number, {}))
+
+        # The batch request is made without the lock, reads of other pairs or
+        # blocks do not have to wait for it
+        missing = [address for address in pair_addresses if address not in block_reserves]
+        if missing:
+            results = make_batch_request(
+                w3, [make_reserves_request(address, hex(block_number)) for address in missing]
+            )
+            fetched = {
+                address: decode_reserves(result) for address, result in zip(missing, results)
+            }
+            block_reserves.update(fetched)
+            with self._lock:
+                self._reserves.setdefault(block_number, {}).update(fetched)
+                for old_block_number in sorted(self._reserves)[: -self.max_blocks]:
+                    del self._reserves[old_block_number]
+
+        return {address: block_reserves[address] for address in pair_addresses}
+
+
+PAIR_RESERVES_CACHE = PairReservesCache()
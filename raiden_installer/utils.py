@@ -1,15 +1,19 @@
 import math
 import os
 import time
+from typing import Optional
 
 import requests
+from eth_abi import decode_single
+from eth_abi.exceptions import DecodingError
 from eth_typing import Address
 from eth_utils import to_canonical_address, to_checksum_address
+from hexbytes import HexBytes
 from web3 import Web3
-from web3.exceptions import TransactionNotFound
+from web3.exceptions import ContractLogicError, TransactionNotFound
 
 from raiden_contracts.contract_manager import get_contracts_deployment_info
-from raiden_installer import log
+from raiden_installer import log, tasks
 from raiden_installer.constants import REQUIRED_BLOCK_CONFIRMATIONS, WEB3_TIMEOUT
 from raiden_installer.tokens import EthereumAmount, Wei
 
@@ -18,6 +22,14 @@ class TransactionTimeoutError(Exception):
     pass
 
 
+class TransactionSimulationError(Exception):
+    pass
+
+
+ERROR_SELECTOR = bytes.fromhex("08c379a0")  # Error(string)
+PANIC_SELECTOR = bytes.fromhex("4e487b71")  # Panic(uint256)
+
+
 def recover_ld_library_env_path():  # pragma: no cover
     """This works around an issue that `webbrowser.open` fails inside a
     PyInstaller binary.
@@ -54,7 +66,52 @@ def estimate_gas(w3, account, contract_function, *args, **kw):
     return w3.eth.estimateGas(transaction)
 
 
-def send_raw_transaction(w3, account, contract_function, *args, **kw):
+def decode_revert_reason(data) -> Optional[str]:
+    """ Decodes the return data of a reverted call, if it carries a reason """
+    try:
+        data = HexBytes(data)
+    except (TypeError, ValueError):
+        return None
+
+    try:
+        if data[:4] == ERROR_SELECTOR:
+            return decode_single("string", data[4:])
+        if data[:4] == PANIC_SELECTOR:
+            return f"panic code {decode_single('uint256', data[4:]):#x}"
+    except (DecodingError, OverflowError, UnicodeDecodeError):
+        pass
+    return None
+
+
+def simulate_transaction(w3, transaction: dict) -> None:
+    """ Runs a transaction with ``eth_call`` on top of the pending block
+
+    Raises ``TransactionSimulationError`` with the revert reason if the
+    transaction would fail, so that it is not broadcast and no gas is spent.
+    """
+    call_params = {
+        key: transaction[key]
+        for key in ("from", "to", "data", "value", "gas", "gasPrice")
+        if key in transaction
+    }
+    try:
+        w3.eth.call(call_params, "pending")
+    except ContractLogicError as exc:
+        raise TransactionSimulationError(str(exc) or "execution reverted") from exc
+    except ValueError as exc:
+        error = exc.args[0] if exc.args else None
+        if not isinstance(error, dict):
+            raise TransactionSimulationError(str(exc)) from exc
+        reason = decode_revert_reason(error.get("data")) or error.get("message")
+        raise TransactionSimulationError(reason or "execution reverted") from exc
+
+
+def send_raw_transaction(w3, account, contract_function, *args, simulate=False, **kw):
+    """ Signs and sends a transaction calling ``contract_function``
+
+    With ``simulate`` the transaction is run with ``eth_call`` first and not
+    sent if it would revert.
+    """
     transaction_params = {
         "chainId": w3.eth.chainId,
         "nonce": w3.eth.getTransactionCount(account.address, "pending"),
@@ -77,6 +134,8 @@ def send_raw_transaction(w3, account, contract_function, *args, **kw):
 
     result = contract_function(*args)
     transaction_data = result.buildTransaction(transaction_params)
+    if simulate:
+        simulate_transaction(w3, transaction_data)
     signed = w3.eth.account.signTransaction(transaction_data, account.private_key)
     tx_hash = w3.eth.sendRawTransaction(signed.rawTransaction)
     log.debug(f"transaction hash: {tx_hash.hex()}")
@@ -101,7 +160,7 @@ def wait_for_transaction(w3: Web3, transaction_hash) -> None:
             pass
 
         current_block = w3.eth.blockNumber
-        time.sleep(1)
+        tasks.sleep(1)
 
 
 def check_eth_node_responsivity(url):
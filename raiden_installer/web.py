@@ -1,14 +1,15 @@
 import json
-import sys
 import time
 
 import wtforms
 from eth_utils import decode_hex
+from requests.exceptions import RequestException
 from tornado.escape import json_decode
+from tornado.ioloop import IOLoop
 from tornado.web import Application, url
 from wtforms_tornado import Form
 
-from raiden_installer import log
+from raiden_installer import log, tasks
 from raiden_installer.base import RaidenConfigurationFile
 from raiden_installer.constants import WEB3_TIMEOUT
 from raiden_installer.ethereum_rpc import make_web3_provider
@@ -22,7 +23,16 @@ from raiden_installer.shared_handlers import (
     run_server,
     try_unlock,
 )
-from raiden_installer.token_exchange import Exchange, ExchangeError, Kyber, Uniswap
+from raiden_installer.swap_router import SplitRouter
+from raiden_installer.token_exchange import (
+    QUOTE_CACHE,
+    QUOTE_EXECUTOR,
+    Exchange,
+    ExchangeError,
+    QuoteEngine,
+    get_exchange_quote,
+)
+from raiden_installer.token_metadata import get_settings_tokens, with_onchain_decimals
 from raiden_installer.tokens import (
     Erc20Token,
     EthereumAmount,
@@ -60,6 +70,7 @@ class MainAsyncTaskHandler(AsyncTaskHandler):
             "udc_deposit": self._run_udc_deposit,
             "track_transaction": self._run_track_transaction,
         })
+        self.durable_actions.update({"swap", "udc_deposit", "track_transaction"})
 
     def _send_summary(self, text, **kw):
         if not isinstance(text, list):
@@ -84,6 +95,8 @@ class MainAsyncTaskHandler(AsyncTaskHandler):
             exchange_name = kw["exchange"]
             token_amount = kw["amount"]
             token_ticker = kw["token"]
+            # Splitting the swap over several exchanges needs the consent of the user
+            split_route = kw.get("split_route") is True
         except (ValueError, KeyError, TypeError) as exc:
             self._send_error_message(f"Invalid request: {exc}")
             return
@@ -105,51 +118,34 @@ class MainAsyncTaskHandler(AsyncTaskHandler):
                 try_unlock(account)
                 w3 = make_web3_provider(configuration_file.ethereum_client_rpc_endpoint, account)
                 token = Erc20Token.find_by_ticker(form.data["token_ticker"], network_name)
+                [token] = with_onchain_decimals(w3, configuration_file.network.chain_id, [token])
 
                 token_amount = TokenAmount(Wei(form.data["token_amount"]), token)
                 exchange = Exchange.get_by_name(form.data["exchange"])(w3=w3)
                 self._send_status_update(f"Starting swap at {exchange.name}")
 
                 costs = exchange.calculate_transaction_costs(token_amount, account)
-                needed_funds = costs["total"]
-                exchange_rate = costs["exchange_rate"]
-                balance_before_swap = account.get_ethereum_balance(w3)
-
-                if needed_funds > balance_before_swap:
-                    raise ValueError(
-                        (
-                            f"Not enough ETH. {balance_before_swap.formatted} available, but "
-                            f"{needed_funds.formatted} needed"
-                        )
+                route = self._get_split_route(w3, token_amount, costs) if split_route else None
+                if route is None:
+                    actual_total_costs = self._swap_at_exchange(
+                        w3, account, exchange, token_amount, costs
                     )
-
-                self._send_status_update(
-                    (
-                        f"Best exchange rate found at {exchange.name}: "
-                        f"{exchange_rate} / {token_amount.ticker}"
-                    )
-                )
-                self._send_status_update(f"Trying to acquire {token_amount} at this rate")
-
-                tx_hash = exchange.buy_tokens(account, token_amount, costs)
-                wait_for_transaction(w3, tx_hash)
+                else:
+                    actual_total_costs = self._swap_over_route(w3, account, route)
 
                 token_balance = get_token_balance(w3, account, token)
-                balance_after_swap = account.get_ethereum_balance(w3)
-                actual_total_costs = balance_before_swap - balance_after_swap
 
                 self._send_status_update(f"Swap complete. {token_balance.formatted} available")
                 self._send_status_update(f"Actual costs: {actual_total_costs}")
 
-                required = RequiredAmounts.from_settings(self.installer_settings)
-                service_token = Erc20Token.find_by_ticker(
-                    required.service_token.ticker, network_name
+                settings_tokens = get_settings_tokens(
+                    w3, configuration_file.network.chain_id, self.installer_settings
                 )
+                required = RequiredAmounts.from_settings(self.installer_settings, settings_tokens)
+                service_token = required.service_token.currency
                 service_token_balance = get_token_balance(w3, account, service_token)
                 total_service_token_balance = get_total_token_owned(w3, account, service_token)
-                transfer_token = Erc20Token.find_by_ticker(
-                    required.transfer_token.ticker, network_name
-                )
+                transfer_token = required.transfer_token.currency
                 transfer_token_balance = get_token_balance(w3, account, transfer_token)
 
                 if total_service_token_balance < required.service_token:
@@ -165,6 +161,58 @@ class MainAsyncTaskHandler(AsyncTaskHandler):
         except (json.decoder.JSONDecodeError, KeyError, ExchangeError, ValueError) as exc:
             self._redirect_after_swap_error(exc, configuration_file.file_name, token_ticker)
 
+    def _get_split_route(self, w3, token_amount, costs):
+        """ Returns a route over several exchanges, if it is cheaper than a single one
+
+        The router compares all exchanges at the block of the quote, buying on
+        a single exchange included, so a route with more than one leg costs
+        less than the best single exchange.
+        """
+        router = SplitRouter.from_exchange_classes(w3, QuoteEngine.EXCHANGE_CLASSES)
+        try:
+            route = router.get_route(
+                token_amount, gas_price=costs.gas_price.as_wei, block_number=costs.block_number
+            )
+        except (ExchangeError, RequestException, ValueError) as exc:
+            log.warn(f"Could not find a split route: {exc}")
+            return None
+
+        return route if len(route.legs) > 1 else None
+
+    def _swap_at_exchange(self, w3, account, exchange, token_amount, costs):
+        needed_funds = costs.total
+        exchange_rate = costs.exchange_rate
+        balance_before_swap = account.get_ethereum_balance(w3)
+
+        if needed_funds > balance_before_swap:
+            raise ValueError(
+                (
+                    f"Not enough ETH. {balance_before_swap.formatted} available, but "
+                    f"{needed_funds.formatted} needed"
+                )
+            )
+
+        self._send_status_update(
+            (
+                f"Best exchange rate found at {exchange.name}: "
+                f"{exchange_rate} / {token_amount.ticker}"
+            )
+        )
+        self._send_status_update(f"Trying to acquire {token_amount} at this rate")
+
+        tx_hash = exchange.buy_tokens(account, token_amount, costs)
+        wait_for_transaction(w3, tx_hash)
+
+        balance_after_swap = account.get_ethereum_balance(w3)
+        return balance_before_swap - balance_after_swap
+
+    def _swap_over_route(self, w3, account, route):
+        self._send_status_update(f"Splitting swap for a better price: {route.describe_legs()}")
+
+        exchanges = [leg.exchange for leg in route.legs]
+        report = SplitRouter(w3, exchanges).execute(route, account)
+        return report.realized_total
+
     def _redirect_transfer_swap(self, configuration_file, transfer_token_balance, required):
         if transfer_token_balance < required.transfer_token:
             redirect_url = self.reverse_url(
@@ -179,13 +227,13 @@ class MainAsyncTaskHandler(AsyncTaskHandler):
         self._send_summary(
             ["Congratulations! Swap Successful!", next_page], icon=token_ticker
         )
-        time.sleep(5)
+        tasks.sleep(5)
         self._send_redirect(redirect_url)
 
     def _redirect_after_swap_error(self, exc, configuration_file_name, token_ticker):
         next_page = f"Try again to exchange {token_ticker}..."
         self._send_summary(["Transaction failed", str(exc), next_page], icon="error")
-        time.sleep(5)
+        tasks.sleep(5)
         redirect_url = self.reverse_url("swap", configuration_file_name, token_ticker)
         self._send_redirect(redirect_url)
 
@@ -199,14 +247,15 @@ class MainAsyncTaskHandler(AsyncTaskHandler):
 
         try:
             settings = self.installer_settings
-            required = RequiredAmounts.from_settings(settings)
-            swap_amounts = SwapAmounts.from_settings(settings)
-            service_token = Erc20Token.find_by_ticker(
-                required.service_token.ticker, settings.network
-            )
             account = configuration_file.account
             try_unlock(account)
             w3 = make_web3_provider(configuration_file.ethereum_client_rpc_endpoint, account)
+            settings_tokens = get_settings_tokens(
+                w3, configuration_file.network.chain_id, settings
+            )
+            required = RequiredAmounts.from_settings(settings, settings_tokens)
+            swap_amounts = SwapAmounts.from_settings(settings, settings_tokens)
+            service_token = required.service_token.currency
 
             service_token_balance = get_token_balance(w3, account, service_token)
             service_token_deposited = get_token_deposit(w3, account, service_token)
@@ -225,16 +274,14 @@ class MainAsyncTaskHandler(AsyncTaskHandler):
                     f"Service token deposited at UDC: {service_token_deposited.formatted} is enough"
                 )
 
-            time.sleep(5)
-            transfer_token = Erc20Token.find_by_ticker(
-                required.transfer_token.ticker, settings.network
-            )
+            tasks.sleep(5)
+            transfer_token = required.transfer_token.currency
             transfer_token_balance = get_token_balance(w3, account, transfer_token)
             self._redirect_transfer_swap(configuration_file, transfer_token_balance, required)
 
         except (json.decoder.JSONDecodeError, KeyError, ExchangeError, ValueError) as exc:
             self._redirect_after_swap_error(
-                exc, configuration_file.file_name, service_token.ticker
+                exc, configuration_file.file_name, configuration_file.settings.service_token.ticker
             )
 
     def _run_track_transaction(self, **kw):
@@ -255,17 +302,14 @@ class MainAsyncTaskHandler(AsyncTaskHandler):
         try:
             wait_for_transaction(w3, decode_hex(tx_hash))
         except TransactionTimeoutError:
-            self._send_status_update(
-                [f"Not confirmed after {WEB3_TIMEOUT} seconds!"], icon="error"
-            )
+            self._send_error_message(f"Not confirmed after {WEB3_TIMEOUT} seconds!")
             self._send_txhash_message(
                 "Funding took too long! "
                 "Click the link below and restart the wizard, "
                 "once it was confirmed:",
                 tx_hash=tx_hash,
             )
-            time.sleep(10)
-            sys.exit(1)
+            return
         else:
             configuration_file._initial_funding_txhash = None
             configuration_file.save()
@@ -291,9 +335,8 @@ class SwapHandler(BaseRequestHandler):
         w3 = make_web3_provider(
             configuration_file.ethereum_client_rpc_endpoint, configuration_file.account
         )
-        kyber = Kyber(w3=w3)
-        uniswap = Uniswap(w3=w3)
         token = Erc20Token.find_by_ticker(token_ticker, configuration_file.network.name)
+        [token] = with_onchain_decimals(w3, configuration_file.network.chain_id, [token])
 
         swap_amounts = SwapAmounts.from_settings(self.installer_settings)
         if token_ticker == self.installer_settings.service_token.ticker:
@@ -304,15 +347,13 @@ class SwapHandler(BaseRequestHandler):
         self.render(
             "swap.html",
             configuration_file=configuration_file,
-            kyber=kyber,
-            uniswap=uniswap,
             token=token,
             swap_amount=swap_amount,
         )
 
 
 class CostEstimationAPIHandler(APIHandler):
-    def post(self, configuration_file_name):
+    async def post(self, configuration_file_name):
         configuration_file = RaidenConfigurationFile.get_by_filename(configuration_file_name)
         account = configuration_file.account
         try_unlock(account)
@@ -321,18 +362,33 @@ class CostEstimationAPIHandler(APIHandler):
         currency = Erc20Token.find_by_ticker(
             ex_currency_amt["currency"], configuration_file.network.name
         )
+        io_loop = IOLoop.current()
+        chain_id = configuration_file.network.chain_id
+        [currency] = await io_loop.run_in_executor(
+            QUOTE_EXECUTOR, with_onchain_decimals, w3, chain_id, [currency]
+        )
         token_amount = TokenAmount(ex_currency_amt["target_amount"], currency)
+        if "exchange" not in ex_currency_amt:
+            await self._render_all_quotes(
+                w3, account, token_amount, ex_currency_amt["target_amount"]
+            )
+            return
+
         try:
-            exchange = Exchange.get_by_name(ex_currency_amt["exchange"])(w3=w3)
-            exchange_costs = exchange.calculate_transaction_costs(token_amount, account)
-            total_cost = exchange_costs["total"]
+            exchange_name = ex_currency_amt["exchange"]
+            quote = await io_loop.run_in_executor(
+                QUOTE_EXECUTOR, self._get_quote, w3, exchange_name, token_amount, account
+            )
+            total_cost = quote.total
             self.render_json(
                 {
-                    "exchange": exchange.name,
+                    "exchange": quote.exchange_name,
                     "currency": currency.ticker,
                     "target_amount": ex_currency_amt["target_amount"],
                     "as_wei": total_cost.as_wei,
                     "formatted": total_cost.formatted,
+                    "quote_block": quote.block_number,
+                    "quote_age": quote.age,
                     "utc_seconds": int(time.time()),
                 }
             )
@@ -343,6 +399,51 @@ class CostEstimationAPIHandler(APIHandler):
                 reason=str(ex),
             )
 
+    @staticmethod
+    def _get_quote(w3, exchange_name, token_amount, account):
+        exchange_class = Exchange.get_by_name(exchange_name)
+        block_number = w3.eth.blockNumber
+        return QUOTE_CACHE.get(
+            exchange_name,
+            token_amount,
+            block_number,
+            lambda: get_exchange_quote(
+                w3, exchange_class, token_amount, account, block_number=block_number
+            ),
+        )
+
+    async def _render_all_quotes(self, w3, account, token_amount, target_amount):
+        quote_engine = QuoteEngine(w3, quote_cache=QUOTE_CACHE)
+        quotes = await quote_engine.get_quotes_async(token_amount, account)
+        if not quotes:
+            self.set_status(
+                status_code=409,
+                reason=f"No exchange can offer {token_amount.formatted} at the moment",
+            )
+            return
+
+        self.render_json(
+            {
+                "currency": token_amount.ticker,
+                "target_amount": target_amount,
+                "best_exchange": quotes[0].exchange_name,
+                "quotes": [
+                    {
+                        "exchange": quote.exchange_name,
+                        "as_wei": quote.total.as_wei,
+                        "formatted": quote.total.formatted,
+                        "exchange_rate": quote.exchange_rate.as_wei,
+                        "gas": quote.gas,
+                        "gas_price": quote.gas_price.as_wei,
+                        "quote_block": quote.block_number,
+                        "quote_age": quote.age,
+                    }
+                    for quote in quotes
+                ],
+                "utc_seconds": int(time.time()),
+            }
+        )
+
 
 def get_app() -> Application:
     additional_handlers = [
@@ -20,6 +20,7 @@ class TestnetAsyncTaskHandler(AsyncTaskHandler):
         self.actions.update({
             "fund": self._run_funding
         })
+        self.durable_actions.add("fund")
 
     def _send_next_step(self, message_text, title, step):
         if not isinstance(message_text, list):
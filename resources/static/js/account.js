@@ -9,6 +9,7 @@ const RAMP_BALANCE_TIMEOUT = 300000;
 
 let neededEthAmount = ETHEREUM_REQUIRED_AMOUNT;
 let provider;
+let rampBalanceListener;
 
 function runFunding(configurationFileName) {
   let message = {
@@ -51,23 +52,19 @@ function showRamp() {
     ]);
 
     const boughtAmount = parseInt(event.payload.purchase.cryptoAmount);
-    let timeElapsed = 0;
-    let timer;
-    const checkBalance = async () => {
-      if (timeElapsed >= RAMP_BALANCE_TIMEOUT) {
-        if (timer) {
-          clearInterval(timer);
-        }
-        addErrorMessage([
-          `Balance did not get updated after ${
-            RAMP_BALANCE_TIMEOUT / 1000
-          } seconds!`,
-        ]);
-        return;
-      }
-
-      const balance = await getBalances(CONFIGURATION_DETAIL_URL);
+    const timeout = setTimeout(() => {
+      rampBalanceListener = undefined;
+      addErrorMessage([
+        `Balance did not get updated after ${
+          RAMP_BALANCE_TIMEOUT / 1000
+        } seconds!`,
+      ]);
+    }, RAMP_BALANCE_TIMEOUT);
+
+    rampBalanceListener = (balance) => {
       if (balance && balance.ETH && balance.ETH.as_wei >= boughtAmount) {
+        clearTimeout(timeout);
+        rampBalanceListener = undefined;
         addFeedbackMessage([
           `Balance got updated. You now have ${balance.ETH.formatted}.`,
         ]);
@@ -75,11 +72,8 @@ function showRamp() {
           forceNavigation(SWAP_URL);
         }, 5000);
       }
-      timeElapsed += 10000;
     };
-
-    checkBalance();
-    timer = setInterval(checkBalance, 10000);
+    rampBalanceListener(BALANCE);
   };
 
   const purchaseFailedCallback = () => {
@@ -275,16 +269,11 @@ function removeSpinner() {
   }
 }
 
-async function poll() {
-  const balance = await getBalances(CONFIGURATION_DETAIL_URL);
-  const config = await getConfigurationFileData(CONFIGURATION_DETAIL_URL);
+function showBalance(balance) {
   removeSpinner();
 
-  if (!balance.ETH.as_wei && config._initial_funding_txhash) {
-    return trackTransaction(
-      config._initial_funding_txhash,
-      CONFIGURATION_FILE_NAME
-    );
+  if (!balance.ETH.as_wei && INITIAL_FUNDING_TXHASH) {
+    return trackTransaction(INITIAL_FUNDING_TXHASH, CONFIGURATION_FILE_NAME);
   }
 
   if (balance.ETH.as_wei) {
@@ -296,8 +285,19 @@ async function poll() {
   }
 }
 
+function onBalanceUpdate(balance) {
+  if (rampBalanceListener) {
+    rampBalanceListener(balance);
+  }
+  if (MAIN_VIEW_ACTIVE) {
+    showBalance(balance);
+  }
+}
+
 function main() {
-  poll();
+  if (BALANCE) {
+    showBalance(BALANCE);
+  }
 }
 
 window.addEventListener("DOMContentLoaded", async function () {
@@ -305,7 +305,7 @@ window.addEventListener("DOMContentLoaded", async function () {
   if (FAUCET_AVAILABLE !== "True") {
     provider = await detectEthereumProvider();
     setUpEthAmountCheck();
-    window.MAIN_VIEW_INTERVAL = 10000;
+    watchBalances(CONFIGURATION_FILE_NAME, onBalanceUpdate);
     window.runMainView();
   } else {
     removeSpinner();
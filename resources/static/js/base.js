@@ -1,22 +1,39 @@
-var MAIN_VIEW_INTERVAL;
-var RUNNING_TIMERS = new Array();
+const TASK_STORAGE_KEY = "raiden-wizard-task";
+
+var MAIN_VIEW_ACTIVE = false;
+
+// The balances of the watched configuration, as pushed by the server
+let BALANCE;
+let BALANCE_LISTENER;
 
 let video;
 
 function runMainView() {
+  MAIN_VIEW_ACTIVE = true;
   if (typeof window.main === "function") {
     main();
-
-    if (MAIN_VIEW_INTERVAL) {
-      RUNNING_TIMERS.push(setInterval(window.main, MAIN_VIEW_INTERVAL));
-    }
   }
 }
 
 function stopMainView() {
-  while (RUNNING_TIMERS.length) {
-    let timer = RUNNING_TIMERS.pop();
-    clearInterval(timer);
+  MAIN_VIEW_ACTIVE = false;
+}
+
+function watchBalances(configuration_file_name, listener) {
+  BALANCE_LISTENER = listener;
+  const subscribe = () => {
+    WEBSOCKET.send(
+      JSON.stringify({
+        method: "watch_balances",
+        configuration_file_name: configuration_file_name,
+      })
+    );
+  };
+
+  if (WEBSOCKET.readyState === WebSocket.OPEN) {
+    subscribe();
+  } else {
+    WEBSOCKET.addEventListener("open", subscribe);
   }
 }
 
@@ -179,18 +196,6 @@ function toggleView() {
   }
 }
 
-async function getConfigurationFileData(configuration_file_url) {
-  let request = await fetch(configuration_file_url);
-  return await request.json();
-}
-
-async function getBalances(configuration_file_url) {
-  let configuration_file_data = await getConfigurationFileData(
-    configuration_file_url
-  );
-  return configuration_file_data && configuration_file_data.balance;
-}
-
 function updateBalanceDisplay(balance, opts) {
   let eth_balance_display = opts.ethereum_element;
   let service_token_display = opts.service_token_element;
@@ -239,8 +244,52 @@ function toWei(value) {
   return value * 10 ** 18;
 }
 
+function trackTaskSession(message) {
+  let finished =
+    (message.type === "task-state" &&
+      !["pending", "running"].includes(message.state)) ||
+    message.type === "redirect";
+
+  if (finished) {
+    sessionStorage.removeItem(TASK_STORAGE_KEY);
+  } else {
+    sessionStorage.setItem(TASK_STORAGE_KEY, message.task_id);
+  }
+
+  // Messages replayed after a reload, when the task tracker is not shown yet
+  let tracker_elem = document.querySelector("#background-task-tracker");
+  if (message.type !== "task-state" && tracker_elem && tracker_elem.hidden) {
+    toggleView();
+  }
+}
+
+WEBSOCKET.addEventListener("open", function () {
+  let task_id = sessionStorage.getItem(TASK_STORAGE_KEY);
+  if (task_id) {
+    WEBSOCKET.send(JSON.stringify({ method: "attach", task_id: task_id }));
+  }
+});
+
 WEBSOCKET.onmessage = function (evt) {
   let message = JSON.parse(evt.data);
+  if (message.type === "log-event") {
+    console.debug(message.line);
+    return;
+  }
+  if (message.type === "balance-update") {
+    // Only the balances that changed are sent
+    BALANCE = Object.assign({}, BALANCE, message.balance);
+    if (BALANCE_LISTENER) {
+      BALANCE_LISTENER(BALANCE);
+    }
+    return;
+  }
+  if (message.task_id) {
+    trackTaskSession(message);
+  }
+  if (message.type === "task-state") {
+    return;
+  }
   let message_list_elem = document.querySelector(
     "#background-task-tracker ul.messages"
   );
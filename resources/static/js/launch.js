@@ -1,7 +1,8 @@
-async function main() {
-  let balance = await getBalances(CONFIGURATION_DETAIL_URL);
-
-  document.querySelector(".spinner.balance-loading").remove();
+function showBalance(balance) {
+  let spinner_elem = document.querySelector(".spinner.balance-loading");
+  if (spinner_elem) {
+    spinner_elem.remove();
+  }
 
   let checklist_elem = document.querySelector("ul.checklist");
   let eth_balance_check_elem = checklist_elem.querySelector(
@@ -66,5 +67,5 @@ async function main() {
 
 window.addEventListener("DOMContentLoaded", async function () {
   setProgressStep(5, "Launch Raiden");
-  main();
+  watchBalances(CONFIGURATION_FILE_NAME, showBalance);
 });
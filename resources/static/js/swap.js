@@ -5,15 +5,32 @@ function validate() {
   submitButton.disabled = selectedExchange === "";
 }
 
-function requestCostEstimation(button) {
+function addEstimationElement(button) {
   const estimationElement = document.createElement("div");
   estimationElement.classList.add("estimation");
-  const placeholder = document.createTextNode(`Calculating costs...`);
-  estimationElement.appendChild(placeholder);
+  estimationElement.textContent = "Calculating costs...";
   button.appendChild(estimationElement);
+  return estimationElement;
+}
+
+function disableExchangeButton(button, estimationElement) {
+  estimationElement.textContent = "Swap not possible at the moment.";
+
+  button.disabled = true;
+  if (selectedExchange === button.value) {
+    selectedExchange = "";
+  }
+  validate();
+}
+
+function addCostsToButtons() {
+  const exchangeButtons = document.querySelectorAll(".exchange-button");
+  const estimationElements = new Map();
+  exchangeButtons.forEach((button) =>
+    estimationElements.set(button, addEstimationElement(button))
+  );
 
   const data = JSON.stringify({
-    exchange: button.value,
     currency: TOKEN_TICKER,
     target_amount: SWAP_AMOUNT / 10 ** DECIMALS,
   });
@@ -21,24 +38,26 @@ function requestCostEstimation(button) {
   const req = new XMLHttpRequest();
 
   req.onload = function () {
+    const quotes = new Map();
+    let bestExchange;
     if (this.status == 200) {
       const res = JSON.parse(this.response);
-      const text = document.createTextNode(
-        `Approximately ${res.formatted} as per exchange`
+      res.quotes.forEach((quote) =>
+        quotes.set(quote.exchange.toLowerCase(), quote)
       );
-      placeholder.remove();
-      estimationElement.appendChild(text);
-    } else {
-      const error = document.createTextNode(`Swap not possible at the moment.`);
-      placeholder.remove();
-      estimationElement.appendChild(error);
+      bestExchange = res.best_exchange.toLowerCase();
+    }
 
-      button.disabled = true;
-      if (selectedExchange === button.value) {
-        selectedExchange = "";
+    exchangeButtons.forEach((button) => {
+      const estimationElement = estimationElements.get(button);
+      const quote = quotes.get(button.value);
+      if (quote) {
+        const bestPriceText = button.value === bestExchange ? " (best price)" : "";
+        estimationElement.textContent = `Approximately ${quote.formatted} as per exchange${bestPriceText}`;
+      } else {
+        disableExchangeButton(button, estimationElement);
       }
-      validate();
-    }
+    });
   };
 
   req.open("POST", API_COST_ESTIMATION_ENDPOINT, true);
@@ -46,12 +65,6 @@ function requestCostEstimation(button) {
   req.send(data);
 }
 
-function addCostsToButtons() {
-  const exchangeButtons = document.querySelectorAll(".exchange-button");
-
-  exchangeButtons.forEach((button) => requestCostEstimation(button, "kyber"));
-}
-
 function setupButtons() {
   const exchangeButtons = document.querySelectorAll(".exchange-button");
 
@@ -84,6 +97,7 @@ function setupSubmit() {
         amount: SWAP_AMOUNT.toString(),
         token: TOKEN_TICKER,
         exchange: selectedExchange,
+        split_route: document.querySelector("#split-route").checked,
       })
     );
 
@@ -91,8 +105,11 @@ function setupSubmit() {
   });
 }
 
-async function skipSwap() {
-  let balance = await getBalances(CONFIGURATION_DETAIL_URL);
+function skipSwap(balance) {
+  // Balances also change while a swap is running
+  if (!MAIN_VIEW_ACTIVE || !balance) {
+    return;
+  }
 
   if (TOKEN_TICKER === "RDN" && hasEnoughServiceTokenToLaunchRaiden(balance)) {
     toggleView();
@@ -110,6 +127,7 @@ async function skipSwap() {
       ".hero"
     ).innerHTML = `Funds of ${balance.transfer_token.formatted} already acquired <br/>
       Moving on to launch Raiden`;
+    stopMainView();
     setTimeout(function () {
       forceNavigation(LAUNCH_URL);
     }, 5000);
@@ -117,7 +135,7 @@ async function skipSwap() {
 }
 
 function main() {
-  skipSwap();
+  skipSwap(BALANCE);
 }
 
 window.addEventListener("DOMContentLoaded", function () {
@@ -131,6 +149,6 @@ window.addEventListener("DOMContentLoaded", function () {
   setupSubmit();
   addCostsToButtons();
 
-  window.MAIN_VIEW_INTERVAL = 5000;
+  watchBalances(CONFIGURATION_FILE_NAME, skipSwap);
   window.runMainView();
 });
@@ -1,6 +1,7 @@
 import asyncio
 import json
 import os
+import threading
 from unittest.mock import patch
 
 import pytest
@@ -8,13 +9,16 @@ from eth_utils import encode_hex, to_canonical_address, to_checksum_address
 from tornado.httpclient import HTTPRequest
 from tornado.websocket import websocket_connect
 
-from raiden_installer import load_settings
-from raiden_installer.account import find_keystore_folder_path
+from raiden_installer import load_settings, tasks
+from raiden_installer.account import Account, find_keystore_folder_path
 from raiden_installer.base import RaidenConfigurationFile
 from raiden_installer.ethereum_rpc import Infura, make_web3_provider
 from raiden_installer.network import Network
-from raiden_installer.raiden import RaidenClient
 from raiden_installer.shared_handlers import get_passphrase, set_passphrase
+from raiden_installer.task_sessions import TaskSessionRegistry
+from raiden_installer.tasks import TaskCancelled
+from raiden_installer.swap_router import RouteLeg, SwapReport, SwapRoute
+from raiden_installer.token_exchange import ExchangeError, TransactionCosts
 from raiden_installer.tokens import ETH, Erc20Token, EthereumAmount, TokenAmount, Wei
 from raiden_installer.transactions import get_token_balance, get_token_deposit
 from raiden_installer.utils import TransactionTimeoutError
@@ -45,6 +49,19 @@ def is_unlock_page(body):
     return UNLOCK_PAGE_HEADLINE in body.decode("utf-8")
 
 
+def run_in_thread(func, *args):
+    """ Waits for ``func`` without blocking the IOLoop serving the wizard """
+    return asyncio.get_event_loop().run_in_executor(None, func, *args)
+
+
+async def read_task_message(ws_client):
+    """ Reads the next message of a task session, skipping its state changes """
+    while True:
+        message = json.loads(await ws_client.read_message())
+        if message["type"] != "task-state":
+            return message
+
+
 def check_balances(w3, account, settings, check_func):
     balance = account.get_ethereum_balance(w3)
 
@@ -97,6 +114,12 @@ class SharedHandlersTests:
         yield
         set_passphrase(None)
 
+    @pytest.fixture(autouse=True)
+    def task_sessions(self, monkeypatch):
+        task_sessions = TaskSessionRegistry(TESTING_TEMP_FOLDER.joinpath("tasks"))
+        monkeypatch.setattr("raiden_installer.shared_handlers.TASK_SESSIONS", task_sessions)
+        return task_sessions
+
     @pytest.fixture
     def ws_client(self, http_client, http_port):
         loop = asyncio.get_event_loop()
@@ -247,6 +270,65 @@ class SharedHandlersTests:
         assert message["type"] == "error-message"
         assert get_passphrase() == None
 
+    @pytest.mark.gen_test
+    def test_actions_of_a_connection_run_at_once(self, ws_client, test_password, test_account):
+        started = threading.Event()
+        release = threading.Event()
+
+        def check_passphrase(passphrase):
+            if passphrase == test_password:
+                started.set()
+                release.wait(10)
+            return False
+
+        with patch.object(Account, "check_passphrase", side_effect=check_passphrase):
+            data = {
+                "method": "unlock",
+                "passphrase": test_password,
+                "keystore_file_path": str(test_account.keystore_file_path),
+                "return_to": "/"
+            }
+            ws_client.write_message(json.dumps(data))
+            yield run_in_thread(started.wait, 5)
+            ws_client.write_message(json.dumps(dict(data, passphrase="wrong" + test_password)))
+
+            try:
+                message = json.loads((yield ws_client.read_message()))
+                assert message["type"] == "error-message"
+                assert not release.is_set()
+            finally:
+                release.set()
+
+    @pytest.mark.gen_test
+    def test_closing_the_connection_cancels_running_actions(
+        self, ws_client, test_password, test_account
+    ):
+        started = threading.Event()
+        cancelled = threading.Event()
+
+        def check_passphrase(passphrase):
+            started.set()
+            try:
+                tasks.sleep(10)
+            except TaskCancelled:
+                cancelled.set()
+                raise
+            return True
+
+        with patch.object(Account, "check_passphrase", side_effect=check_passphrase):
+            data = {
+                "method": "unlock",
+                "passphrase": test_password,
+                "keystore_file_path": str(test_account.keystore_file_path),
+                "return_to": "/"
+            }
+            ws_client.write_message(json.dumps(data))
+            yield run_in_thread(started.wait, 5)
+            ws_client.close()
+
+            assert (yield run_in_thread(cancelled.wait, 2))
+            assert get_passphrase() == None
+
     @pytest.mark.gen_test
     def test_setup(
         self,
@@ -331,10 +413,23 @@ class SharedHandlersTests:
 
     @pytest.mark.gen_test
     def test_launch(self, ws_client, config, unlocked):
-        with patch("raiden_installer.raiden.RaidenClient.get_client") as mock_get_client:
+        with patch(
+            "raiden_installer.raiden.RaidenClient.get_client"
+        ) as mock_get_client, patch(
+            "raiden_installer.shared_handlers.RaidenNode"
+        ) as mock_node_class, patch(
+            "raiden_installer.shared_handlers.supervise"
+        ) as mock_supervise:
             mock_client = mock_get_client()
             mock_client.is_installed = False
-            mock_client.is_running = False
+            mock_node = mock_node_class()
+            mock_node.is_running = False
+            mock_node.web_ui_url = "http://127.0.0.1:5002"
+            mock_node.wait_for_web_ui_ready.side_effect = lambda **kw: asyncio.sleep(0)
+            launch_threads = []
+            mock_node.launch.side_effect = lambda passphrase_file: launch_threads.append(
+                threading.get_ident()
+            )
 
             data = {
                 "method": "launch",
@@ -351,18 +446,25 @@ class SharedHandlersTests:
 
             message = json.loads((yield ws_client.read_message()))
             assert message["type"] == "redirect"
-            assert message["redirect_url"] == RaidenClient.WEB_UI_INDEX_URL
+            assert message["redirect_url"] == "http://127.0.0.1:5002"
 
             mock_client.install.assert_called_once()
-            mock_client.launch.assert_called_once()
-            mock_client.wait_for_web_ui_ready.assert_called_once()
+            mock_node.assign_api_port.assert_called_once()
+            mock_node.launch.assert_called_once()
+            # The launch does not block the IOLoop
+            assert launch_threads != [threading.get_ident()]
+            mock_node.wait_for_web_ui_ready.assert_called_once()
+            mock_supervise.assert_called_once()
 
     @pytest.mark.gen_test
     def test_locked_launch(self, ws_client, config):
-        with patch("raiden_installer.raiden.RaidenClient.get_client") as mock_get_client:
+        with patch("raiden_installer.raiden.RaidenClient.get_client") as mock_get_client, patch(
+            "raiden_installer.shared_handlers.RaidenNode"
+        ) as mock_node_class:
             mock_client = mock_get_client()
             mock_client.is_installed = False
-            mock_client.is_running = False
+            mock_node = mock_node_class()
+            mock_node.is_running = False
 
             data = {
                 "method": "launch",
@@ -374,8 +476,8 @@ class SharedHandlersTests:
             assert message["type"] == "error-message"
 
             mock_client.install.assert_not_called()
-            mock_client.launch.assert_not_called()
-            mock_client.wait_for_web_ui_ready.assert_not_called()
+            mock_node.launch.assert_not_called()
+            mock_node.wait_for_web_ui_ready.assert_not_called()
 
 
 class TestWeb(SharedHandlersTests):
@@ -392,7 +494,14 @@ class TestWeb(SharedHandlersTests):
         return "mainnet"
 
     @pytest.fixture
-    def mock_get_exchange(self):
+    def mock_split_router(self):
+        with patch("raiden_installer.web.SplitRouter") as mock_split_router:
+            router = mock_split_router.from_exchange_classes.return_value
+            router.get_route.side_effect = ExchangeError("No route")
+            yield mock_split_router
+
+    @pytest.fixture
+    def mock_get_exchange(self, mock_split_router):
         with patch("raiden_installer.token_exchange.Exchange.get_by_name") as mock_get_exchange:
             yield mock_get_exchange
 
@@ -439,13 +548,14 @@ class TestWeb(SharedHandlersTests):
         mock_get_exchange
     ):
         exchange = "Kyber"
-        exchange_costs = {
-            "gas_price": EthereumAmount(Wei(1000000000)),
-            "gas": Wei(500000),
-            "eth_sold": EthereumAmount(0.5),
-            "total": EthereumAmount(0.505),
-            "exchange_rate": EthereumAmount(0.05),
-        }
+        exchange_costs = TransactionCosts(
+            gas_price=EthereumAmount(Wei(1000000000)),
+            gas=Wei(500000),
+            eth_sold=EthereumAmount(0.5),
+            total=EthereumAmount(0.505),
+            exchange_rate=EthereumAmount(0.05),
+            block_number=1,
+        )
         mock_exchange = mock_get_exchange()()
         mock_exchange.name = exchange
         mock_exchange.calculate_transaction_costs.return_value = exchange_costs
@@ -468,8 +578,8 @@ class TestWeb(SharedHandlersTests):
         assert json_response["exchange"] == exchange
         assert json_response["currency"] == currency
         assert json_response["target_amount"] == target_amount
-        assert json_response["as_wei"] == exchange_costs["total"].as_wei
-        assert json_response["formatted"] == exchange_costs["total"].formatted
+        assert json_response["as_wei"] == exchange_costs.total.as_wei
+        assert json_response["formatted"] == exchange_costs.total.formatted
 
     # Websocket methods tests
 
@@ -485,14 +595,14 @@ class TestWeb(SharedHandlersTests):
             }
             ws_client.write_message(json.dumps(data))
 
-            message = json.loads((yield ws_client.read_message()))
+            message = (yield read_task_message(ws_client))
             assert message["type"] == "hash"
             assert message["tx_hash"] == tx_hash
 
-            message = json.loads((yield ws_client.read_message()))
+            message = (yield read_task_message(ws_client))
             assert message["type"] == "status-update"
 
-            message = json.loads((yield ws_client.read_message()))
+            message = (yield read_task_message(ws_client))
             assert message["type"] == "redirect"
             assert message["redirect_url"] == (
                 f"/swap/{config.file_name}/{settings.service_token.ticker}"
@@ -505,6 +615,90 @@ class TestWeb(SharedHandlersTests):
             loaded_config = RaidenConfigurationFile.get_by_filename(config.file_name)
             assert loaded_config._initial_funding_txhash == None
 
+    @pytest.mark.gen_test
+    def test_track_transaction_not_confirmed(self, ws_client, config):
+        with patch(
+            "raiden_installer.web.wait_for_transaction", side_effect=TransactionTimeoutError()
+        ):
+            tx_hash = encode_hex(os.urandom(32))
+            data = {
+                "method": "track_transaction",
+                "configuration_file_name": config.file_name,
+                "tx_hash": tx_hash
+            }
+            ws_client.write_message(json.dumps(data))
+
+            message = (yield read_task_message(ws_client))
+            assert message["type"] == "hash"
+
+            message = (yield read_task_message(ws_client))
+            assert message["type"] == "error-message"
+
+            message = (yield read_task_message(ws_client))
+            assert message["type"] == "hash"
+            assert message["tx_hash"] == tx_hash
+
+            loaded_config = RaidenConfigurationFile.get_by_filename(config.file_name)
+            assert loaded_config._initial_funding_txhash == tx_hash
+
+    @pytest.mark.gen_test
+    def test_task_sessions_of_a_connection_run_at_once(self, ws_client, config, task_sessions):
+        release = threading.Event()
+
+        with patch(
+            "raiden_installer.web.wait_for_transaction", side_effect=lambda *_: release.wait(10)
+        ):
+            data = {
+                "method": "track_transaction",
+                "configuration_file_name": config.file_name,
+                "tx_hash": encode_hex(os.urandom(32))
+            }
+            ws_client.write_message(json.dumps(data))
+            message = (yield read_task_message(ws_client))
+            assert message["type"] == "hash"
+            first_task_id = message["task_id"]
+
+            ws_client.write_message(
+                json.dumps(dict(data, configuration_file_name="invalid" + config.file_name))
+            )
+            try:
+                message = (yield read_task_message(ws_client))
+                assert message["type"] == "error-message"
+                assert message["task_id"] != first_task_id
+                assert not release.is_set()
+            finally:
+                release.set()
+
+            message = (yield read_task_message(ws_client))
+            assert message["type"] == "status-update"
+            assert message["task_id"] == first_task_id
+
+            first_session = task_sessions.get(first_task_id)
+            assert not first_session.has_errors
+
+    @pytest.mark.gen_test
+    def test_track_transaction_failure_is_recorded(self, ws_client, config):
+        with patch(
+            "raiden_installer.web.wait_for_transaction", side_effect=RuntimeError("node gone")
+        ):
+            data = {
+                "method": "track_transaction",
+                "configuration_file_name": config.file_name,
+                "tx_hash": encode_hex(os.urandom(32))
+            }
+            ws_client.write_message(json.dumps(data))
+
+            message = (yield read_task_message(ws_client))
+            assert message["type"] == "hash"
+
+            message = (yield read_task_message(ws_client))
+            assert message["type"] == "error-message"
+            assert message["text"] == ["track_transaction failed: node gone"]
+
+            message = json.loads((yield ws_client.read_message()))
+            assert message["type"] == "task-state"
+            assert message["state"] == "failed"
+
     @pytest.mark.gen_test
     def test_track_transaction_with_invalid_config(self, ws_client, config, io_loop):
         with patch("raiden_installer.web.wait_for_transaction") as mock_wait_for_transaction:
@@ -516,7 +710,7 @@ class TestWeb(SharedHandlersTests):
             }
             ws_client.write_message(json.dumps(data))
 
-            message = json.loads((yield ws_client.read_message()))
+            message = (yield read_task_message(ws_client))
             assert message["type"] == "error-message"
 
             mock_wait_for_transaction.assert_not_called()
@@ -529,6 +723,7 @@ class TestWeb(SharedHandlersTests):
         settings,
         unlocked,
         mock_get_exchange,
+        mock_split_router,
         mock_deposit_service_tokens,
         mock_wait_for_transaction
     ):
@@ -558,13 +753,14 @@ class TestWeb(SharedHandlersTests):
 
         with eth_balance_patch, token_balance_patch, total_tokens_patch, token_deposit_patch:
             mock_exchange = mock_get_exchange()()
-            mock_exchange.calculate_transaction_costs.return_value = {
-                "gas_price": EthereumAmount(Wei(1000000000)),
-                "gas": Wei(500000),
-                "eth_sold": EthereumAmount(0.5),
-                "total": EthereumAmount(0.505),
-                "exchange_rate": EthereumAmount(0.05),
-            }
+            mock_exchange.calculate_transaction_costs.return_value = TransactionCosts(
+                gas_price=EthereumAmount(Wei(1000000000)),
+                gas=Wei(500000),
+                eth_sold=EthereumAmount(0.5),
+                total=EthereumAmount(0.505),
+                exchange_rate=EthereumAmount(0.05),
+                block_number=1,
+            )
             mock_exchange.buy_tokens.return_value = os.urandom(32)
             mock_exchange.name = "uniswap"
 
@@ -578,13 +774,13 @@ class TestWeb(SharedHandlersTests):
             ws_client.write_message(json.dumps(data))
 
             for _ in range(8):
-                message = json.loads((yield ws_client.read_message()))
+                message = (yield read_task_message(ws_client))
                 assert message["type"] == "status-update"
 
-            message = json.loads((yield ws_client.read_message()))
+            message = (yield read_task_message(ws_client))
             assert message["type"] == "summary"
 
-            message = json.loads((yield ws_client.read_message()))
+            message = (yield read_task_message(ws_client))
             assert message["type"] == "redirect"
             assert message["redirect_url"] == (
                 f"/swap/{config.file_name}/{settings.transfer_token.ticker}"
@@ -593,6 +789,91 @@ class TestWeb(SharedHandlersTests):
             mock_exchange.calculate_transaction_costs.assert_called_once()
             mock_exchange.buy_tokens.assert_called_once()
             mock_deposit_service_tokens.assert_called_once()
+            # The user did not opt in to splitting the swap
+            mock_split_router.from_exchange_classes.assert_not_called()
+
+    @pytest.mark.gen_test(timeout=10)
+    def test_split_swap(
+        self,
+        ws_client,
+        config,
+        settings,
+        unlocked,
+        mock_get_exchange,
+        mock_split_router,
+        mock_deposit_service_tokens,
+        mock_wait_for_transaction
+    ):
+        eth_balance_patch = patch(
+            "raiden_installer.account.Account.get_ethereum_balance",
+            return_value=EthereumAmount(100)
+        )
+        token_balance_patch = patch(
+            "raiden_installer.web.get_token_balance",
+            side_effect=lambda w3, account, token: TokenAmount(10, token)
+        )
+        total_tokens_patch = patch(
+            "raiden_installer.web.get_total_token_owned",
+            side_effect=lambda w3, account, token: TokenAmount(10, token)
+        )
+        token_deposit_patch = patch(
+            "raiden_installer.shared_handlers.get_token_deposit",
+            side_effect=lambda w3, account, token: TokenAmount(10, token)
+        )
+
+        with eth_balance_patch, token_balance_patch, total_tokens_patch, token_deposit_patch:
+            mock_exchange = mock_get_exchange()()
+            mock_exchange.calculate_transaction_costs.return_value = TransactionCosts(
+                gas_price=EthereumAmount(Wei(1000000000)),
+                gas=Wei(500000),
+                eth_sold=EthereumAmount(0.5),
+                total=EthereumAmount(0.505),
+                exchange_rate=EthereumAmount(0.05),
+                block_number=1,
+            )
+            mock_exchange.name = "uniswap"
+
+            token = Erc20Token.find_by_ticker(settings.service_token.ticker, settings.network)
+            legs = tuple(
+                RouteLeg(
+                    exchange=mock_exchange,
+                    token_amount=TokenAmount(5, token),
+                    eth_cost=EthereumAmount(0.2),
+                    gas_cost=EthereumAmount(0.001),
+                )
+                for _ in range(2)
+            )
+            route = SwapRoute(legs=legs, block_number=1)
+            router = mock_split_router.from_exchange_classes.return_value
+            router.get_route.side_effect = None
+            router.get_route.return_value = route
+            mock_split_router.return_value.execute.return_value = SwapReport(
+                route=route,
+                transaction_hashes=(os.urandom(32), os.urandom(32)),
+                quoted_total=route.total,
+                realized_total=route.total,
+            )
+
+            data = {
+                "method": "swap",
+                "configuration_file_name": config.file_name,
+                "amount": "10000000000000000000",
+                "token": settings.service_token.ticker,
+                "exchange": "uniswap",
+                "split_route": True
+            }
+            ws_client.write_message(json.dumps(data))
+
+            for _ in range(7):
+                message = (yield read_task_message(ws_client))
+                assert message["type"] == "status-update"
+
+            message = (yield read_task_message(ws_client))
+            assert message["type"] == "summary"
+
+            mock_split_router.return_value.execute.assert_called_once()
+            mock_exchange.buy_tokens.assert_not_called()
+            mock_deposit_service_tokens.assert_called_once()
 
     @pytest.mark.gen_test
     def test_swap_with_invalid_exchange(
@@ -615,7 +896,7 @@ class TestWeb(SharedHandlersTests):
         }
         ws_client.write_message(json.dumps(data))
 
-        message = json.loads((yield ws_client.read_message()))
+        message = (yield read_task_message(ws_client))
         assert message["type"] == "error-message"
 
         mock_exchange.calculate_transaction_costs.assert_not_called()
@@ -638,13 +919,14 @@ class TestWeb(SharedHandlersTests):
                 return_value=EthereumAmount(0)
         ):
             mock_exchange = mock_get_exchange()()
-            mock_exchange.calculate_transaction_costs.return_value = {
-                "gas_price": EthereumAmount(Wei(1000000000)),
-                "gas": Wei(500000),
-                "eth_sold": EthereumAmount(0.5),
-                "total": EthereumAmount(0.505),
-                "exchange_rate": EthereumAmount(0.05),
-            }
+            mock_exchange.calculate_transaction_costs.return_value = TransactionCosts(
+                gas_price=EthereumAmount(Wei(1000000000)),
+                gas=Wei(500000),
+                eth_sold=EthereumAmount(0.5),
+                total=EthereumAmount(0.505),
+                exchange_rate=EthereumAmount(0.05),
+                block_number=1,
+            )
 
             data = {
                 "method": "swap",
@@ -655,13 +937,13 @@ class TestWeb(SharedHandlersTests):
             }
             ws_client.write_message(json.dumps(data))
 
-            message = json.loads((yield ws_client.read_message()))
+            message = (yield read_task_message(ws_client))
             assert message["type"] == "status-update"
 
-            message = json.loads((yield ws_client.read_message()))
+            message = (yield read_task_message(ws_client))
             assert message["type"] == "summary"
 
-            message = json.loads((yield ws_client.read_message()))
+            message = (yield read_task_message(ws_client))
             assert message["type"] == "redirect"
             assert message["redirect_url"] == (
                 f"/swap/{config.file_name}/{settings.service_token.ticker}"
@@ -701,13 +983,14 @@ class TestWeb(SharedHandlersTests):
 
         with eth_balance_patch, token_balance_patch, total_tokens_patch, token_deposit_patch:
             mock_exchange = mock_get_exchange()()
-            mock_exchange.calculate_transaction_costs.return_value = {
-                "gas_price": EthereumAmount(Wei(1000000000)),
-                "gas": Wei(500000),
-                "eth_sold": EthereumAmount(0.5),
-                "total": EthereumAmount(0.505),
-                "exchange_rate": EthereumAmount(0.05),
-            }
+            mock_exchange.calculate_transaction_costs.return_value = TransactionCosts(
+                gas_price=EthereumAmount(Wei(1000000000)),
+                gas=Wei(500000),
+                eth_sold=EthereumAmount(0.5),
+                total=EthereumAmount(0.505),
+                exchange_rate=EthereumAmount(0.05),
+                block_number=1,
+            )
             mock_exchange.buy_tokens.return_value = os.urandom(32)
             mock_exchange.name = "uniswap"
 
@@ -721,13 +1004,13 @@ class TestWeb(SharedHandlersTests):
             ws_client.write_message(json.dumps(data))
 
             for _ in range(8):
-                message = json.loads((yield ws_client.read_message()))
+                message = (yield read_task_message(ws_client))
                 assert message["type"] == "status-update"
 
-            message = json.loads((yield ws_client.read_message()))
+            message = (yield read_task_message(ws_client))
             assert message["type"] == "summary"
 
-            message = json.loads((yield ws_client.read_message()))
+            message = (yield read_task_message(ws_client))
             assert message["type"] == "redirect"
             assert message["redirect_url"] == (
                 f"/launch/{config.file_name}"
@@ -768,13 +1051,13 @@ class TestWeb(SharedHandlersTests):
             ws_client.write_message(json.dumps(data))
 
             for _ in range(3):
-                message = json.loads((yield ws_client.read_message()))
+                message = (yield read_task_message(ws_client))
                 assert message["type"] == "status-update"
 
-            message = json.loads((yield ws_client.read_message()))
+            message = (yield read_task_message(ws_client))
             assert message["type"] == "summary"
 
-            message = json.loads((yield ws_client.read_message()))
+            message = (yield read_task_message(ws_client))
             assert message["type"] == "redirect"
             assert message["redirect_url"] == (
                 f"/launch/{config.file_name}"
@@ -796,7 +1079,7 @@ class TestWeb(SharedHandlersTests):
         }
         ws_client.write_message(json.dumps(data))
 
-        message = json.loads((yield ws_client.read_message()))
+        message = (yield read_task_message(ws_client))
         assert message["type"] == "error-message"
 
         mock_deposit_service_tokens.assert_not_called()
@@ -827,13 +1110,13 @@ class TestWeb(SharedHandlersTests):
             }
             ws_client.write_message(json.dumps(data))
 
-            message = json.loads((yield ws_client.read_message()))
+            message = (yield read_task_message(ws_client))
             assert message["type"] == "status-update"
 
-            message = json.loads((yield ws_client.read_message()))
+            message = (yield read_task_message(ws_client))
             assert message["type"] == "summary"
 
-            message = json.loads((yield ws_client.read_message()))
+            message = (yield read_task_message(ws_client))
             assert message["type"] == "redirect"
             assert message["redirect_url"] == (
                 f"/launch/{config.file_name}"
@@ -864,20 +1147,20 @@ class TestWebTestnet(SharedHandlersTests):
         ws_client.write_message(json.dumps(data))
 
         for _ in range(2):
-            message = json.loads((yield ws_client.read_message()))
+            message = (yield read_task_message(ws_client))
             assert message["type"] == "status-update"
 
-        message = json.loads((yield ws_client.read_message()))
+        message = (yield read_task_message(ws_client))
         assert message["type"] == "next-step"
 
         for _ in range(3):
-            message = json.loads((yield ws_client.read_message()))
+            message = (yield read_task_message(ws_client))
             assert message["type"] == "status-update"
 
-        message = json.loads((yield ws_client.read_message()))
+        message = (yield read_task_message(ws_client))
         assert message["type"] == "next-step"
 
-        message = json.loads((yield ws_client.read_message()))
+        message = (yield read_task_message(ws_client))
         assert message["type"] == "redirect"
         assert message["redirect_url"] == f"/launch/{config.file_name}"
 
@@ -901,7 +1184,7 @@ class TestWebTestnet(SharedHandlersTests):
         }
         ws_client.write_message(json.dumps(data))
 
-        message = json.loads((yield ws_client.read_message()))
+        message = (yield read_task_message(ws_client))
         assert message["type"] == "error-message"
 
         w3 = make_web3_provider(config.ethereum_client_rpc_endpoint, test_account)
@@ -915,7 +1198,7 @@ class TestWebTestnet(SharedHandlersTests):
         }
         ws_client.write_message(json.dumps(data))
 
-        message = json.loads((yield ws_client.read_message()))
+        message = (yield read_task_message(ws_client))
         assert message["type"] == "error-message"
 
         w3 = make_web3_provider(config.ethereum_client_rpc_endpoint, test_account)
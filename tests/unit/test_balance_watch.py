@@ -0,0 +1,99 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock, patch
+
+from raiden_installer.balance_watch import BalanceWatcher
+
+
+def make_balance(as_wei):
+    return {"as_wei": as_wei, "formatted": f"{as_wei} WEI"}
+
+
+class BalanceWatcherTestCase(unittest.TestCase):
+    def setUp(self):
+        self.w3 = MagicMock()
+        self.w3.eth.blockNumber = 1
+        self.balances = {"ETH": make_balance(1), "service_token": None, "transfer_token": None}
+        self.reads = 0
+        patchers = [
+            patch("raiden_installer.balance_watch.make_web3_provider", return_value=self.w3),
+            patch("raiden_installer.balance_watch.get_balances", self.get_balances),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.watcher = BalanceWatcher(MagicMock(file_name="config.toml"), interval=0.01)
+
+    def get_balances(self, w3, configuration_file):
+        self.reads += 1
+        return dict(self.balances)
+
+    def test_changes_are_pushed_once_per_block(self):
+        received = [], []
+        first_balances = dict(self.balances)
+
+        async def watch():
+            self.assertIsNone(self.watcher.subscribe(received[0].append))
+            await asyncio.sleep(0.1)
+            self.assertEqual(self.watcher.subscribe(received[1].append), first_balances)
+
+            # A new block without changes
+            self.w3.eth.blockNumber = 2
+            await asyncio.sleep(0.1)
+
+            self.w3.eth.blockNumber = 3
+            self.balances["service_token"] = make_balance(5)
+            await asyncio.sleep(0.1)
+
+            for subscriber in (received[0].append, received[1].append):
+                self.watcher.unsubscribe(subscriber)
+
+        asyncio.run(watch())
+
+        self.assertEqual(self.reads, 3)
+        self.assertEqual(received[0], [first_balances, {"service_token": make_balance(5)}])
+        self.assertEqual(received[1], [{"service_token": make_balance(5)}])
+        self.assertFalse(self.watcher.is_watching)
+
+    def test_failed_reads_are_retried(self):
+        block_numbers = [ValueError("Ethereum node unavailable"), 1]
+
+        class FlakyEth:
+            @property
+            def blockNumber(self):
+                block_number = block_numbers.pop(0) if len(block_numbers) > 1 else 1
+                if isinstance(block_number, Exception):
+                    raise block_number
+                return block_number
+
+        self.w3.eth = FlakyEth()
+        received = []
+
+        async def watch():
+            self.watcher.subscribe(received.append)
+            await asyncio.sleep(0.1)
+            self.watcher.unsubscribe(received.append)
+
+        asyncio.run(watch())
+        self.assertEqual(received, [self.balances])
+
+    def test_unexpected_errors_do_not_stop_the_watcher(self):
+        failures = [KeyError("service_token")]
+
+        def get_balances(w3, configuration_file):
+            if failures:
+                raise failures.pop()
+            return dict(self.balances)
+
+        received = []
+
+        async def watch():
+            self.watcher.subscribe(received.append)
+            await asyncio.sleep(0.1)
+            self.assertTrue(self.watcher.is_watching)
+            self.watcher.unsubscribe(received.append)
+
+        with patch("raiden_installer.balance_watch.get_balances", get_balances):
+            asyncio.run(watch())
+
+        self.assertEqual(received, [self.balances])
@@ -55,6 +55,22 @@ class RaidenConfigurationTestCase(unittest.TestCase):
         except ValueError:
             self.fail("should load configuration by file name")
 
+    def test_api_port_is_saved(self):
+        self.configuration_file.save()
+        self.assertIsNone(
+            RaidenConfigurationFile.get_by_filename(self.configuration_file.file_name).api_port
+        )
+        self.assertEqual(RaidenConfigurationFile.get_api_ports(), set())
+
+        self.configuration_file.api_port = 5002
+        self.configuration_file.save()
+        configuration_file = RaidenConfigurationFile.get_by_filename(
+            self.configuration_file.file_name
+        )
+        self.assertEqual(configuration_file.configuration_data["api-address"], "127.0.0.1:5002")
+        self.assertEqual(configuration_file.api_port, 5002)
+        self.assertEqual(RaidenConfigurationFile.get_api_ports(), {5002})
+
     def test_cannot_get_by_not_existing_filename(self):
         with self.assertRaises(ValueError):
             RaidenConfigurationFile.get_by_filename("invalid")
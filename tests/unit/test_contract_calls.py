@@ -0,0 +1,85 @@
+import unittest
+from unittest.mock import MagicMock
+
+from eth_abi import encode_abi
+from eth_utils import encode_hex, to_canonical_address
+from web3 import Web3
+
+from raiden_contracts.constants import CONTRACT_USER_DEPOSIT
+from raiden_installer import contract_calls
+from raiden_installer.kyber.web3.contracts import KYBER_NETWORK_PROXY_ABI
+from raiden_installer.transactions import (
+    DEPOSIT_TOKEN_ADDRESSES,
+    EIP20_ABI,
+    _get_contract_manager,
+    _get_deposit_token_address,
+)
+from raiden_installer.uniswap.web3.contracts import UNISWAP_FACTORY_ABI, UNISWAP_ROUTER02_ABI
+
+CONTRACT_ADDRESS = "0x818E6FECD516Ecc3849DAf6845e3EC868087B755"
+OWNER = to_canonical_address("0x0000000000000000000000000000000000000001")
+SPENDER = to_canonical_address("0x0000000000000000000000000000000000000002")
+
+
+class PrecompiledCallTestCase(unittest.TestCase):
+    def setUp(self):
+        self.w3 = Web3()
+
+    def assert_same_encoding(self, abi, precompiled_call, *args):
+        contract = self.w3.eth.contract(address=CONTRACT_ADDRESS, abi=abi)
+        expected = contract.encodeABI(fn_name=precompiled_call.name, args=list(args))
+        self.assertEqual("0x" + precompiled_call.encode(*args).hex(), expected)
+
+    def test_encoding_matches_contract_abi(self):
+        deposit_abi = _get_contract_manager().get_contract_abi(CONTRACT_USER_DEPOSIT)
+
+        self.assert_same_encoding(EIP20_ABI, contract_calls.BALANCE_OF, OWNER)
+        self.assert_same_encoding(EIP20_ABI, contract_calls.ALLOWANCE, OWNER, SPENDER)
+        self.assert_same_encoding(deposit_abi, contract_calls.EFFECTIVE_BALANCE, OWNER)
+        self.assert_same_encoding(deposit_abi, contract_calls.TOTAL_DEPOSIT, OWNER)
+        self.assert_same_encoding(deposit_abi, contract_calls.DEPOSIT_TOKEN)
+        self.assert_same_encoding(
+            KYBER_NETWORK_PROXY_ABI, contract_calls.GET_EXPECTED_RATE, OWNER, SPENDER, 10 ** 18
+        )
+        self.assert_same_encoding(KYBER_NETWORK_PROXY_ABI, contract_calls.MAX_GAS_PRICE)
+        self.assert_same_encoding(
+            UNISWAP_ROUTER02_ABI, contract_calls.GET_AMOUNTS_IN, 10 ** 18, [OWNER, SPENDER]
+        )
+        self.assert_same_encoding(UNISWAP_FACTORY_ABI, contract_calls.GET_PAIR, OWNER, SPENDER)
+
+    def test_decode(self):
+        self.assertEqual(contract_calls.BALANCE_OF.decode(encode_abi(["uint256"], [5])), 5)
+        self.assertEqual(
+            contract_calls.GET_EXPECTED_RATE.decode(encode_abi(["uint256", "uint256"], [1, 2])),
+            (1, 2),
+        )
+        with self.assertRaises(ValueError):
+            contract_calls.BALANCE_OF.decode("0x")
+
+    def test_call(self):
+        w3 = MagicMock()
+        w3.manager.request_blocking.return_value = encode_hex(encode_abi(["uint256"], [42]))
+
+        balance = contract_calls.BALANCE_OF.call(w3, CONTRACT_ADDRESS, OWNER)
+
+        self.assertEqual(balance, 42)
+        w3.eth.call.assert_not_called()
+        method, (call, block_identifier) = w3.manager.request_blocking.call_args[0]
+        self.assertEqual(method, "eth_call")
+        self.assertEqual(call["to"], CONTRACT_ADDRESS)
+        self.assertEqual(call["data"], encode_hex(contract_calls.BALANCE_OF.encode(OWNER)))
+        self.assertEqual(block_identifier, "latest")
+
+
+class DepositTokenAddressTestCase(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(DEPOSIT_TOKEN_ADDRESSES.clear)
+
+    def test_deposit_token_is_read_once(self):
+        w3 = MagicMock()
+        w3.manager.request_blocking.return_value = encode_hex(encode_abi(["address"], [OWNER]))
+        contract_address = to_canonical_address(CONTRACT_ADDRESS)
+
+        self.assertEqual(_get_deposit_token_address(w3, contract_address), OWNER)
+        self.assertEqual(_get_deposit_token_address(w3, contract_address), OWNER)
+        self.assertEqual(w3.manager.request_blocking.call_count, 1)
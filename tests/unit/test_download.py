@@ -0,0 +1,353 @@
+import hashlib
+import io
+import os
+import tarfile
+import tempfile
+import threading
+import time
+import unittest
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from raiden_installer.constants import DOWNLOAD_TIMEOUT
+from raiden_installer.download import (
+    ChecksumMismatchError,
+    DownloadCache,
+    DownloadError,
+    DownloadProgress,
+    extract_binary,
+    install_binary,
+)
+
+BINARY_CONTENT = os.urandom(200_000)
+URL = "https://test.download.url/raiden.tar.gz"
+OTHER_URL = "https://other.download.url/raiden.tar.gz"
+
+
+def make_tar_archive(content):
+    archive = io.BytesIO()
+    with tarfile.open(mode="w:gz", fileobj=archive) as tar:
+        info = tarfile.TarInfo("raiden")
+        info.size = len(content)
+        tar.addfile(info, io.BytesIO(content))
+    return archive.getvalue()
+
+
+def make_zip_archive(content):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zipped:
+        zipped.writestr("raiden", content)
+    return archive.getvalue()
+
+
+def make_response(content, status_code=200, headers=None, chunk_size=10_000):
+    response = MagicMock()
+    response.__enter__.return_value = response
+    response.status_code = status_code
+    response.headers = {"Content-Length": str(len(content)), **(headers or {})}
+    response.iter_content.return_value = [
+        content[start : start + chunk_size] for start in range(0, len(content), chunk_size)
+    ]
+    return response
+
+
+def sha256(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+@patch("raiden_installer.download.requests.get")
+class DownloadCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.cache = DownloadCache(Path(self.folder.name), connections=1)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def write_partial_download(self, url, content, validator=None):
+        partial_path = self.cache._get_partial_path(url)
+        partial_path.parent.mkdir(parents=True)
+        partial_path.write_bytes(content)
+        if validator:
+            self.cache._get_validator_path(partial_path).write_text(validator)
+
+    @patch("raiden_installer.download.DOWNLOAD_PROGRESS_INTERVAL", 50_000)
+    def test_download_is_cached(self, mock_get):
+        mock_get.return_value = make_response(BINARY_CONTENT)
+        progress_callback = MagicMock()
+
+        path = self.cache.fetch(URL, progress_callback=progress_callback)
+
+        self.assertEqual(path.read_bytes(), BINARY_CONTENT)
+        self.assertEqual(path.name, sha256(BINARY_CONTENT))
+        self.assertTrue(mock_get.call_args[1]["stream"])
+        self.assertEqual(mock_get.call_args[1]["timeout"], DOWNLOAD_TIMEOUT)
+        reported = [call[0][0] for call in progress_callback.call_args_list]
+        self.assertEqual(len(reported), 5)
+        self.assertEqual(reported[-1], DownloadProgress(200_000, 200_000))
+
+        self.assertEqual(self.cache.fetch(URL), path)
+        self.assertEqual(mock_get.call_count, 1)
+
+    def test_archives_are_shared_by_checksum(self, mock_get):
+        mock_get.return_value = make_response(BINARY_CONTENT)
+        path = self.cache.fetch(URL)
+
+        other_path = self.cache.fetch(OTHER_URL, checksum=sha256(BINARY_CONTENT))
+
+        self.assertEqual(other_path, path)
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch("raiden_installer.download.DOWNLOAD_PROGRESS_INTERVAL", 5_000)
+    def test_concurrent_downloads_are_shared(self, mock_get):
+        response = make_response(BINARY_CONTENT)
+        chunks = response.iter_content.return_value
+        resume = threading.Event()
+
+        def iter_content(chunk_size):
+            yield chunks[0]
+            resume.wait(timeout=10)
+            yield from chunks[1:]
+
+        response.iter_content.side_effect = iter_content
+        mock_get.return_value = response
+        progress_callback = MagicMock()
+
+        with ThreadPoolExecutor(2) as executor:
+            first = executor.submit(self.cache.fetch, URL)
+            second = executor.submit(self.cache.fetch, URL, None, progress_callback)
+            # The second fetch is told the progress of the first one when it joins
+            deadline = time.monotonic() + 10
+            while not progress_callback.called and time.monotonic() < deadline:
+                time.sleep(0.01)
+            resume.set()
+
+            self.assertEqual(first.result(), second.result())
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(progress_callback.call_args_list[0][0][0].downloaded, 10_000)
+        self.assertEqual(progress_callback.call_args[0][0], DownloadProgress(200_000, 200_000))
+        self.assertEqual(self.cache._downloads, {})
+
+    def test_download_is_resumed(self, mock_get):
+        self.write_partial_download(URL, BINARY_CONTENT[:50_000], validator='"etag"')
+        mock_get.return_value = make_response(BINARY_CONTENT[50_000:], status_code=206)
+        progress_callback = MagicMock()
+
+        path = self.cache.fetch(URL, sha256(BINARY_CONTENT), progress_callback)
+
+        self.assertEqual(path.read_bytes(), BINARY_CONTENT)
+        self.assertEqual(
+            mock_get.call_args[1]["headers"], {"Range": "bytes=50000-", "If-Range": '"etag"'}
+        )
+        self.assertEqual(progress_callback.call_args[0][0].percentage, 100)
+        self.assertEqual(list(self.cache._get_partial_path(URL).parent.iterdir()), [])
+
+    def test_changed_download_is_restarted(self, mock_get):
+        self.write_partial_download(URL, b"outdated content", validator='"old"')
+        mock_get.return_value = make_response(BINARY_CONTENT, headers={"ETag": '"new"'})
+
+        path = self.cache.fetch(URL)
+
+        self.assertEqual(path.read_bytes(), BINARY_CONTENT)
+
+    def test_download_without_validator_is_restarted(self, mock_get):
+        self.write_partial_download(URL, BINARY_CONTENT[:50_000])
+        mock_get.return_value = make_response(BINARY_CONTENT)
+
+        self.cache.fetch(URL)
+
+        self.assertEqual(mock_get.call_args[1]["headers"], {})
+
+    def test_checksum_mismatch(self, mock_get):
+        mock_get.return_value = make_response(b"tampered content")
+
+        with self.assertRaises(ChecksumMismatchError):
+            self.cache.fetch(URL, checksum=sha256(BINARY_CONTENT))
+
+        self.assertFalse(self.cache._get_partial_path(URL).exists())
+        self.assertIsNone(self.cache.get(URL))
+
+
+def make_range_server(content, etag='"etag"', changed_after=None):
+    """ Returns a fake ``requests.get`` that answers range requests for ``content`` """
+    requests_made = []
+
+    def get(url, headers=None, stream=False, timeout=None):
+        headers = headers or {}
+        requests_made.append(headers)
+        is_changed = changed_after is not None and len(requests_made) > changed_after
+        if "Range" not in headers or is_changed:
+            return make_response(content, headers={"ETag": etag})
+
+        start, end = (int(value) for value in headers["Range"][len("bytes=") :].split("-"))
+        end = min(end, len(content) - 1)
+        return make_response(
+            content[start : end + 1],
+            status_code=206,
+            headers={"ETag": etag, "Content-Range": f"bytes {start}-{end}/{len(content)}"},
+        )
+
+    get.requests_made = requests_made
+    return get
+
+
+class ParallelDownloadTestCase(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.cache = DownloadCache(Path(self.folder.name), connections=4, chunk_size=30_000)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_download_in_ranges(self):
+        fake_get = make_range_server(BINARY_CONTENT)
+        progress_callback = MagicMock()
+
+        with patch("raiden_installer.download.requests.get", fake_get):
+            path = self.cache.fetch(URL, sha256(BINARY_CONTENT), progress_callback)
+
+        self.assertEqual(path.read_bytes(), BINARY_CONTENT)
+        self.assertEqual(len(fake_get.requests_made), 7)
+        self.assertTrue(all(headers["Range"] for headers in fake_get.requests_made))
+        self.assertEqual(progress_callback.call_args[0][0], DownloadProgress(200_000, 200_000))
+        self.assertEqual(list(self.cache._get_partial_path(URL).parent.iterdir()), [])
+
+    def test_missing_ranges_are_resumed(self):
+        partial_path = self.cache._get_partial_path(URL)
+        partial_path.parent.mkdir(parents=True)
+        partial_path.write_bytes(BINARY_CONTENT[:60_000] + bytes(140_000))
+        self.cache._get_validator_path(partial_path).write_text('"etag"')
+        self.cache._get_ranges_path(partial_path).write_text("0\n30000\n")
+        fake_get = make_range_server(BINARY_CONTENT)
+
+        with patch("raiden_installer.download.requests.get", fake_get):
+            path = self.cache.fetch(URL)
+
+        self.assertEqual(path.read_bytes(), BINARY_CONTENT)
+        requested_starts = {
+            int(headers["Range"][len("bytes=") :].split("-")[0])
+            for headers in fake_get.requests_made
+        }
+        self.assertEqual(requested_starts, {60_000, 90_000, 120_000, 150_000, 180_000})
+
+    def test_timed_out_download_is_resumed(self):
+        fake_get = make_range_server(BINARY_CONTENT)
+
+        def get(url, headers=None, stream=False, timeout=None):
+            if headers and headers["Range"].startswith("bytes=90000-"):
+                raise requests.exceptions.ReadTimeout("Read timed out")
+            return fake_get(url, headers, stream, timeout)
+
+        with patch("raiden_installer.download.requests.get", get):
+            with self.assertRaises(requests.exceptions.Timeout):
+                self.cache.fetch(URL)
+
+        resumed_get = make_range_server(BINARY_CONTENT)
+        with patch("raiden_installer.download.requests.get", resumed_get):
+            path = self.cache.fetch(URL)
+
+        self.assertEqual(path.read_bytes(), BINARY_CONTENT)
+        # The partial download of the first attempt is resumed, not started over
+        resumed_range = {"Range": "bytes=90000-119999", "If-Range": '"etag"'}
+        self.assertIn(resumed_range, resumed_get.requests_made)
+
+    def test_background_download_is_limited(self):
+        fake_get = make_range_server(BINARY_CONTENT)
+
+        started = time.monotonic()
+        with patch("raiden_installer.download.requests.get", fake_get):
+            path = self.cache.fetch(URL, max_rate=1_000_000)
+
+        self.assertEqual(path.read_bytes(), BINARY_CONTENT)
+        self.assertEqual(fake_get.requests_made, [{}])
+        self.assertGreaterEqual(time.monotonic() - started, 0.15)
+
+    def test_failed_background_download_is_retried(self):
+        fake_get = make_range_server(BINARY_CONTENT)
+        joined = threading.Event()
+
+        def get(url, headers=None, stream=False, timeout=None):
+            if not joined.is_set():
+                joined.wait(timeout=10)
+                raise requests.exceptions.ConnectionError("Connection reset")
+            return fake_get(url, headers, stream, timeout)
+
+        with patch("raiden_installer.download.requests.get", get):
+            executor = ThreadPoolExecutor(2)
+            self.addCleanup(executor.shutdown)
+            background = executor.submit(self.cache.fetch, URL, max_rate=1_000_000)
+            deadline = time.monotonic() + 10
+            while URL not in self.cache._downloads and time.monotonic() < deadline:
+                time.sleep(0.01)
+            download = self.cache._downloads[URL]
+            waiting = executor.submit(self.cache.fetch, URL)
+            while download.throttle.max_rate is not None and time.monotonic() < deadline:
+                time.sleep(0.01)
+            joined.set()
+
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                background.result()
+            self.assertEqual(waiting.result().read_bytes(), BINARY_CONTENT)
+
+        # The waiting fetch downloaded the archive itself, in ranges
+        self.assertTrue(all(headers["Range"] for headers in fake_get.requests_made))
+
+    def test_fallback_to_single_connection(self):
+        fake_get = make_range_server(BINARY_CONTENT, changed_after=1)
+
+        with patch("raiden_installer.download.requests.get", fake_get):
+            path = self.cache.fetch(URL)
+
+        self.assertEqual(path.read_bytes(), BINARY_CONTENT)
+        self.assertEqual(fake_get.requests_made[-1], {})
+
+
+class ExtractBinaryTestCase(unittest.TestCase):
+    def test_extract_tar_archive(self):
+        binary_file = io.BytesIO()
+        extract_binary(io.BytesIO(make_tar_archive(BINARY_CONTENT)), binary_file)
+        self.assertEqual(binary_file.getvalue(), BINARY_CONTENT)
+
+    def test_extract_zip_archive(self):
+        binary_file = io.BytesIO()
+        extract_binary(io.BytesIO(make_zip_archive(BINARY_CONTENT)), binary_file)
+        self.assertEqual(binary_file.getvalue(), BINARY_CONTENT)
+
+    def test_invalid_archive(self):
+        with self.assertRaises(DownloadError):
+            extract_binary(io.BytesIO(b"not an archive"), io.BytesIO())
+
+
+class InstallBinaryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.cache = DownloadCache(Path(self.folder.name).joinpath("cache"))
+        self.install_path = Path(self.folder.name).joinpath("bin", "raiden")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    @patch("raiden_installer.download.requests.get")
+    def test_install_binary(self, mock_get):
+        archive = make_tar_archive(BINARY_CONTENT)
+        mock_get.return_value = make_response(archive)
+
+        digest = install_binary(URL, self.install_path, download_cache=self.cache)
+
+        self.assertEqual(digest, sha256(archive))
+        self.assertEqual(self.install_path.read_bytes(), BINARY_CONTENT)
+        self.assertTrue(os.access(self.install_path, os.X_OK))
+
+    @patch("raiden_installer.download.requests.get")
+    def test_failed_install_leaves_no_files(self, mock_get):
+        mock_get.return_value = make_response(make_tar_archive(BINARY_CONTENT)[:1000])
+
+        with self.assertRaises(DownloadError):
+            install_binary(URL, self.install_path, download_cache=self.cache)
+
+        self.assertEqual(list(self.install_path.parent.iterdir()), [])
+        self.assertIsNone(self.cache.get(URL))
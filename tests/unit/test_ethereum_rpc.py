@@ -1,6 +1,9 @@
 import unittest
+from unittest.mock import patch
 
-from raiden_installer.ethereum_rpc import Infura
+from web3 import HTTPProvider, Web3
+
+from raiden_installer.ethereum_rpc import Infura, make_batch_request
 from raiden_installer.network import Network
 
 
@@ -42,3 +45,30 @@ class EthereumRpcProviderTestCase(unittest.TestCase):
     def test_cannot_create_infura_provider_with_invalid_network(self):
         with self.assertRaises(ValueError):
             Infura("https://invalidnetwork.infura.io:443/v3/36b457de4c103495ada08dc0658db9c3")
+
+
+class BatchRequestTestCase(unittest.TestCase):
+    def setUp(self):
+        self.w3 = Web3(HTTPProvider("http://localhost:8545"))
+        self.rpc_requests = [("eth_blockNumber", []), ("eth_chainId", []), ("eth_gasPrice", [])]
+
+    @patch("raiden_installer.ethereum_rpc.requests.post")
+    def test_results_are_matched_by_id(self, post):
+        post.return_value.json.return_value = [
+            {"jsonrpc": "2.0", "id": 2, "result": "0x3"},
+            {"jsonrpc": "2.0", "id": 0, "result": "0x1"},
+            {"jsonrpc": "2.0", "id": 1, "error": {"code": -32000, "message": "failed"}},
+        ]
+        self.assertEqual(make_batch_request(self.w3, self.rpc_requests), ["0x1", None, "0x3"])
+
+    @patch("raiden_installer.ethereum_rpc.requests.post")
+    def test_responses_without_a_valid_id_are_failed_requests(self, post):
+        post.return_value.json.return_value = [
+            {"jsonrpc": "2.0", "id": 0, "result": "0x1"},
+            {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "invalid"}},
+            {"jsonrpc": "2.0", "error": {"code": -32600, "message": "invalid"}},
+            {"jsonrpc": "2.0", "id": 7, "result": "0x7"},
+            {"jsonrpc": "2.0", "id": "1", "result": "0x2"},
+            "not a response",
+        ]
+        self.assertEqual(make_batch_request(self.w3, self.rpc_requests), ["0x1", None, None])
@@ -0,0 +1,85 @@
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from requests.exceptions import ConnectionError
+
+from raiden_installer.http_cache import HTTPCache, NotCachedError
+
+URL = "https://api.github.com/repos/raiden-network/raiden/releases"
+
+
+def make_response(content=b"[]", status_code=200, headers=None):
+    response = MagicMock()
+    response.content = content
+    response.status_code = status_code
+    response.headers = headers or {}
+    return response
+
+
+@patch("raiden_installer.http_cache.requests.get")
+class HTTPCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.cache = HTTPCache(Path(self.folder.name))
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_fresh_response_is_served_from_disk(self, mock_get):
+        mock_get.return_value = make_response(b'[{"tag_name": "v1.1.1"}]')
+        self.cache.get(URL)
+
+        cached_response = HTTPCache(Path(self.folder.name)).get(URL)
+
+        self.assertEqual(cached_response.json(), [{"tag_name": "v1.1.1"}])
+        self.assertEqual(mock_get.call_count, 1)
+
+    def test_stale_response_is_revalidated(self, mock_get):
+        mock_get.return_value = make_response(
+            headers={"ETag": '"abc"', "Last-Modified": "Mon, 19 Oct 2026 08:00:00 GMT"}
+        )
+        self.cache.get(URL)
+
+        mock_get.return_value = make_response(b"", status_code=304)
+        cached_response = self.cache.get(URL, ttl=0)
+
+        self.assertEqual(cached_response.content, b"[]")
+        self.assertEqual(
+            mock_get.call_args[1]["headers"],
+            {"If-None-Match": '"abc"', "If-Modified-Since": "Mon, 19 Oct 2026 08:00:00 GMT"},
+        )
+        self.assertLess(cached_response.age, 1)
+
+    def test_changed_response_is_replaced(self, mock_get):
+        mock_get.return_value = make_response(b"[]")
+        self.cache.get(URL)
+
+        mock_get.return_value = make_response(b"[1]")
+        self.assertEqual(self.cache.get(URL, ttl=0).json(), [1])
+        self.assertEqual(self.cache.get(URL).json(), [1])
+
+    def test_stale_response_is_served_on_network_failure(self, mock_get):
+        mock_get.return_value = make_response(b"[]")
+        self.cache.get(URL)
+
+        mock_get.side_effect = ConnectionError()
+        with patch("raiden_installer.http_cache.time.time", return_value=time.time() + 10 ** 6):
+            self.assertEqual(self.cache.get(URL).json(), [])
+
+    def test_offline(self, mock_get):
+        mock_get.return_value = make_response(b"[]")
+        self.cache.get(URL)
+        self.cache.offline = True
+
+        self.assertEqual(self.cache.get(URL, ttl=0).json(), [])
+        self.assertEqual(mock_get.call_count, 1)
+        with self.assertRaises(NotCachedError):
+            self.cache.get(f"{URL}/tags/v1.1.1")
+
+    def test_uncached_response_on_network_failure(self, mock_get):
+        mock_get.side_effect = ConnectionError()
+        with self.assertRaises(NotCachedError):
+            self.cache.get(URL)
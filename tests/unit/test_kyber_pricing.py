@@ -0,0 +1,60 @@
+import unittest
+from decimal import Decimal
+
+from eth_utils import to_canonical_address
+
+from raiden_installer.kyber.pricing import RateCurve, RateCurveCache, get_sample_amounts
+
+PROXY_ADDRESS = to_canonical_address("0x818e6fecd516ecc3849daf6845e3ec868087b755")
+TOKEN_ADDRESS = to_canonical_address("0x255aa6df07540cb5d3d297f0d0d4d84cb52bc8e6")
+
+RATE = 10 ** 15
+
+
+class RateCurveTestCase(unittest.TestCase):
+    def setUp(self):
+        self.curve = RateCurve(
+            block_number=1,
+            amounts=(10, 20, 50, 100),
+            rates=(RATE, RATE - RATE // 1000, RATE // 2, 0),
+        )
+
+    def test_sample_amounts(self):
+        self.assertEqual(get_sample_amounts(6, [Decimal("0.5"), Decimal(2)]), [500_000, 2_000_000])
+
+    def test_sampled_amount_is_exact(self):
+        self.assertEqual(self.curve.get_rate(10), RATE)
+
+    def test_rate_is_interpolated(self):
+        rate = self.curve.get_rate(15, max_error=0.01)
+        self.assertEqual(rate, RATE - RATE // 2000)
+
+    def test_steep_curve_is_not_interpolated(self):
+        self.assertIsNone(self.curve.get_rate(15, max_error=0.0001))
+        self.assertIsNone(self.curve.get_rate(30, max_error=0.01))
+
+    def test_amounts_outside_of_curve_are_not_served(self):
+        self.assertIsNone(self.curve.get_rate(5))
+        self.assertIsNone(self.curve.get_rate(200))
+
+    def test_amounts_without_liquidity_are_not_served(self):
+        self.assertIsNone(self.curve.get_rate(100))
+        self.assertIsNone(self.curve.get_rate(75, max_error=1))
+
+
+class RateCurveCacheTestCase(unittest.TestCase):
+    def test_curves_are_kept_for_latest_block(self):
+        cache = RateCurveCache()
+        key = (PROXY_ADDRESS, TOKEN_ADDRESS)
+        curve = RateCurve(block_number=2, amounts=(10,), rates=(RATE,))
+
+        cache.add(key, curve)
+        self.assertIs(cache.get(key, 2), curve)
+        self.assertIsNone(cache.get(key, 3))
+
+        cache.add(key, RateCurve(block_number=1, amounts=(10,), rates=(RATE,)))
+        self.assertIs(cache.get(key, 2), curve)
+
+        cache.add(key, RateCurve(block_number=3, amounts=(10,), rates=(RATE,)))
+        self.assertIsNone(cache.get(key, 2))
+        self.assertIsNotNone(cache.get(key, 3))
@@ -0,0 +1,100 @@
+import math
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+from urllib.parse import parse_qs, urlparse
+
+from raiden_installer.constants import RELEASE_INDEX_TTL
+from raiden_installer.nightlies import NightlyEntry, NightlyIndex, parse_listing_page
+from raiden_installer.raiden import RaidenNightly
+
+SUFFIX = RaidenNightly.FILE_NAME_SUFFIX
+
+
+def make_key(day, extra="rc4.dev11+g2d9d1fcfc", suffix=SUFFIX):
+    return f"NIGHTLY/raiden-nightly-2020-04-{day:02}T00-29-38-v0.200.0{extra}-{suffix}"
+
+
+def make_listing(keys, is_truncated=False):
+    contents = "".join(f"<Contents><Key>{key}</Key><Size>1</Size></Contents>" for key in keys)
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+        f"<Name>raiden-nightlies</Name><IsTruncated>{str(is_truncated).lower()}</IsTruncated>"
+        f"{contents}</ListBucketResult>"
+    ).encode()
+
+
+def make_entry(day):
+    return NightlyEntry(
+        key=make_key(day),
+        release_tag=f"0.200.0-202004{day:02}",
+        release_datetime=datetime(2020, 4, day),
+    )
+
+
+class ListingTestCase(unittest.TestCase):
+    def test_parse_listing_page(self):
+        keys = [make_key(1), make_key(2, suffix="macOS-x86_64.zip")]
+        page = parse_listing_page(make_listing(keys, is_truncated=True))
+        self.assertEqual(page.keys, keys)
+        self.assertTrue(page.is_truncated)
+
+    def test_index_is_sorted_by_date(self):
+        index = NightlyIndex()
+        for day in (3, 1, 2, 1):
+            index.add(make_entry(day))
+
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.latest(), make_entry(3))
+        self.assertEqual([entry.release_datetime.day for entry in index.newest_first()], [3, 2, 1])
+        self.assertEqual(index.get("0.200.0-20200402"), make_entry(2))
+        self.assertIsNone(index.get("0.200.0-20200404"))
+
+
+class RaidenNightlyIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.last_page = make_key(2, suffix="macOS-x86_64.zip")
+        self.pages = {
+            None: make_listing([make_key(1), self.last_page], is_truncated=True),
+            self.last_page: make_listing([make_key(3)]),
+        }
+        self.requested_start_after = []
+        patcher = patch("raiden_installer.raiden.RELEASE_INDEX_CACHE.get", self.get_page)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch.object(RaidenNightly, "_index", NightlyIndex())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_page(self, url, ttl):
+        query = parse_qs(urlparse(url).query)
+        self.assertEqual(query["prefix"], [RaidenNightly.LISTING_PREFIX])
+        start_after = query.get("start-after", [None])[0]
+        self.requested_start_after.append(start_after)
+        return MagicMock(content=self.pages[start_after], age=0)
+
+    def test_all_pages_are_indexed(self):
+        latest = RaidenNightly.get_latest_release()
+
+        self.assertEqual(latest.release_datetime, datetime(2020, 4, 3, 0, 29, 38))
+        self.assertEqual(latest.download_url, f"{RaidenNightly.RELEASE_INDEX_URL}/{make_key(3)}")
+        self.assertEqual(len(RaidenNightly._index), 2)
+        self.assertEqual(self.requested_start_after, [None, self.last_page])
+
+    def test_index_update_starts_at_last_page(self):
+        RaidenNightly.get_available_releases()
+        self.pages[self.last_page] = make_listing([make_key(3), make_key(4)])
+
+        self.assertIsNotNone(RaidenNightly.make_by_tag("0.200.0rc4.dev11+g2d9d1fcfc-20200401"))
+        self.assertEqual(len(self.requested_start_after), 2)
+
+        RaidenNightly._index.refreshed_at -= RELEASE_INDEX_TTL
+        release = RaidenNightly.make_by_tag("0.200.0rc4.dev11+g2d9d1fcfc-20200404")
+        self.assertEqual(release.release_datetime.day, 4)
+        self.assertEqual(self.requested_start_after[2:], [self.last_page])
+
+    def test_fresh_index_is_not_updated(self):
+        RaidenNightly._update_index(ttl=math.inf)
+        RaidenNightly._update_index(ttl=60)
+        self.assertEqual(len(self.requested_start_after), 2)
@@ -0,0 +1,155 @@
+import json
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from raiden_installer.node_logs import (
+    LogEvent,
+    NodeLog,
+    get_node_log,
+    parse_log_line,
+    release_node_log,
+)
+
+SYNC_LINE = json.dumps(
+    {"event": "Synchronizing blockchain events", "level": "info", "blocks_to_sync": 42}
+)
+
+NODE_SCRIPT = f"""
+import sys
+print({SYNC_LINE!r}, flush=True)
+print("Welcome to Raiden", file=sys.stderr, flush=True)
+sys.stdout.write("x" * 100000 + "\\n")
+"""
+
+
+class NodeLogTestCase(unittest.TestCase):
+    def test_parse_log_line(self):
+        event = parse_log_line(SYNC_LINE)
+        self.assertEqual(event.event, "Synchronizing blockchain events")
+        self.assertEqual(event.level, "info")
+        self.assertEqual(event.fields, {"blocks_to_sync": 42})
+
+        self.assertEqual(parse_log_line("Welcome to Raiden"), LogEvent(line="Welcome to Raiden"))
+        self.assertEqual(parse_log_line("[1, 2]"), LogEvent(line="[1, 2]"))
+
+    def test_buffer_keeps_last_events(self):
+        node_log = NodeLog(size=3)
+        for number in range(10):
+            node_log.append(LogEvent(line=str(number)))
+        self.assertEqual([event.line for event in node_log.events], ["7", "8", "9"])
+
+    def test_subscribers_receive_new_events(self):
+        node_log = NodeLog()
+        node_log.append(LogEvent(line="before"))
+        received = []
+
+        backlog = node_log.subscribe(received.append)
+        node_log.append(LogEvent(line="after"))
+        node_log.unsubscribe(received.append)
+        node_log.append(LogEvent(line="unsubscribed"))
+
+        self.assertEqual([event.line for event in backlog], ["before"])
+        self.assertEqual([event.line for event in received], ["after"])
+
+    def test_failing_subscriber(self):
+        node_log = NodeLog()
+        node_log.subscribe(lambda event: 1 / 0)
+        node_log.append(LogEvent(line="line"))
+        self.assertEqual(len(node_log.events), 1)
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.log_path = Path(self.folder.name).joinpath("node.log")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def wait_for_events(self, node_log, count):
+        deadline = time.monotonic() + 10
+        while len(node_log.events) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        node_log.stop_following()
+        return node_log.events
+
+    def test_follow_process_output(self):
+        node_log = NodeLog(poll_interval=0.01)
+        with self.log_path.open("wb") as log_file:
+            process = subprocess.Popen(
+                [sys.executable, "-c", NODE_SCRIPT], stdout=log_file, stderr=subprocess.STDOUT
+            )
+        with patch("raiden_installer.node_logs.NODE_LOG_MAX_LINE_LENGTH", 40000):
+            node_log.follow(self.log_path)
+            events = self.wait_for_events(node_log, 5)
+        process.wait()
+
+        self.assertEqual(events[0].fields, {"blocks_to_sync": 42})
+        self.assertEqual(events[1].line, "Welcome to Raiden")
+        self.assertEqual([len(event.line) for event in events[2:]], [40000, 40000, 20000])
+
+    def test_incomplete_lines_are_kept_back(self):
+        node_log = NodeLog(poll_interval=0.01)
+        with self.log_path.open("wb", buffering=0) as log_file:
+            log_file.write(b"first\nsec")
+            node_log.follow(self.log_path)
+            time.sleep(0.1)
+            self.assertEqual([event.line for event in node_log.events], ["first"])
+
+            log_file.write(b"ond\n")
+            events = self.wait_for_events(node_log, 2)
+
+        self.assertEqual([event.line for event in events], ["first", "second"])
+        self.assertFalse(node_log.is_following)
+
+    def test_long_lines_are_split(self):
+        node_log = NodeLog(poll_interval=0.01)
+        self.log_path.write_bytes(b"a" * 10 + b"\n")
+        with patch("raiden_installer.node_logs.NODE_LOG_MAX_LINE_LENGTH", 4):
+            node_log.follow(self.log_path)
+            events = self.wait_for_events(node_log, 3)
+        self.assertEqual([event.line for event in events], ["aaaa", "aaaa", "aa"])
+
+    def test_adopted_node_log_starts_at_backlog(self):
+        self.log_path.write_bytes(b"old line\nlast line\n")
+
+        # The backlog starting at a line, and within the line before
+        for backlog_size in (10, 12):
+            node_log = NodeLog(poll_interval=0.01)
+            with patch("raiden_installer.node_logs.NODE_LOG_BACKLOG_SIZE", backlog_size):
+                node_log.follow(self.log_path, from_start=False)
+            events = self.wait_for_events(node_log, 1)
+            self.assertEqual([event.line for event in events], ["last line"])
+
+    def test_log_file_is_rotated(self):
+        node_log = NodeLog(poll_interval=0.01, max_file_size=20)
+        rotated_path = self.log_path.with_name("node.log.1")
+        with self.log_path.open("ab", buffering=0) as log_file:
+            log_file.write(b"first line\nsecond line\n")
+            node_log.follow(self.log_path)
+            deadline = time.monotonic() + 10
+            while not rotated_path.exists() and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+            log_file.write(b"third line\n")
+            events = self.wait_for_events(node_log, 3)
+
+        self.assertEqual(rotated_path.read_bytes(), b"first line\nsecond line\n")
+        self.assertEqual(self.log_path.read_bytes(), b"third line\n")
+        self.assertEqual(
+            [event.line for event in events], ["first line", "second line", "third line"]
+        )
+
+    def test_released_node_log_is_no_longer_followed(self):
+        self.log_path.write_bytes(b"line\n")
+        with patch.dict("raiden_installer.node_logs.NODE_LOGS", clear=True):
+            node_log = get_node_log("node")
+            node_log.follow(self.log_path)
+
+            release_node_log("node")
+
+            self.assertFalse(node_log.is_following)
+            self.assertIsNot(get_node_log("node"), node_log)
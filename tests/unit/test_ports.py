@@ -0,0 +1,29 @@
+import socket
+import unittest
+from contextlib import closing
+
+from raiden_installer.ports import PortAllocationError, allocate_port, is_port_free
+
+
+class PortAllocationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen()
+        _, self.used_port = self.sock.getsockname()
+
+    def tearDown(self):
+        self.sock.close()
+
+    def test_used_port_is_not_free(self):
+        self.assertFalse(is_port_free(self.used_port))
+
+    def test_allocate_port(self):
+        with closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as sock:
+            sock.bind(("127.0.0.1", 0))
+            _, free_port = sock.getsockname()
+
+        pool = [self.used_port, free_port]
+        self.assertEqual(allocate_port(set(), pool), free_port)
+        with self.assertRaises(PortAllocationError):
+            allocate_port({free_port}, pool)
@@ -0,0 +1,35 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from raiden_installer.constants import PREFETCH_MAX_RATE
+from raiden_installer.prefetch import prefetch_binary, start_prefetch
+
+
+@patch("raiden_installer.prefetch.RaidenClient.get_client")
+class PrefetchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.settings = MagicMock()
+        self.download_cache = MagicMock()
+
+    def test_release_is_prefetched(self, mock_get_client):
+        raiden_client = mock_get_client.return_value
+        raiden_client.is_installed = False
+
+        archive_path = prefetch_binary(self.settings, self.download_cache)
+
+        mock_get_client.assert_called_once_with(self.settings)
+        self.download_cache.fetch.assert_called_once_with(
+            raiden_client.download_url, raiden_client.checksum, max_rate=PREFETCH_MAX_RATE
+        )
+        self.assertEqual(archive_path, self.download_cache.fetch.return_value)
+
+    def test_installed_release_is_not_prefetched(self, mock_get_client):
+        mock_get_client.return_value.is_installed = True
+        self.assertIsNone(prefetch_binary(self.settings, self.download_cache))
+        self.download_cache.fetch.assert_not_called()
+
+    def test_failed_prefetch_is_logged(self, mock_get_client):
+        mock_get_client.side_effect = ConnectionError()
+        with patch("raiden_installer.prefetch.log") as mock_log:
+            start_prefetch(self.settings, delay=0).join(timeout=10)
+        mock_log.warning.assert_called_once()
@@ -0,0 +1,70 @@
+import json
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import psutil
+
+from raiden_installer.processes import ProcessTracker
+
+NAME = "raiden-1.1.1"
+
+
+class ProcessTrackerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.tracker = ProcessTracker(Path(self.folder.name))
+        self.child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+
+    def tearDown(self):
+        self.child.kill()
+        self.child.wait()
+        self.folder.cleanup()
+
+    def test_launched_process_is_tracked(self):
+        self.tracker.track(NAME, self.child)
+
+        with patch("raiden_installer.processes.psutil.process_iter") as process_iter:
+            self.assertEqual(self.tracker.get(NAME).pid, self.child.pid)
+            process_iter.assert_not_called()
+
+        self.child.kill()
+        self.child.wait()
+        self.assertIsNone(self.tracker.get(NAME))
+        self.assertFalse(self.tracker._get_pidfile_path(NAME).exists())
+        self.assertEqual(self.tracker.get_exit_code(NAME), -9)
+
+    def test_process_is_adopted_from_pidfile(self):
+        self.tracker.track(NAME, self.child)
+
+        restarted_tracker = ProcessTracker(Path(self.folder.name))
+        with patch("raiden_installer.processes.psutil.process_iter") as process_iter:
+            self.assertEqual(restarted_tracker.get(NAME).pid, self.child.pid)
+            process_iter.assert_not_called()
+
+    def test_reused_pid_is_not_adopted(self):
+        self.tracker.track(NAME, self.child)
+        pidfile_path = self.tracker._get_pidfile_path(NAME)
+        pidfile_data = json.loads(pidfile_path.read_text())
+        pidfile_data["create_time"] -= 1000
+        pidfile_path.write_text(json.dumps(pidfile_data))
+
+        restarted_tracker = ProcessTracker(Path(self.folder.name))
+        restarted_tracker._searched_names.add(NAME)
+        self.assertIsNone(restarted_tracker.get(NAME))
+        self.assertFalse(pidfile_path.exists())
+
+    def test_processes_are_searched_once(self):
+        process = psutil.Process(self.child.pid)
+        with patch(
+            "raiden_installer.processes.psutil.process_iter", return_value=[process]
+        ) as process_iter:
+            process.info = {"name": NAME.upper()}
+            self.assertEqual(self.tracker.get(NAME), process)
+            self.tracker.forget(NAME)
+            self.assertIsNone(self.tracker.get(NAME))
+
+        process_iter.assert_called_once()
@@ -1,9 +1,17 @@
+import asyncio
+import json
+import tempfile
+import time
 import unittest
 from datetime import datetime
 from pathlib import Path
+from unittest.mock import MagicMock, PropertyMock, patch
 
+from raiden_installer.node_logs import NODE_LOGS
 from raiden_installer.raiden import (
+    RaidenClientError,
     RaidenNightly,
+    RaidenNode,
     RaidenRelease,
     RaidenTestnetRelease,
     VersionData,
@@ -52,11 +60,57 @@ class RaidenClientTestCase(unittest.TestCase):
         self.assertEqual(raiden_release_1.binary_name, "raiden-testnet-0.100.5a0")
         self.assertEqual(raiden_release_2.binary_name, "raiden-testnet-1.0.2-rc")
 
+    def test_releases_are_ordered_by_version(self):
+        def make_release(*version):
+            return RaidenTestnetRelease("https://test.download.url", VersionData(*version))
+
+        releases = [
+            make_release("0", "10", "0"),
+            make_release("0", "9", "0"),
+            make_release("0", "10", "0", "rc10"),
+            make_release("0", "10", "0", "rc9"),
+            make_release("0", "10", "0", "a1"),
+        ]
+
+        self.assertEqual(
+            [release.release for release in sorted(releases)],
+            ["0.9.0", "0.10.0a1", "0.10.0rc9", "0.10.0rc10", "0.10.0"],
+        )
+        self.assertEqual(make_release("1", "0", "2", "-rc1"), make_release("1", "0", "2", "rc1"))
+        self.assertGreater(make_release("1", "0", "0"), make_release("0", "200", "0", "-rc9"))
+        self.assertLessEqual(make_release("0", "9", "0"), make_release("0", "10", "0"))
+
+    def test_nightlies_are_ordered_by_date(self):
+        version_data = VersionData("0", "200", "0", "rc4.dev9+gea6de43f9")
+        older = RaidenNightly(version_data, datetime(2020, 4, 3))
+        newer = RaidenNightly(VersionData("0", "100", "0", "rc1"), datetime(2020, 4, 4))
+        self.assertLess(older, newer)
+        self.assertEqual(max([newer, older]), newer)
+
+    def test_nightlies_compare_with_releases(self):
+        nightly = RaidenNightly(VersionData("0", "100", "0", "rc1"), datetime(2020, 4, 4))
+        release = RaidenRelease("https://test.download.url", VersionData("1", "1", "0"))
+        self.assertNotEqual(nightly, release)
+        self.assertGreater(nightly, release)
+        self.assertEqual(sorted([nightly, release]), [release, nightly])
+
     def test_get_version_data(self):
         release_name = f"raiden-v1.1.1-{RaidenRelease.FILE_NAME_SUFFIX}"
         version_data = RaidenRelease._get_version_data(release_name)
         self.assertEqual(version_data, VersionData("1", "1", "1"))
 
+    def test_release_checksum(self):
+        asset_data = {
+            "name": f"raiden-v1.1.1-{RaidenRelease.FILE_NAME_SUFFIX}",
+            "browser_download_url": "https://test.download.url",
+            "digest": "sha256:ABCDEF",
+        }
+        raiden_release = RaidenRelease._make_release({"assets": [asset_data]})
+        self.assertEqual(raiden_release.checksum, "abcdef")
+
+        asset_data.pop("digest")
+        self.assertIsNone(RaidenRelease._make_release({"assets": [asset_data]}).checksum)
+
     def test_get_nightly_release_data(self):
         release_name = (
             "NIGHTLY/raiden-nightly-2020-04-07T00-29-38-v0.200.0rc4.dev11+g2d9d1fcfc-" +
@@ -78,3 +132,166 @@ class RaidenClientTestCase(unittest.TestCase):
             temporary_password = passphrase_file.read_text()
             self.assertEqual(temporary_password, password)
         self.assertFalse(passphrase_file.exists())
+
+
+def make_raiden_node(api_port=None):
+    raiden_client = RaidenRelease("https://test.download.url", VersionData("1", "1", "0"))
+    configuration_file = MagicMock(api_port=api_port)
+    configuration_file.account.address = bytes(range(20))
+    configuration_file.settings.name = "mainnet"
+    return RaidenNode(raiden_client, configuration_file)
+
+
+class RaidenNodeTestCase(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.object(RaidenNode, "is_running", new_callable=PropertyMock)
+        patcher.start().return_value = False
+        self.addCleanup(patcher.stop)
+        patcher = patch(
+            "raiden_installer.raiden.RaidenConfigurationFile.get_api_ports",
+            return_value={5001, 5003},
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_node_of_configuration(self):
+        raiden_node = make_raiden_node(api_port=5002)
+        self.assertEqual(
+            raiden_node.name, "raiden-1.1.0-0x000102030405060708090a0b0c0d0e0f10111213-mainnet"
+        )
+        self.assertEqual(raiden_node.web_ui_url, "http://127.0.0.1:5002")
+        self.assertEqual(make_raiden_node().web_ui_url, "http://127.0.0.1:5001")
+
+    @patch("raiden_installer.raiden.is_port_free", return_value=True)
+    def test_configured_port_is_kept(self, _):
+        raiden_node = make_raiden_node(api_port=5003)
+        self.assertEqual(raiden_node.assign_api_port(), 5003)
+        raiden_node.configuration_file.save.assert_not_called()
+
+    def test_port_is_allocated(self):
+        def is_port_free(port):
+            return port not in (5001, 5002)
+
+        raiden_node = make_raiden_node(api_port=5001)
+        with patch("raiden_installer.raiden.is_port_free", is_port_free), patch(
+            "raiden_installer.ports.is_port_free", is_port_free
+        ):
+            self.assertEqual(raiden_node.assign_api_port(), 5004)
+        self.assertEqual(raiden_node.configuration_file.api_port, 5004)
+        raiden_node.configuration_file.save.assert_called_once()
+
+
+class NodeLaunchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+        self.raiden_node = make_raiden_node()
+        self.launches = 0
+        patchers = [
+            patch("raiden_installer.raiden.NODE_LOG_FOLDER_PATH", Path(self.folder.name)),
+            patch("raiden_installer.raiden.subprocess.Popen", side_effect=self.popen),
+            patch("raiden_installer.raiden.PROCESS_TRACKER"),
+            patch.dict("raiden_installer.node_logs.NODE_LOGS", clear=True),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def popen(self, args, stdout, stderr):
+        self.launches += 1
+        stdout.write(f"launch {self.launches}\n".encode())
+        return MagicMock()
+
+    def wait_for_events(self, node_log, count):
+        deadline = time.monotonic() + 10
+        while len(node_log.events) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        node_log.stop_following()
+        return [event.line for event in node_log.events]
+
+    def test_output_is_written_to_log_file(self):
+        self.raiden_node.launch("passphrase")
+        self.raiden_node.launch("passphrase")
+
+        log_path = self.raiden_node.log_path
+        self.assertEqual(log_path.read_text(), "launch 2\n")
+        self.assertEqual(log_path.with_name(f"{log_path.name}.1").read_text(), "launch 1\n")
+        # Every launch is followed, the events of the former ones are kept
+        events = self.wait_for_events(self.raiden_node.node_log, 2)
+        self.assertEqual(events, ["launch 1", "launch 2"])
+
+    def test_killed_node_log_is_released(self):
+        self.raiden_node.launch("passphrase")
+        node_log = self.raiden_node.node_log
+
+        self.raiden_node.kill()
+
+        self.assertFalse(node_log.is_following)
+        self.assertNotIn(self.raiden_node.name, NODE_LOGS)
+
+    def test_log_of_adopted_node_is_followed(self):
+        log_path = self.raiden_node.log_path
+        log_path.write_text("running\n")
+
+        node_log = self.raiden_node.node_log
+
+        self.assertEqual(self.wait_for_events(node_log, 1), ["running"])
+
+
+class WebUIReadinessTestCase(unittest.TestCase):
+    def setUp(self):
+        self.raiden_node = make_raiden_node()
+        self.statuses = []
+        self.http_client = MagicMock()
+        self.http_client.fetch.side_effect = self.fetch
+        self.running = True
+
+        patchers = [
+            patch("raiden_installer.raiden.AsyncHTTPClient", return_value=self.http_client),
+            patch("raiden_installer.raiden.RAIDEN_STATUS_MIN_INTERVAL", 0.01),
+            patch("raiden_installer.raiden.RAIDEN_STATUS_MAX_INTERVAL", 0.04),
+            patch("raiden_installer.raiden.RAIDEN_PROCESS_CHECK_INTERVAL", 0.01),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        patcher = patch.object(RaidenNode, "is_running", new_callable=PropertyMock)
+        patcher.start().side_effect = lambda: self.running
+        self.addCleanup(patcher.stop)
+
+    async def fetch(self, url, request_timeout):
+        self.assertEqual(url, "http://127.0.0.1:5001/api/v1/status")
+        status = self.statuses.pop(0) if self.statuses else {"status": "ready"}
+        if isinstance(status, Exception):
+            raise status
+        return MagicMock(body=json.dumps(status).encode())
+
+    def wait_for_web_ui_ready(self):
+        received = []
+        asyncio.run(self.raiden_node.wait_for_web_ui_ready(status_callback=received.append))
+        return received
+
+    def test_status_changes_are_reported(self):
+        syncing = {"status": "syncing", "blocks_to_sync": 10}
+        self.statuses = [
+            ConnectionRefusedError(),
+            syncing,
+            syncing,
+            {"status": "syncing", "blocks_to_sync": 5},
+        ]
+        self.assertEqual(
+            self.wait_for_web_ui_ready(),
+            [syncing, {"status": "syncing", "blocks_to_sync": 5}],
+        )
+        self.assertEqual(self.http_client.fetch.call_count, 5)
+
+    def test_exited_process_stops_waiting(self):
+        self.statuses = [{"status": "unavailable"}] * 100
+
+        def exit_process(status):
+            self.running = False
+
+        with self.assertRaises(RaidenClientError):
+            asyncio.run(self.raiden_node.wait_for_web_ui_ready(status_callback=exit_process))
+        self.assertEqual(self.http_client.fetch.call_count, 1)
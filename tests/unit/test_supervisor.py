@@ -0,0 +1,139 @@
+import asyncio
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from raiden_installer.node_logs import NODE_LOGS, NodeLog
+from raiden_installer.processes import ProcessTracker
+from raiden_installer.supervisor import RaidenSupervisor
+
+SLEEPING_NODE = "import time; time.sleep(60)"
+
+
+class FakeRaidenNode:
+    name = "raiden-1.1.1-0x000102030405060708090a0B0C0d0e0f10111213-mainnet"
+
+    def __init__(self, tracker, scripts):
+        self.tracker = tracker
+        self.scripts = scripts
+        self.children = []
+        self.status = {"status": "syncing", "blocks_to_sync": 10}
+
+    def launch(self, passphrase_file):
+        child = subprocess.Popen([sys.executable, "-c", self.scripts.pop(0)])
+        self.children.append(child)
+        self.tracker.track(self.name, child)
+
+    def kill(self):
+        self.children[-1].kill()
+        self.children[-1].wait()
+        self.tracker.forget(self.name)
+
+    async def get_status(self, http_client):
+        return self.status
+
+    @property
+    def is_running(self):
+        return self.tracker.get(self.name) is not None
+
+
+class RaidenSupervisorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.tracker = ProcessTracker(Path(self.folder.name))
+        patchers = [
+            patch("raiden_installer.supervisor.PROCESS_TRACKER", self.tracker),
+            patch("raiden_installer.supervisor.AsyncHTTPClient"),
+            patch("raiden_installer.supervisor.SUPERVISOR_RESTART_MIN_DELAY", 0.01),
+            patch("raiden_installer.supervisor.RAIDEN_STATUS_MIN_INTERVAL", 0.01),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        for child in self.raiden_node.children:
+            child.kill()
+            child.wait()
+        self.folder.cleanup()
+
+    def make_supervisor(self, scripts):
+        self.raiden_node = FakeRaidenNode(self.tracker, scripts)
+        self.raiden_node.launch(None)
+        return RaidenSupervisor(self.raiden_node, passphrase="secret", sample_interval=0.01)
+
+    def run_supervisor(self, supervisor, duration):
+        async def supervise():
+            supervisor.start()
+            await asyncio.sleep(duration)
+            supervising = supervisor.is_supervising
+            supervisor.stop()
+            return supervising
+
+        return asyncio.run(supervise())
+
+    def test_resources_are_sampled(self):
+        supervisor = self.make_supervisor([SLEEPING_NODE])
+        self.assertTrue(self.run_supervisor(supervisor, 0.2))
+
+        self.assertGreater(len(supervisor.samples), 2)
+        sample = supervisor.samples[-1]
+        self.assertGreater(sample.rss, 0)
+        self.assertGreater(sample.open_files, 0)
+        self.assertEqual(sample.status, "syncing")
+        self.assertEqual(sample.blocks_to_sync, 10)
+        self.assertEqual(supervisor.get_samples(since=sample.timestamp), [])
+        self.assertEqual(supervisor.restarts, 0)
+
+    def test_crashed_node_is_restarted(self):
+        supervisor = self.make_supervisor(["import sys; sys.exit(1)"] * 2 + [SLEEPING_NODE])
+        self.assertTrue(self.run_supervisor(supervisor, 1))
+
+        self.assertEqual(supervisor.restarts, 2)
+        self.assertEqual(supervisor._failures, 2)
+        self.assertTrue(self.raiden_node.is_running)
+
+    def test_shut_down_node_is_not_restarted(self):
+        supervisor = self.make_supervisor(["pass"])
+        with patch.dict("raiden_installer.node_logs.NODE_LOGS", {supervisor.name: NodeLog()}):
+            self.assertFalse(self.run_supervisor(supervisor, 0.5))
+            self.assertNotIn(supervisor.name, NODE_LOGS)
+        self.assertEqual(supervisor.restarts, 0)
+
+    def test_stalled_node_is_restarted(self):
+        supervisor = self.make_supervisor([SLEEPING_NODE] * 2)
+        kill = self.raiden_node.kill
+
+        def kill_stalled_node():
+            kill()
+            self.raiden_node.status = {"status": "ready"}
+
+        self.raiden_node.kill = kill_stalled_node
+        with patch("raiden_installer.supervisor.SYNC_STALL_TIMEOUT", 0.1):
+            self.assertTrue(self.run_supervisor(supervisor, 1))
+
+        self.assertEqual(supervisor.restarts, 1)
+        self.assertIsNotNone(self.raiden_node.children[0].poll())
+        self.assertTrue(self.raiden_node.is_running)
+        self.assertFalse(supervisor.sync_stalled)
+
+    def test_stalled_sync_is_detected(self):
+        supervisor = self.make_supervisor([SLEEPING_NODE])
+        with patch("raiden_installer.supervisor.time.monotonic") as monotonic:
+            monotonic.return_value = 0
+            supervisor._check_sync_progress("syncing", 100)
+            monotonic.return_value = 500
+            supervisor._check_sync_progress("syncing", 50)
+            monotonic.return_value = 1000
+            supervisor._check_sync_progress("syncing", 60)
+            self.assertFalse(supervisor.sync_stalled)
+
+            monotonic.return_value = 1100
+            supervisor._check_sync_progress("syncing", 70)
+            self.assertTrue(supervisor.sync_stalled)
+
+            supervisor._check_sync_progress("ready", None)
+            self.assertFalse(supervisor.sync_stalled)
@@ -0,0 +1,173 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from raiden_installer.swap_router import (
+    PartialSwapError,
+    SplitRouter,
+    SwapReport,
+    SwapRoute,
+    find_best_split,
+)
+from raiden_installer.token_exchange import Exchange, ExchangeError, TransactionCosts
+from raiden_installer.tokens import Erc20Token, EthereumAmount, TokenAmount, Wei
+from raiden_installer.uniswap.pricing import InsufficientLiquidityError, get_amount_in
+
+RDN = Erc20Token.find_by_ticker("RDN", "mainnet")
+ETHER = 10 ** 18
+
+
+def make_pool_curve(eth_reserve, token_reserve):
+    def get_eth_cost(amount):
+        try:
+            return get_amount_in(amount, eth_reserve, token_reserve)
+        except InsufficientLiquidityError:
+            return None
+
+    return get_eth_cost
+
+
+class FakeExchange(Exchange):
+    ESTIMATED_SWAP_GAS = 100_000
+
+    def __init__(self, w3, curve):
+        super().__init__(w3)
+        self.curve = curve
+        self.buy_tokens = MagicMock(return_value=b"\x01" * 32)
+
+    @property
+    def name(self):
+        return f"Pool{id(self)}"
+
+    def get_quote_curve(self, token, block_number):
+        if self.curve is None:
+            raise ExchangeError("Not listing token")
+        return self.curve
+
+    def calculate_transaction_costs(self, token_amount, account, block_number=None):
+        eth = EthereumAmount(Wei(self.curve(int(token_amount.as_wei))))
+        return TransactionCosts(
+            gas_price=EthereumAmount(Wei(1)),
+            gas=100_000,
+            eth_sold=eth,
+            total=eth,
+            exchange_rate=EthereumAmount(1),
+            block_number=1,
+        )
+
+
+class FindBestSplitTestCase(unittest.TestCase):
+    def setUp(self):
+        self.deep_pool = make_pool_curve(1000 * ETHER, 100_000 * ETHER)
+        self.shallow_pool = make_pool_curve(500 * ETHER, 50_000 * ETHER)
+
+    def test_large_amount_is_split(self):
+        total = 20_000 * ETHER
+        amounts = find_best_split(total, [self.deep_pool, self.shallow_pool], [0, 0])
+
+        self.assertEqual(sum(amounts), total)
+        # Equal prices in both pools, so the amount is split by their depth
+        self.assertAlmostEqual(amounts[0] / total, 2 / 3, places=1)
+
+        split_cost = self.deep_pool(amounts[0]) + self.shallow_pool(amounts[1])
+        self.assertLess(split_cost, self.deep_pool(total))
+
+    def test_small_amount_avoids_extra_gas(self):
+        amounts = find_best_split(10 * ETHER, [self.deep_pool, self.shallow_pool], [ETHER, ETHER])
+        self.assertEqual(amounts, [10 * ETHER, 0])
+
+    def test_amount_exceeding_one_pool(self):
+        total = 60_000 * ETHER
+        amounts = find_best_split(total, [self.shallow_pool, self.deep_pool], [0, 0])
+        self.assertEqual(sum(amounts), total)
+        self.assertGreater(amounts[1], 0)
+
+    def test_unavailable_amount(self):
+        self.assertIsNone(find_best_split(ETHER, [lambda amount: None], [0]))
+        self.assertIsNone(find_best_split(0, [self.deep_pool], [0]))
+
+
+class SplitRouterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.w3 = MagicMock()
+        self.w3.eth.getTransactionCount.return_value = 7
+        self.exchanges = [
+            FakeExchange(self.w3, make_pool_curve(1000 * ETHER, 100_000 * ETHER)),
+            FakeExchange(self.w3, make_pool_curve(1000 * ETHER, 100_000 * ETHER)),
+            FakeExchange(self.w3, None),
+        ]
+        self.router = SplitRouter(self.w3, self.exchanges)
+
+    def test_route_uses_available_exchanges(self):
+        route = self.router.get_route(TokenAmount(20_000, RDN), gas_price=Wei(1), block_number=1)
+
+        self.assertEqual([leg.exchange for leg in route.legs], self.exchanges[:2])
+        self.assertEqual(route.legs[0].token_amount, TokenAmount(10_000, RDN))
+        self.assertEqual(
+            route.total.as_wei, sum(leg.eth_cost.as_wei for leg in route.legs) + 200_000
+        )
+
+    @patch("raiden_installer.swap_router.wait_for_transaction")
+    def test_legs_are_sent_with_consecutive_nonces(self, wait_for_transaction):
+        route = self.router.get_route(TokenAmount(20_000, RDN), gas_price=Wei(1), block_number=1)
+        account = MagicMock()
+        account.get_ethereum_balance.side_effect = [
+            EthereumAmount(1000),
+            EthereumAmount(1000) - route.total,
+        ]
+
+        report = self.router.execute(route, account)
+
+        nonces = [exchange.buy_tokens.call_args[1]["nonce"] for exchange in self.exchanges[:2]]
+        self.assertEqual(nonces, [7, 8])
+        self.assertEqual(wait_for_transaction.call_count, 2)
+        self.assertEqual(report.realized_total.as_wei, report.quoted_total.as_wei)
+        self.assertEqual(report.slippage, 0)
+
+    @patch("raiden_installer.swap_router.wait_for_transaction")
+    def test_sent_legs_are_reported_when_a_leg_fails(self, wait_for_transaction):
+        route = self.router.get_route(TokenAmount(20_000, RDN), gas_price=Wei(1), block_number=1)
+        self.exchanges[1].buy_tokens.side_effect = ValueError("nonce too low")
+        account = MagicMock()
+        account.get_ethereum_balance.side_effect = [
+            EthereumAmount(1000),
+            EthereumAmount(1000) - route.legs[0].eth_cost,
+        ]
+
+        with self.assertRaises(PartialSwapError) as context:
+            self.router.execute(route, account)
+
+        report = context.exception.report
+        self.assertEqual(report.route.legs, route.legs[:1])
+        self.assertEqual(report.transaction_hashes, (b"\x01" * 32,))
+        self.assertEqual(report.realized_total, route.legs[0].eth_cost)
+        wait_for_transaction.assert_called_once_with(self.w3, b"\x01" * 32)
+
+    @patch("raiden_installer.swap_router.wait_for_transaction")
+    def test_failing_first_leg(self, wait_for_transaction):
+        route = self.router.get_route(TokenAmount(20_000, RDN), gas_price=Wei(1), block_number=1)
+        self.exchanges[0].buy_tokens.side_effect = ValueError("insufficient funds")
+        account = MagicMock()
+        account.get_ethereum_balance.return_value = EthereumAmount(1000)
+
+        with self.assertRaises(ValueError):
+            self.router.execute(route, account)
+        wait_for_transaction.assert_not_called()
+
+    def test_unavailable_exchanges_are_left_out(self):
+        def make_exchange(w3):
+            raise ExchangeError("Not deployed on this network")
+
+        router = SplitRouter.from_exchange_classes(
+            self.w3, [make_exchange, lambda w3: self.exchanges[0]]
+        )
+        self.assertEqual(router.exchanges, [self.exchanges[0]])
+
+    def test_slippage_without_quoted_costs(self):
+        route = SwapRoute(legs=(), block_number=1)
+        report = SwapReport(
+            route=route,
+            transaction_hashes=(),
+            quoted_total=EthereumAmount(0),
+            realized_total=EthereumAmount(0),
+        )
+        self.assertEqual(report.slippage, 0)
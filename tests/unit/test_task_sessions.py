@@ -0,0 +1,137 @@
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from raiden_installer.task_sessions import (
+    TaskSession,
+    TaskSessionError,
+    TaskSessionRegistry,
+    TaskState,
+)
+
+SWAP_ARGUMENTS = {"configuration_file_name": "config.toml", "token": "RDN", "amount": "10"}
+
+
+class TaskSessionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.folder_path = Path(self.folder.name)
+        self.session = TaskSession.create(self.folder_path, "swap", SWAP_ARGUMENTS)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_messages_are_numbered(self):
+        self.session.record({"type": "status-update", "text": ["Starting swap"]})
+        self.session.record({"type": "summary", "text": ["Swap Successful!"]})
+
+        messages = self.session.messages
+        self.assertEqual([message["seq"] for message in messages], [1, 2])
+        self.assertEqual({message["task_id"] for message in messages}, {self.session.id})
+        self.assertFalse(self.session.has_errors)
+
+    def test_subscribers_receive_missed_and_new_messages(self):
+        for number in range(3):
+            self.session.record({"type": "status-update", "text": [str(number)]})
+        received = []
+
+        backlog = self.session.subscribe(received.append, last_seq=1)
+        self.session.record({"type": "status-update", "text": ["3"]})
+        self.session.unsubscribe(received.append)
+        self.session.record({"type": "status-update", "text": ["4"]})
+
+        self.assertEqual([message["seq"] for message in backlog], [2, 3])
+        self.assertEqual([message["seq"] for message in received], [4])
+
+    def test_state_machine(self):
+        self.assertEqual(self.session.state, TaskState.PENDING)
+        self.session.set_state(TaskState.RUNNING)
+        self.assertFalse(self.session.is_finished)
+        self.session.set_state(TaskState.SUCCEEDED)
+        self.assertTrue(self.session.is_finished)
+
+        with self.assertRaises(TaskSessionError):
+            self.session.set_state(TaskState.RUNNING)
+        self.assertEqual(self.session.messages[-1]["state"], "succeeded")
+
+    def test_errors_are_noticed(self):
+        self.session.record({"type": "summary", "text": ["Transaction failed"], "icon": "error"})
+        self.assertTrue(self.session.has_errors)
+
+    def test_progress_log_is_loaded(self):
+        self.session.set_state(TaskState.RUNNING)
+        self.session.record({"type": "hash", "text": ["Waiting"], "tx_hash": "0x01"})
+
+        loaded = TaskSession.load(self.session.log_path)
+
+        self.assertEqual(loaded.id, self.session.id)
+        self.assertEqual(loaded.key, ("swap", "config.toml"))
+        self.assertEqual(loaded.arguments, SWAP_ARGUMENTS)
+        self.assertEqual(loaded.messages[:2], self.session.messages)
+        # The wizard which ran the session is gone
+        self.assertEqual(loaded.state, TaskState.INTERRUPTED)
+        self.assertEqual(TaskSession.load(self.session.log_path).messages, loaded.messages)
+
+    def test_invalid_progress_log(self):
+        self.session.log_path.write_text("{}\n")
+        with self.assertRaises(TaskSessionError):
+            TaskSession.load(self.session.log_path)
+
+
+class TaskSessionRegistryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.folder_path = Path(self.folder.name)
+        self.registry = TaskSessionRegistry(self.folder_path)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_running_session_is_joined(self):
+        session, created = self.registry.start("swap", SWAP_ARGUMENTS)
+        self.assertTrue(created)
+
+        joined, created = self.registry.start("swap", dict(SWAP_ARGUMENTS))
+        self.assertIs(joined, session)
+        self.assertFalse(created)
+
+        other, created = self.registry.start("fund", SWAP_ARGUMENTS)
+        self.assertTrue(created)
+        self.assertIsNot(other, session)
+
+    def test_conflicting_session_is_refused(self):
+        self.registry.start("swap", SWAP_ARGUMENTS)
+        with self.assertRaises(TaskSessionError):
+            self.registry.start("swap", dict(SWAP_ARGUMENTS, token="DAI"))
+
+    def test_finished_session_is_not_joined(self):
+        session, _ = self.registry.start("swap", SWAP_ARGUMENTS)
+        session.set_state(TaskState.FAILED)
+
+        retried, created = self.registry.start("swap", SWAP_ARGUMENTS)
+        self.assertTrue(created)
+        self.assertIsNot(retried, session)
+
+    def test_session_of_former_wizard_is_loaded(self):
+        session, _ = self.registry.start("swap", SWAP_ARGUMENTS)
+        session.set_state(TaskState.RUNNING)
+
+        loaded = TaskSessionRegistry(self.folder_path).get(session.id)
+        self.assertEqual(loaded.state, TaskState.INTERRUPTED)
+
+    def test_invalid_task_id(self):
+        self.assertIsNone(self.registry.get("0" * 32))
+        self.assertIsNone(self.registry.get("../config"))
+        self.assertIsNone(self.registry.get(None))
+
+    def test_expired_sessions_are_removed(self):
+        session, _ = self.registry.start("swap", SWAP_ARGUMENTS)
+        session.set_state(TaskState.FAILED)
+        expired_at = time.time() - self.registry.ttl - 1
+        os.utime(session.log_path, (expired_at, expired_at))
+
+        self.registry.start("swap", SWAP_ARGUMENTS)
+        self.assertFalse(session.log_path.exists())
+        self.assertIsNone(self.registry.get(session.id))
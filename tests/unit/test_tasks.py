@@ -0,0 +1,79 @@
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from raiden_installer import tasks
+from raiden_installer.tasks import TaskCancelled, run_blocking, run_blocking_on
+
+
+class TasksTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cancelled = threading.Event()
+
+    def test_blocking_function_runs_off_the_loop(self):
+        async def run():
+            loop_thread = threading.get_ident()
+            thread = await run_blocking(self.cancelled, threading.get_ident)
+            return loop_thread, thread
+
+        loop_thread, thread = asyncio.run(run())
+        self.assertNotEqual(loop_thread, thread)
+
+    def test_loop_is_not_blocked(self):
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        async def run():
+            ticker = asyncio.ensure_future(tick())
+            await run_blocking(self.cancelled, time.sleep, 0.2)
+            ticker.cancel()
+
+        asyncio.run(run())
+        self.assertGreater(len(ticks), 5)
+
+    def test_cancelled_task_stops_sleeping(self):
+        async def run():
+            task = asyncio.ensure_future(run_blocking(self.cancelled, tasks.sleep, 10))
+            await asyncio.sleep(0.05)
+            self.cancelled.set()
+            await task
+
+        started = time.monotonic()
+        with self.assertRaises(TaskCancelled):
+            asyncio.run(run())
+        self.assertLess(time.monotonic() - started, 5)
+
+    def test_cancelled_task_does_not_start(self):
+        self.cancelled.set()
+        with self.assertRaises(TaskCancelled):
+            asyncio.run(run_blocking(self.cancelled, self.fail))
+
+    def test_sleep_outside_of_tasks(self):
+        started = time.monotonic()
+        tasks.sleep(0.01)
+        self.assertGreaterEqual(time.monotonic() - started, 0.01)
+
+    def test_busy_executor_does_not_delay_other_executors(self):
+        busy_executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(busy_executor.shutdown)
+        release = threading.Event()
+
+        async def run():
+            blocked = asyncio.ensure_future(
+                run_blocking_on(busy_executor, self.cancelled, release.wait, 10)
+            )
+            queued = asyncio.ensure_future(
+                run_blocking_on(busy_executor, self.cancelled, threading.get_ident)
+            )
+            await run_blocking(self.cancelled, threading.get_ident)
+            self.assertFalse(queued.done())
+            release.set()
+            await asyncio.gather(blocked, queued)
+
+        asyncio.run(asyncio.wait_for(run(), 5))
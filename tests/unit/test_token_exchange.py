@@ -0,0 +1,325 @@
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+from eth_abi import encode_abi
+from eth_utils import encode_hex, to_canonical_address
+
+from raiden_installer import token_exchange
+from raiden_installer.constants import GAS_LIMIT_MARGIN, WEB3_TIMEOUT
+from raiden_installer.kyber.pricing import RateCurveCache
+from raiden_installer.token_exchange import (
+    Exchange,
+    ExchangeError,
+    ExchangeQuote,
+    Kyber,
+    QuoteCache,
+    QuoteEngine,
+    TransactionCosts,
+    Uniswap,
+)
+from raiden_installer.tokens import Erc20Token, EthereumAmount, TokenAmount, Wei
+
+RDN = Erc20Token.find_by_ticker("RDN", "mainnet")
+DAI = Erc20Token.find_by_ticker("DAI", "mainnet")
+WETH_ADDRESS = to_canonical_address("0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2")
+KYBER_RATE = 10 ** 15
+
+
+def make_costs(total):
+    return TransactionCosts(
+        gas_price=EthereumAmount(Wei(10 ** 9)),
+        gas=100_000,
+        eth_sold=EthereumAmount(total),
+        total=EthereumAmount(total),
+        exchange_rate=EthereumAmount("0.001"),
+        block_number=100,
+    )
+
+
+class CheapExchange(Exchange):
+    def calculate_transaction_costs(self, token_amount, account, block_number=None):
+        return make_costs("0.1")
+
+
+class ExpensiveExchange(Exchange):
+    def calculate_transaction_costs(self, token_amount, account, block_number=None):
+        return make_costs("0.2")
+
+
+class SlowExchange(Exchange):
+    def calculate_transaction_costs(self, token_amount, account, block_number=None):
+        time.sleep(1)
+        return make_costs("0.01")
+
+
+class FailingExchange(Exchange):
+    def calculate_transaction_costs(self, token_amount, account, block_number=None):
+        raise ExchangeError("Not listing RDN")
+
+
+class PipelineExchange(Exchange):
+    """ Sells RDN at a fixed rate, read from a fake contract """
+
+    swap_function = MagicMock()
+
+    def is_listing_token(self, ticker):
+        return ticker == "RDN"
+
+    def _get_rate_reads(self, token_amount, block_number):
+        return {"rate": ("eth_call", [{"to": "0x0", "data": "0x"}, "latest"])}
+
+    def _get_exchange_rate(self, token_amount, results, block_number):
+        return EthereumAmount(Wei(int(results["rate"], 16)))
+
+    def _get_swap_call(self, account, token_amount, exchange_rate, eth_sold, deadline):
+        return self.swap_function, [token_amount.as_wei, deadline]
+
+
+def fake_batch_results(w3, rpc_requests):
+    results = {
+        "eth_getBlockByNumber": {
+            "number": hex(100),
+            "gasLimit": hex(10_000_000),
+            "timestamp": hex(1_600_000_000),
+        },
+        "eth_gasPrice": hex(10 ** 9),
+        "eth_call": hex(10 ** 15),
+    }
+    return [results[method] for method, _ in rpc_requests]
+
+
+class TransactionCostsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.w3 = MagicMock()
+        self.w3.eth.gasPriceStrategy = None
+        self.account = MagicMock(address="0x0000000000000000000000000000000000000001")
+        PipelineExchange.swap_function = MagicMock()
+        PipelineExchange.swap_function.return_value.estimateGas.return_value = 100_000
+
+    @patch("raiden_installer.token_exchange.make_batch_request", side_effect=fake_batch_results)
+    def test_costs_need_two_round_trips(self, batch_request):
+        token_amount = TokenAmount(10, RDN)
+        costs = PipelineExchange(self.w3).calculate_transaction_costs(token_amount, self.account)
+
+        self.assertEqual(batch_request.call_count, 1)
+        swap_function = PipelineExchange.swap_function
+        swap_function.assert_called_once_with(token_amount.as_wei, 1_600_000_000 + WEB3_TIMEOUT)
+        swap_function.return_value.estimateGas.assert_called_once()
+
+        self.assertEqual(costs.exchange_rate, EthereumAmount("0.001"))
+        self.assertEqual(costs.gas_price, EthereumAmount(Wei(10 ** 9)))
+        self.assertEqual(costs.gas, int(100_000 * GAS_LIMIT_MARGIN))
+        self.assertEqual(costs.block_number, 100)
+        gas_cost = EthereumAmount(Wei(costs.gas * 10 ** 9))
+        self.assertEqual(costs.total, EthereumAmount(costs.eth_sold.value + gas_cost.value))
+
+    @patch("raiden_installer.token_exchange.make_batch_request", side_effect=fake_batch_results)
+    def test_gas_price_strategy_is_used(self, batch_request):
+        self.w3.eth.gasPriceStrategy = MagicMock()
+        self.w3.eth.generateGasPrice.return_value = 2 * 10 ** 9
+
+        costs = PipelineExchange(self.w3).calculate_transaction_costs(
+            TokenAmount(10, RDN), self.account
+        )
+
+        methods = [method for method, _ in batch_request.call_args[0][1]]
+        self.assertNotIn("eth_gasPrice", methods)
+        self.assertEqual(costs.gas_price, EthereumAmount(Wei(2 * 10 ** 9)))
+
+    def test_cannot_calculate_costs_for_nothing(self):
+        with self.assertRaises(ExchangeError):
+            PipelineExchange(self.w3).calculate_transaction_costs(
+                TokenAmount(0, RDN), self.account
+            )
+
+    @patch("raiden_installer.token_exchange.make_batch_request", side_effect=fake_batch_results)
+    def test_cannot_calculate_costs_for_unlisted_token(self, batch_request):
+        with self.assertRaisesRegex(ExchangeError, "PipelineExchange is not listing DAI"):
+            PipelineExchange(self.w3).calculate_transaction_costs(
+                TokenAmount(10, DAI), self.account
+            )
+        batch_request.assert_not_called()
+
+    @patch.dict(Uniswap.WETH_ADDRESSES, {1: WETH_ADDRESS})
+    def test_uniswap_listing_is_read_with_the_batch(self):
+        self.w3.eth.chainId = 1
+
+        def fake_uniswap_batch_results(w3, rpc_requests):
+            # Pairs that were never created have no code
+            return [
+                "0x" if method == "eth_call" else result
+                for (method, _), result in zip(rpc_requests, fake_batch_results(w3, rpc_requests))
+            ]
+
+        with patch(
+            "raiden_installer.token_exchange.make_batch_request",
+            side_effect=fake_uniswap_batch_results,
+        ) as batch_request:
+            with self.assertRaisesRegex(ExchangeError, "Uniswap is not listing RDN"):
+                Uniswap(self.w3).calculate_transaction_costs(TokenAmount(10, RDN), self.account)
+
+        self.assertEqual(batch_request.call_count, 1)
+
+
+def fake_kyber_batch_results(w3, rpc_requests):
+    expected_rate = encode_hex(encode_abi(["uint256", "uint256"], [KYBER_RATE, KYBER_RATE]))
+    results = {
+        "eth_getBlockByNumber": {
+            "number": hex(100),
+            "gasLimit": hex(10_000_000),
+            "timestamp": hex(1_600_000_000),
+        },
+        "eth_gasPrice": hex(10 ** 9),
+        "eth_call": expected_rate,
+    }
+    return [results[method] for method, _ in rpc_requests]
+
+
+class KyberRateTestCase(unittest.TestCase):
+    def setUp(self):
+        self.w3 = MagicMock()
+        self.w3.eth.chainId = 1
+        self.w3.eth.gasPriceStrategy = None
+        self.account = MagicMock(address="0x0000000000000000000000000000000000000001")
+        proxy = MagicMock(address="0x818E6FECD516Ecc3849DAf6845e3EC868087B755")
+        proxy.functions.trade.return_value.estimateGas.return_value = 300_000
+        patchers = [
+            patch(
+                "raiden_installer.token_exchange.kyber_contracts.get_network_contract_proxy",
+                return_value=proxy,
+            ),
+            patch("raiden_installer.kyber.pricing.RATE_CURVE_CACHE", RateCurveCache()),
+            patch(
+                "raiden_installer.token_exchange.make_batch_request",
+                side_effect=fake_kyber_batch_results,
+            ),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.kyber = Kyber(self.w3)
+
+    def test_exact_rate_is_read_with_rate_samples(self):
+        for tokens in (10, 10_000_000):
+            costs = self.kyber.calculate_transaction_costs(
+                TokenAmount(tokens, RDN), self.account, block_number=100
+            )
+            self.assertEqual(costs.exchange_rate, EthereumAmount(Wei(KYBER_RATE)))
+
+        # The curve of the block is sampled once, no amount needs another round trip
+        self.assertEqual(token_exchange.make_batch_request.call_count, 2)
+
+    def test_cached_curve_serves_rates_without_exact_rate(self):
+        self.kyber.calculate_transaction_costs(TokenAmount(10, RDN), self.account, 100)
+        self.kyber.calculate_transaction_costs(TokenAmount(20, RDN), self.account, 100)
+
+        # Only the block, the gas price and the maximum gas price of Kyber
+        [_, rpc_requests] = token_exchange.make_batch_request.call_args[0]
+        self.assertEqual(len(rpc_requests), 3)
+
+
+class QuoteEngineTestCase(unittest.TestCase):
+    def setUp(self):
+        self.w3 = MagicMock()
+        self.w3.eth.blockNumber = 100
+        self.token_amount = TokenAmount(10, RDN)
+
+    def test_best_quote_is_cheapest(self):
+        engine = QuoteEngine(self.w3, [ExpensiveExchange, CheapExchange, FailingExchange])
+        quotes = engine.get_quotes(self.token_amount, None)
+
+        self.assertEqual(
+            [quote.exchange_name for quote in quotes], ["CheapExchange", "ExpensiveExchange"]
+        )
+        best_quote = engine.get_best_quote(self.token_amount, None)
+        self.assertEqual(best_quote.exchange_name, "CheapExchange")
+        self.assertEqual(best_quote.block_number, 100)
+
+    def test_slow_exchange_does_not_delay_quotes(self):
+        engine = QuoteEngine(self.w3, [SlowExchange, ExpensiveExchange], deadline=0.2)
+
+        time_start = time.time()
+        quotes = engine.get_quotes(self.token_amount, None)
+
+        self.assertLess(time.time() - time_start, 1)
+        self.assertEqual([quote.exchange_name for quote in quotes], ["ExpensiveExchange"])
+
+    def test_async_quotes_wait_on_the_event_loop(self):
+        engine = QuoteEngine(self.w3, [SlowExchange, CheapExchange, FailingExchange], deadline=0.2)
+
+        time_start = time.time()
+        quotes = asyncio.run(engine.get_quotes_async(self.token_amount, None))
+
+        self.assertLess(time.time() - time_start, 1)
+        self.assertEqual([quote.exchange_name for quote in quotes], ["CheapExchange"])
+
+    def test_cannot_get_best_quote_without_quotes(self):
+        engine = QuoteEngine(self.w3, [FailingExchange])
+        with self.assertRaises(ExchangeError):
+            engine.get_best_quote(self.token_amount, None)
+
+
+class QuoteCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache = QuoteCache()
+        self.token_amount = TokenAmount(10, RDN)
+        self.calculations = 0
+
+    def calculate_quote(self, delay=0):
+        self.calculations += 1
+        time.sleep(delay)
+        return ExchangeQuote.from_transaction_costs(
+            CheapExchange(None), self.token_amount, make_costs("0.1")
+        )
+
+    def test_quote_is_reused_within_block(self):
+        first_quote = self.cache.get("kyber", self.token_amount, 1, self.calculate_quote)
+        second_quote = self.cache.get("Kyber", self.token_amount, 1, self.calculate_quote)
+
+        self.assertIs(first_quote, second_quote)
+        self.assertEqual(self.calculations, 1)
+        self.assertGreaterEqual(second_quote.age, 0)
+
+    def test_quote_is_recalculated_for_new_block(self):
+        self.cache.get("kyber", self.token_amount, 1, self.calculate_quote)
+        self.cache.get("kyber", self.token_amount, 2, self.calculate_quote)
+        self.cache.get("uniswap", self.token_amount, 2, self.calculate_quote)
+        self.assertEqual(self.calculations, 3)
+
+    def test_other_amounts_get_their_own_quote(self):
+        # Rounded to four significant digits, both would be 10 RDN
+        other_amount = TokenAmount(Decimal("10.0001"), RDN)
+        self.cache.get("kyber", self.token_amount, 1, self.calculate_quote)
+        self.cache.get("kyber", TokenAmount(10, RDN), 1, self.calculate_quote)
+        self.cache.get("kyber", other_amount, 1, self.calculate_quote)
+        self.assertEqual(self.calculations, 2)
+
+    def test_concurrent_requests_are_coalesced(self):
+        barrier = threading.Barrier(4)
+
+        def get_quote():
+            barrier.wait()
+            return self.cache.get(
+                "kyber", self.token_amount, 1, lambda: self.calculate_quote(delay=0.2)
+            )
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            quotes = list(executor.map(lambda _: get_quote(), range(4)))
+
+        self.assertEqual(self.calculations, 1)
+        self.assertTrue(all(quote is quotes[0] for quote in quotes))
+
+    def test_failed_calculations_are_not_cached(self):
+        def fail():
+            raise ExchangeError("Trade not possible")
+
+        with self.assertRaises(ExchangeError):
+            self.cache.get("kyber", self.token_amount, 1, fail)
+
+        self.cache.get("kyber", self.token_amount, 1, self.calculate_quote)
+        self.assertEqual(self.calculations, 1)
@@ -0,0 +1,87 @@
+import unittest
+from unittest.mock import patch
+
+from eth_abi import encode_single
+from eth_utils import encode_hex, to_canonical_address, to_checksum_address
+from tests.constants import TESTING_TEMP_FOLDER
+
+from raiden_installer.token_metadata import (
+    TokenMetadata,
+    TokenMetadataCache,
+    with_onchain_decimals,
+)
+from raiden_installer.tokens import Erc20Token
+
+USDC_ADDRESS = to_canonical_address("0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48")
+MKR_ADDRESS = to_canonical_address("0x9f8f72aa9304c8b593d555f12ef6589cc3a579a2")
+NO_TOKEN_ADDRESS = to_canonical_address("0x0000000000000000000000000000000000000001")
+
+
+def fake_batch_results(w3, rpc_requests):
+    results = {
+        USDC_ADDRESS: [encode_single("uint8", 6), encode_single("string", "USDC")],
+        MKR_ADDRESS: [encode_single("uint8", 18), encode_single("bytes32", b"MKR")],
+        NO_TOKEN_ADDRESS: [None, None],
+    }
+    flattened = []
+    for _, params in rpc_requests[::2]:
+        for result in results[to_canonical_address(params[0]["to"])]:
+            flattened.append(result and encode_hex(result))
+    return flattened
+
+
+class TokenMetadataCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.file_path = TESTING_TEMP_FOLDER.joinpath("token_metadata.json")
+        self.cache = TokenMetadataCache(self.file_path)
+
+    @patch("raiden_installer.token_metadata.make_batch_request", side_effect=fake_batch_results)
+    def test_fetch_token_metadata(self, batch_request):
+        metadata = self.cache.fetch(None, 1, [USDC_ADDRESS, MKR_ADDRESS, NO_TOKEN_ADDRESS])
+
+        self.assertEqual(batch_request.call_count, 1)
+        self.assertEqual(metadata[USDC_ADDRESS], TokenMetadata(decimals=6, symbol="USDC"))
+        self.assertEqual(metadata[MKR_ADDRESS], TokenMetadata(decimals=18, symbol="MKR"))
+        self.assertNotIn(NO_TOKEN_ADDRESS, metadata)
+
+    @patch("raiden_installer.token_metadata.make_batch_request", side_effect=fake_batch_results)
+    def test_cached_metadata_is_served_without_requests(self, batch_request):
+        self.cache.fetch(None, 1, [USDC_ADDRESS])
+        self.cache.fetch(None, 1, [USDC_ADDRESS])
+        self.assertEqual(batch_request.call_count, 1)
+
+        reloaded_cache = TokenMetadataCache(self.file_path)
+        reloaded_cache.fetch(None, 1, [USDC_ADDRESS])
+        self.assertEqual(batch_request.call_count, 1)
+        self.assertEqual(reloaded_cache.get(1, USDC_ADDRESS).decimals, 6)
+        self.assertIsNone(reloaded_cache.get(5, USDC_ADDRESS))
+
+    @patch("raiden_installer.token_metadata.make_batch_request", side_effect=fake_batch_results)
+    def test_failed_reads_are_retried_after_ttl(self, batch_request):
+        self.cache.fetch(None, 1, [NO_TOKEN_ADDRESS])
+        self.cache.fetch(None, 1, [NO_TOKEN_ADDRESS])
+        self.assertEqual(batch_request.call_count, 1)
+
+        with patch("raiden_installer.token_metadata.time.monotonic") as monotonic:
+            failed_at = self.cache._failures[(1, to_checksum_address(NO_TOKEN_ADDRESS))]
+            monotonic.return_value = failed_at + self.cache.failure_ttl
+            self.cache.fetch(None, 1, [NO_TOKEN_ADDRESS])
+        self.assertEqual(batch_request.call_count, 2)
+
+    @patch("raiden_installer.token_metadata.make_batch_request", side_effect=fake_batch_results)
+    def test_registry_tokens_are_left_alone(self, batch_request):
+        token = Erc20Token(ticker="USDC", wei_ticker="UUSDC", address=USDC_ADDRESS)
+        with patch(
+            "raiden_installer.token_metadata.get_token_metadata_cache", return_value=self.cache
+        ):
+            [checked_token] = with_onchain_decimals(None, 1, [token])
+
+        self.assertEqual(checked_token.decimals, 6)
+        self.assertEqual(checked_token.address, token.address)
+        self.assertEqual(token.decimals, 18)
+
+    def tearDown(self):
+        try:
+            self.file_path.unlink()
+        except FileNotFoundError:
+            pass
@@ -1,16 +1,27 @@
+import json
 import unittest
+from dataclasses import replace
+from decimal import getcontext
 
 from eth_utils import to_canonical_address
+from tests.constants import TESTING_TEMP_FOLDER
 
 from raiden_installer import load_settings
 from raiden_installer.tokens import (
+    DEFAULT_VERSION_KEY,
     Erc20Token,
     EthereumAmount,
     RequiredAmounts,
     SwapAmounts,
     TokenAmount,
     TokenError,
+    TokenRegistry,
+    Tokens,
+    TokensV37,
     Wei,
+    get_token_list_paths,
+    get_token_registry,
+    load_token_list,
 )
 
 
@@ -49,6 +60,18 @@ class TokenAmountTestCase(unittest.TestCase):
         self.assertEqual(almost_one_eth.formatted, "0.875 ETH")
         self.assertEqual(some_wei.formatted, "50000 WEI")
 
+    def test_can_get_formatted_amount_with_few_decimals(self):
+        usdc = Erc20Token("USDC", "UEI", decimals=6, address=self.one_rdn.address)
+        amount = TokenAmount(Wei(1_234_567_891), usdc)
+
+        self.assertEqual(amount.as_wei, Wei(1_234_567_891))
+        self.assertEqual(amount.formatted, "1234.568 USDC")
+
+    def test_global_decimal_context_is_left_alone(self):
+        precision = getcontext().prec
+        TokenAmount(Wei(10 ** 30), Erc20Token.find_by_ticker("RDN", "mainnet"))
+        self.assertEqual(getcontext().prec, precision)
+
     def test_addition(self):
         added_eth = self.one_eth + self.two_eth
         self.assertEqual(added_eth.value, 3)
@@ -118,6 +141,82 @@ class Erc20TokenTestCase(unittest.TestCase):
         )
 
 
+class TokenRegistryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.registry = TokenRegistry.from_token_lists(
+            {DEFAULT_VERSION_KEY: Tokens, "0.37": TokensV37}
+        )
+        self.token_list_path = TESTING_TEMP_FOLDER.joinpath("token_list.json")
+        self.token_list_path.parent.mkdir(parents=True, exist_ok=True)
+
+    def test_find_by_ticker_returns_shared_instance(self):
+        self.assertIs(
+            Erc20Token.find_by_ticker("RDN", "mainnet"),
+            get_token_registry().get("RDN", "mainnet"),
+        )
+
+    def test_get_token_for_contracts_version(self):
+        svt_token = self.registry.get("SVT", "goerli", "0.37")
+        self.assertEqual(
+            svt_token.address, to_canonical_address("0x5Fc523e13fBAc2140F056AD7A96De2cC0C4Cc63A")
+        )
+        with self.assertRaises(TokenError):
+            self.registry.get("SVT", "goerli", DEFAULT_VERSION_KEY)
+
+    def test_unknown_contracts_version_uses_default_list(self):
+        rdn_token = self.registry.get("RDN", "kovan", "0.99")
+        self.assertEqual(
+            rdn_token.address, to_canonical_address("0x3a03155696708f517c53ffc4f696dfbfa7743795")
+        )
+
+    def test_extend_from_token_list(self):
+        self.token_list_path.write_text(
+            json.dumps(
+                {
+                    "tokens": [
+                        {
+                            "ticker": "USDC",
+                            "wei_ticker": "UEI",
+                            "decimals": 6,
+                            "addresses": {
+                                "mainnet": "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48"
+                            },
+                        }
+                    ]
+                }
+            )
+        )
+        registry = self.registry.extend(load_token_list(self.token_list_path))
+
+        for version in [DEFAULT_VERSION_KEY, "0.37"]:
+            usdc_token = registry.get("USDC", "mainnet", version)
+            self.assertEqual(usdc_token.decimals, 6)
+
+        with self.assertRaises(TokenError):
+            self.registry.get("USDC", "mainnet")
+
+    def test_shipped_token_lists_are_loaded(self):
+        token_list_names = [path.name for path in get_token_list_paths()]
+        self.assertIn("stablecoins.toml", token_list_names)
+
+        usdc_token = get_token_registry().get("USDC", "mainnet")
+        self.assertEqual(usdc_token.decimals, 6)
+        self.assertEqual(
+            usdc_token.address, to_canonical_address("0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48")
+        )
+
+    def test_cannot_load_invalid_token_list(self):
+        self.token_list_path.write_text(json.dumps({"tokens": [{"ticker": "USDC"}]}))
+        with self.assertRaises(TokenError):
+            load_token_list(self.token_list_path)
+
+    def tearDown(self):
+        try:
+            self.token_list_path.unlink()
+        except FileNotFoundError:
+            pass
+
+
 class InstallerAmountsTestCase(unittest.TestCase):
     def setUp(self):
         self.settings = load_settings("mainnet")
@@ -161,3 +260,14 @@ class InstallerAmountsTestCase(unittest.TestCase):
             swap_amounts.transfer_token,
             TokenAmount(Wei(self.settings.transfer_token.swap_amount), self.transfer_token)
         )
+
+    def test_amounts_in_the_given_tokens(self):
+        onchain_token = replace(self.transfer_token, decimals=6)
+        required_amounts = RequiredAmounts.from_settings(self.settings, [onchain_token])
+        swap_amounts = SwapAmounts.from_settings(self.settings, [onchain_token])
+        balance = TokenAmount(Wei(self.settings.transfer_token.amount_required), onchain_token)
+
+        self.assertEqual(required_amounts.transfer_token.currency, onchain_token)
+        self.assertEqual(swap_amounts.transfer_token.currency, onchain_token)
+        self.assertEqual(required_amounts.service_token.currency, self.service_token)
+        self.assertFalse(balance < required_amounts.transfer_token)
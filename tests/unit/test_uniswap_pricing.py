@@ -0,0 +1,152 @@
+import threading
+import unittest
+from unittest.mock import patch
+
+from eth_abi import encode_abi
+from eth_utils import encode_hex, to_canonical_address
+
+from raiden_installer.uniswap.pricing import (
+    InsufficientLiquidityError,
+    PairReservesCache,
+    get_amount_in,
+    get_amount_out,
+    get_amounts_in,
+    get_amounts_out,
+    get_pair_address,
+)
+
+WETH_ADDRESS = to_canonical_address("0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2")
+USDC_ADDRESS = to_canonical_address("0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48")
+DAI_ADDRESS = to_canonical_address("0x6b175474e89094c44da98b954eedeac495271d0f")
+
+USDC_WETH_PAIR = to_canonical_address("0xb4e16d0168e52d35cacd2c6185b44281ec28c9dc")
+DAI_WETH_PAIR = to_canonical_address("0xa478c2975ab1ea89e8196811f51a7b7ade33eb11")
+
+# USDC sorts before WETH, WETH sorts before DAI
+USDC_WETH_RESERVES = (50_000_000 * 10 ** 6, 20_000 * 10 ** 18)
+DAI_WETH_RESERVES = (40_000_000 * 10 ** 18, 16_000 * 10 ** 18)
+PAIR_RESERVES = {USDC_WETH_PAIR: USDC_WETH_RESERVES, DAI_WETH_PAIR: DAI_WETH_RESERVES}
+
+
+def fake_batch_results(w3, rpc_requests):
+    results = []
+    for _, (call, _) in rpc_requests:
+        reserves = PAIR_RESERVES.get(to_canonical_address(call["to"]))
+        if reserves is None:
+            results.append("0x")
+        else:
+            encoded = encode_abi(["uint112", "uint112", "uint32"], [*reserves, 0])
+            results.append(encode_hex(encoded))
+    return results
+
+
+class PairAddressTestCase(unittest.TestCase):
+    def test_pair_address_matches_mainnet(self):
+        self.assertEqual(get_pair_address(WETH_ADDRESS, USDC_ADDRESS), USDC_WETH_PAIR)
+        self.assertEqual(get_pair_address(USDC_ADDRESS, WETH_ADDRESS), USDC_WETH_PAIR)
+        self.assertEqual(get_pair_address(DAI_ADDRESS, WETH_ADDRESS), DAI_WETH_PAIR)
+
+    def test_identical_tokens_have_no_pair(self):
+        with self.assertRaises(ValueError):
+            get_pair_address(WETH_ADDRESS, WETH_ADDRESS)
+
+
+class PricingTestCase(unittest.TestCase):
+    def test_amount_out(self):
+        self.assertEqual(get_amount_out(1000, 10_000, 10_000), 906)
+
+    def test_amount_in_is_sufficient_for_amount_out(self):
+        reserve_in, reserve_out = DAI_WETH_RESERVES
+        amount_out = 3 * 10 ** 18
+        amount_in = get_amount_in(amount_out, reserve_in, reserve_out)
+
+        self.assertGreaterEqual(get_amount_out(amount_in, reserve_in, reserve_out), amount_out)
+        self.assertLess(get_amount_out(amount_in - 1, reserve_in, reserve_out), amount_out)
+
+    def test_amount_in_requires_liquidity(self):
+        with self.assertRaises(InsufficientLiquidityError):
+            get_amount_in(100, 1000, 100)
+
+    def test_amounts_follow_pair_order(self):
+        amount_out = 1000 * 10 ** 6
+        weth_in = get_amount_in(amount_out, USDC_WETH_RESERVES[1], USDC_WETH_RESERVES[0])
+
+        amounts = get_amounts_in(amount_out, [WETH_ADDRESS, USDC_ADDRESS], PAIR_RESERVES)
+        self.assertEqual(amounts, [weth_in, amount_out])
+
+    def test_multi_hop_amounts(self):
+        path = [USDC_ADDRESS, WETH_ADDRESS, DAI_ADDRESS]
+        amounts_out = get_amounts_out(1000 * 10 ** 6, path, PAIR_RESERVES)
+        self.assertEqual(len(amounts_out), 3)
+
+        amounts_in = get_amounts_in(amounts_out[-1], path, PAIR_RESERVES)
+        self.assertLessEqual(amounts_in[0], amounts_out[0])
+
+    def test_missing_pair(self):
+        with self.assertRaises(InsufficientLiquidityError):
+            get_amounts_in(100, [WETH_ADDRESS, USDC_ADDRESS], {USDC_WETH_PAIR: None})
+
+
+class PairReservesCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache = PairReservesCache()
+
+    @patch("raiden_installer.uniswap.pricing.make_batch_request", side_effect=fake_batch_results)
+    def test_reserves_are_read_once_per_block(self, batch_request):
+        missing_pair = get_pair_address(USDC_ADDRESS, DAI_ADDRESS)
+        pairs = [USDC_WETH_PAIR, DAI_WETH_PAIR, missing_pair]
+
+        reserves = self.cache.get_reserves(None, pairs, block_number=1)
+        self.assertEqual(batch_request.call_count, 1)
+        self.assertEqual(reserves[USDC_WETH_PAIR], USDC_WETH_RESERVES)
+        self.assertEqual(reserves[DAI_WETH_PAIR], DAI_WETH_RESERVES)
+        self.assertIsNone(reserves[missing_pair])
+
+        self.cache.get_reserves(None, pairs, block_number=1)
+        self.assertEqual(batch_request.call_count, 1)
+
+        self.cache.get_reserves(None, [USDC_WETH_PAIR], block_number=2)
+        self.assertEqual(batch_request.call_count, 2)
+
+    @patch("raiden_installer.uniswap.pricing.make_batch_request", side_effect=fake_batch_results)
+    def test_reserves_are_kept_per_block(self, batch_request):
+        self.cache.get_reserves(None, [USDC_WETH_PAIR], block_number=2)
+        self.cache.get_reserves(None, [USDC_WETH_PAIR], block_number=1)
+        self.cache.get_reserves(None, [USDC_WETH_PAIR], block_number=2)
+        self.assertEqual(batch_request.call_count, 2)
+
+        for block_number in range(3, 3 + self.cache.max_blocks):
+            self.cache.get_reserves(None, [USDC_WETH_PAIR], block_number=block_number)
+        self.cache.get_reserves(None, [USDC_WETH_PAIR], block_number=1)
+        self.assertEqual(batch_request.call_count, 3 + self.cache.max_blocks)
+
+    def test_reads_of_other_blocks_do_not_wait_for_a_batch_request(self):
+        request_started = threading.Event()
+        release_request = threading.Event()
+
+        def slow_batch_results(w3, rpc_requests):
+            if rpc_requests[0][1][1] == hex(1):
+                request_started.set()
+                release_request.wait(5)
+            return fake_batch_results(w3, rpc_requests)
+
+        with patch(
+            "raiden_installer.uniswap.pricing.make_batch_request", side_effect=slow_batch_results
+        ):
+            slow_read = threading.Thread(
+                target=self.cache.get_reserves, args=(None, [USDC_WETH_PAIR], 1)
+            )
+            slow_read.start()
+            self.assertTrue(request_started.wait(5))
+            try:
+                reserves = self.cache.get_reserves(None, [DAI_WETH_PAIR], block_number=2)
+                self.assertEqual(reserves[DAI_WETH_PAIR], DAI_WETH_RESERVES)
+                self.assertFalse(release_request.is_set())
+            finally:
+                release_request.set()
+                slow_read.join()
+
+        self.assertEqual(
+            self.cache.get_reserves(None, [USDC_WETH_PAIR], block_number=1),
+            {USDC_WETH_PAIR: USDC_WETH_RESERVES},
+        )
@@ -1,11 +1,31 @@
 import unittest
+from unittest.mock import MagicMock
 
-from eth_utils import to_canonical_address
+from eth_abi import encode_single
+from eth_utils import encode_hex, to_canonical_address
+from web3.exceptions import ContractLogicError
 
 from raiden_contracts.constants import CONTRACT_USER_DEPOSIT
 from raiden_contracts.contract_manager import get_contracts_deployment_info
 from raiden_contracts.utils.type_aliases import ChainID
-from raiden_installer.utils import get_contract_address
+from raiden_installer.utils import (
+    ERROR_SELECTOR,
+    PANIC_SELECTOR,
+    TransactionSimulationError,
+    decode_revert_reason,
+    get_contract_address,
+    simulate_transaction,
+)
+
+TRANSACTION = {
+    "from": "0x0000000000000000000000000000000000000001",
+    "to": "0x0000000000000000000000000000000000000002",
+    "data": "0x",
+    "value": 1,
+    "gas": 21000,
+    "gasPrice": 1,
+    "nonce": 3,
+}
 
 
 class UtilsTestCase(unittest.TestCase):
@@ -22,3 +42,46 @@ class UtilsTestCase(unittest.TestCase):
     def test_cannot_get_invalid_contract_address(self):
         with self.assertRaises(ValueError):
             get_contract_address(1, "invalid contract name")
+
+
+class SimulateTransactionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.w3 = MagicMock()
+
+    def test_decode_revert_reason(self):
+        error_data = ERROR_SELECTOR + encode_single("string", "UniswapV2Router: EXPIRED")
+        self.assertEqual(decode_revert_reason(encode_hex(error_data)), "UniswapV2Router: EXPIRED")
+
+        panic_data = PANIC_SELECTOR + encode_single("uint256", 0x11)
+        self.assertEqual(decode_revert_reason(panic_data), "panic code 0x11")
+
+        self.assertIsNone(decode_revert_reason("0x"))
+        self.assertIsNone(decode_revert_reason(None))
+
+    def test_successful_call_is_run_on_pending_block(self):
+        simulate_transaction(self.w3, TRANSACTION)
+
+        call_params, block_identifier = self.w3.eth.call.call_args[0]
+        self.assertEqual(block_identifier, "pending")
+        self.assertNotIn("nonce", call_params)
+
+    def test_revert_reason_is_raised(self):
+        self.w3.eth.call.side_effect = ContractLogicError(
+            "execution reverted: UniswapV2Library: INSUFFICIENT_LIQUIDITY"
+        )
+        with self.assertRaisesRegex(TransactionSimulationError, "INSUFFICIENT_LIQUIDITY"):
+            simulate_transaction(self.w3, TRANSACTION)
+
+    def test_node_errors_are_raised(self):
+        error_data = ERROR_SELECTOR + encode_single("string", "Kyber: trade failed")
+        self.w3.eth.call.side_effect = ValueError(
+            {"code": -32000, "message": "execution reverted", "data": encode_hex(error_data)}
+        )
+        with self.assertRaisesRegex(TransactionSimulationError, "Kyber: trade failed"):
+            simulate_transaction(self.w3, TRANSACTION)
+
+        self.w3.eth.call.side_effect = ValueError(
+            {"code": -32000, "message": "insufficient funds for gas * price + value"}
+        )
+        with self.assertRaisesRegex(TransactionSimulationError, "insufficient funds"):
+            simulate_transaction(self.w3, TRANSACTION)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+""" Compares the cost of web3's Contract calls with the precompiled encoders
+
+No node is needed, the provider answers every call with a constant result.
+Run it from anywhere, e.g. ``python tools/benchmark_contract_calls.py``.
+"""
+import sys
+import timeit
+from pathlib import Path
+
+from eth_abi import encode_abi
+from eth_utils import to_canonical_address, to_hex
+from web3 import Web3
+from web3.providers.base import BaseProvider
+
+# The wizard is not installed as a package, import it from the checkout
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from raiden_installer import contract_calls
+from raiden_installer.kyber.web3.contracts import KYBER_NETWORK_PROXY_ABI
+from raiden_installer.transactions import EIP20_ABI
+
+TOKEN_ADDRESS = "0x255Aa6DF07540Cb5d3d297f0D0D4D84cb52bc8e6"
+PROXY_ADDRESS = "0x818E6FECD516Ecc3849DAf6845e3EC868087B755"
+OWNER = "0x0000000000000000000000000000000000000001"
+ETH_ADDRESS = "0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE"
+
+ITERATIONS = 2000
+
+
+class ConstantProvider(BaseProvider):
+    def __init__(self, result):
+        self.result = to_hex(result)
+
+    def make_request(self, method, params):
+        if method == "eth_chainId":
+            return {"jsonrpc": "2.0", "id": 1, "result": "0x1"}
+        return {"jsonrpc": "2.0", "id": 1, "result": self.result}
+
+    def isConnected(self):
+        return True
+
+
+def report(name, statement):
+    seconds = timeit.timeit(statement, number=ITERATIONS)
+    print(f"{name:<40} {seconds / ITERATIONS * 1e6:8.1f} µs/call")
+    return seconds
+
+
+def benchmark_balance_of():
+    w3 = Web3(ConstantProvider(encode_abi(["uint256"], [10 ** 18])))
+    token = w3.eth.contract(address=TOKEN_ADDRESS, abi=EIP20_ABI)
+    owner = to_canonical_address(OWNER)
+
+    contract = report("balanceOf (Contract)", lambda: token.functions.balanceOf(OWNER).call())
+    precompiled = report(
+        "balanceOf (precompiled)",
+        lambda: contract_calls.BALANCE_OF.call(w3, TOKEN_ADDRESS, owner),
+    )
+    print(f"{'':<40} {contract / precompiled:8.1f}x faster")
+
+
+def benchmark_expected_rate_encoding():
+    w3 = Web3(ConstantProvider(b""))
+    proxy = w3.eth.contract(address=PROXY_ADDRESS, abi=KYBER_NETWORK_PROXY_ABI)
+    args = (ETH_ADDRESS, TOKEN_ADDRESS, 10 ** 18)
+    canonical_args = (to_canonical_address(ETH_ADDRESS), to_canonical_address(TOKEN_ADDRESS))
+    result = encode_abi(["uint256", "uint256"], [10 ** 15, 10 ** 15])
+    function = proxy.get_function_by_name("getExpectedRate")
+
+    def contract_encode_decode():
+        proxy.encodeABI(fn_name="getExpectedRate", args=args)
+        w3.codec.decode_abi([output["type"] for output in function.abi["outputs"]], result)
+
+    def precompiled_encode_decode():
+        contract_calls.GET_EXPECTED_RATE.encode(*canonical_args, 10 ** 18)
+        contract_calls.GET_EXPECTED_RATE.decode(result)
+
+    contract = report("getExpectedRate (Contract)", contract_encode_decode)
+    precompiled = report("getExpectedRate (precompiled)", precompiled_encode_decode)
+    print(f"{'':<40} {contract / precompiled:8.1f}x faster")
+
+
+if __name__ == "__main__":
+    benchmark_balance_of()
+    benchmark_expected_rate_encoding()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+""" Compares single and multi connection downloads from a local stand-in server
+
+The server answers range requests, delays every response like a distant
+server would and limits the bandwidth of every connection, which is what
+makes a single connection slow on high-latency links.
+Run it from anywhere, e.g. ``python tools/benchmark_download.py``.
+"""
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# The wizard is not installed as a package, import it from the checkout
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from raiden_installer.download import DownloadCache
+
+ASSET_SIZE = 32 * 1024 * 1024
+LATENCY = 0.1
+CONNECTION_BANDWIDTH = 8 * 1024 * 1024
+WRITE_SIZE = 64 * 1024
+
+ASSET = os.urandom(ASSET_SIZE)
+
+
+class RangeRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(LATENCY)
+        match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else ASSET_SIZE - 1
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{ASSET_SIZE}")
+        else:
+            start, end = 0, ASSET_SIZE - 1
+            self.send_response(200)
+        self.send_header("Content-Length", str(end + 1 - start))
+        self.send_header("ETag", '"benchmark"')
+        self.end_headers()
+
+        for offset in range(start, end + 1, WRITE_SIZE):
+            self.wfile.write(ASSET[offset : min(offset + WRITE_SIZE, end + 1)])
+            time.sleep(WRITE_SIZE / CONNECTION_BANDWIDTH)
+
+    def log_message(self, *args):
+        pass
+
+
+def benchmark(url, connections):
+    with tempfile.TemporaryDirectory() as folder:
+        cache = DownloadCache(Path(folder), connections=connections)
+        started = time.monotonic()
+        cache.fetch(url)
+        elapsed = time.monotonic() - started
+    rate = ASSET_SIZE / elapsed / 2 ** 20
+    print(f"{connections} connection(s): {elapsed:6.2f} s, {rate:6.1f} MB/s")
+
+
+if __name__ == "__main__":
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RangeRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/raiden.tar.gz"
+
+    for connections in (1, 2, 4, 8):
+        benchmark(url, connections)
+    server.shutdown()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+""" Sorts thousands of synthetic releases, with the precomputed sort keys and
+with the comparison the releases used to implement (which parsed the version
+modifier again on every comparison)
+
+Run it from anywhere, e.g. ``python tools/benchmark_release_sorting.py``.
+"""
+import functools
+import random
+import sys
+import timeit
+from operator import attrgetter
+from pathlib import Path
+
+# The wizard is not installed as a package, import it from the checkout
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from raiden_installer.raiden import (
+    RaidenTestnetRelease,
+    VersionData,
+    extract_version_modifier,
+    order_version_modifier,
+)
+
+RELEASE_COUNT = 5000
+REPETITIONS = 5
+
+
+def legacy_compare(this, other):
+    """ The former ``RaidenClient.__lt__``, without its mix-up of modifier and number """
+    for field in ("major", "minor", "revision"):
+        this_value = getattr(this.version_data, field)
+        other_value = getattr(other.version_data, field)
+        if this_value != other_value:
+            return -1 if this_value < other_value else 1
+
+    this_modifier = extract_version_modifier(this.version_data.extra) or (None, None)
+    other_modifier = extract_version_modifier(other.version_data.extra) or (None, None)
+    if this_modifier[0] != other_modifier[0]:
+        this_order = order_version_modifier(this_modifier[0])
+        other_order = order_version_modifier(other_modifier[0])
+        return -1 if this_order < other_order else 1
+    if this_modifier[1] and other_modifier[1] and this_modifier[1] != other_modifier[1]:
+        return -1 if this_modifier[1] < other_modifier[1] else 1
+    return 0
+
+
+def make_releases():
+    random.seed(0)
+    releases = []
+    for _ in range(RELEASE_COUNT):
+        extra = random.choice(["", "a", "b", "rc"])
+        if extra:
+            extra += str(random.randint(0, 20))
+        version_data = VersionData(
+            str(random.randint(0, 2)),
+            str(random.randint(0, 300)),
+            str(random.randint(0, 20)),
+            extra,
+        )
+        releases.append(RaidenTestnetRelease("https://test.download.url", version_data))
+    return releases
+
+
+if __name__ == "__main__":
+    releases = make_releases()
+
+    legacy = timeit.timeit(
+        lambda: sorted(releases, key=functools.cmp_to_key(legacy_compare)), number=REPETITIONS
+    )
+    compared = timeit.timeit(lambda: sorted(releases), number=REPETITIONS)
+    precomputed = timeit.timeit(
+        lambda: sorted(releases, key=attrgetter("sort_key")), number=REPETITIONS
+    )
+
+    print(f"Sorting {RELEASE_COUNT} releases")
+    print(f"{'comparing version strings':<30} {legacy / REPETITIONS * 1000:8.1f} ms")
+    print(f"{'comparing sort keys':<30} {compared / REPETITIONS * 1000:8.1f} ms")
+    print(f"{'sorting by sort key':<30} {precomputed / REPETITIONS * 1000:8.1f} ms")
+    print(f"{'':<30} {legacy / precomputed:8.1f}x faster")